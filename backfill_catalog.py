@@ -0,0 +1,221 @@
+# backfill_catalog.py
+# Fill in missing genre, year and track lists for discs already in the
+# catalog, without rescanning them. Lookups run concurrently under each
+# service's own rate limit; every finished row is checkpointed, and the
+# catalog (and CSV) are rewritten once, in a single transaction, at the end.
+#
+#   python backfill_catalog.py                      # genre, year and tracks
+#   python backfill_catalog.py --fields genre --limit 50
+#   python backfill_catalog.py --dry-run
+import argparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import musicbrainzngs as mb
+
+from catalog_manager import open_catalog
+from common_helper import clean_year
+from discogs_manager import GENRE_BACKFILL_PATH, get_discogs_token, search_discogs_by_artist_album
+from musicbrainz_manager import init_musicbrainz, mb_with_retry, release_genre
+
+# ---------------- CONFIG ----------------
+CSV_PATH = "data/cd_labels.csv"
+CATALOG_PATH = "data/catalog.db"
+CHECKPOINT_PATH = "data/backfill.checkpoint.jsonl"
+
+# MusicBrainz (1/s in musicbrainzngs) and Discogs (DISCOGS_MAX_REQUESTS_PER_MINUTE)
+# throttle themselves across threads; workers just keep both busy at once.
+BACKFILL_WORKERS = 4
+FIELDS = ("genre", "year", "tracks")
+# ---------------------------------------
+
+
+def needs(catalog, row, fields):
+    missing = set()
+    if "genre" in fields and not row["genre"]:
+        missing.add("genre")
+    if "year" in fields and not clean_year(row["year"]):
+        missing.add("year")
+    if "tracks" in fields and row["mbid"] and not catalog.has_tracks(row["mbid"]):
+        missing.add("tracks")
+    return missing
+
+
+def read_genre_queue(path=GENRE_BACKFILL_PATH):
+    """(key, line) for each entry queued by the scanners; key is the mbid or disc ID."""
+    if not Path(path).exists():
+        return []
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                e = json.loads(line)
+            except ValueError:
+                continue
+            entries.append((e.get("mbid") or e.get("disc_id"), line))
+    return entries
+
+
+def select_rows(catalog, fields, limit=None):
+    """Catalog rows missing any of fields, queued genre backfills first."""
+    rows = {r["id"]: r for r in catalog.iter_rows()}
+
+    queued = []
+    if "genre" in fields:
+        keys = {key for key, _ in read_genre_queue()}
+        queued = [i for i, r in rows.items() if (r["mbid"] or r["disc_id"]) in keys]
+
+    first = set(queued)
+    order = queued + [i for i in rows if i not in first]
+    selected = []
+    for i in order:
+        missing = needs(catalog, rows[i], fields)
+        if missing:
+            selected.append((rows[i], missing))
+            if limit and len(selected) >= limit:
+                break
+    return selected
+
+
+def enrich(row, missing, discogs_token):
+    """Look up what a row is missing. Returns (column updates, track titles or None)."""
+    updates = {}
+    tracks = None
+
+    if row["mbid"]:
+        try:
+            result = mb_with_retry(
+                mb.get_release_by_id,
+                row["mbid"],
+                includes=["recordings", "release-groups", "tags"],
+            )
+        except Exception as e:
+            print(f"  MusicBrainz lookup failed for {row['mbid']}: {e}")
+        else:
+            release = result["release"]
+            if "year" in missing and clean_year((release.get("date") or "")[:4]):
+                updates["year"] = clean_year(release["date"][:4])
+            if "genre" in missing and release_genre(release):
+                updates["genre"] = release_genre(release)
+            if "tracks" in missing:
+                tracks = [
+                    t["recording"]["title"]
+                    for medium in release.get("medium-list", [])
+                    for t in medium.get("track-list", [])
+                ]
+
+    still = {f for f in missing if f in ("genre", "year") and f not in updates}
+    if still and row["artist"] and row["album"]:
+        _, _, year, genre = search_discogs_by_artist_album(row["artist"], row["album"], token=discogs_token)
+        if "year" in still and clean_year(year):
+            updates["year"] = clean_year(year)
+        if "genre" in still and genre:
+            updates["genre"] = genre
+
+    return updates, tracks or None
+
+
+class Checkpoint:
+    """Rows already looked up, so an interrupted backfill resumes where it stopped."""
+
+    def __init__(self, path=CHECKPOINT_PATH):
+        self.path = Path(path)
+        self.done = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        e = json.loads(line)
+                    except ValueError:
+                        continue   # torn last line after a crash
+                    self.done[e["id"]] = e
+
+    def record(self, row, updates, tracks):
+        entry = {"id": row["id"], "mbid": row["mbid"], "updates": updates, "tracks": tracks}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.done[row["id"]] = entry
+
+    def clear(self):
+        self.path.unlink(missing_ok=True)
+
+
+def prune_genre_queue(catalog):
+    """Drop queued genre backfills whose rows now have a genre."""
+    path = Path(GENRE_BACKFILL_PATH)
+    if not path.exists():
+        return
+
+    have_genre = {r["mbid"] or r["disc_id"] for r in catalog.iter_rows() if r["genre"]}
+    keep = [line for key, line in read_genre_queue(path) if key not in have_genre]
+
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text("".join(keep), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def backfill(fields=FIELDS, workers=BACKFILL_WORKERS, limit=None, dry_run=False,
+             catalog_path=CATALOG_PATH, csv_path=CSV_PATH, checkpoint_path=CHECKPOINT_PATH):
+    catalog = open_catalog(catalog_path, csv_path)
+    checkpoint = Checkpoint(checkpoint_path)
+
+    todo = [(r, m) for r, m in select_rows(catalog, fields, limit) if r["id"] not in checkpoint.done]
+    print(f"{len(todo)} rows to backfill ({len(checkpoint.done)} already done in a previous run).")
+
+    if dry_run:
+        for r, missing in todo:
+            print(f"  {r['artist']} - {r['album']}: missing {', '.join(sorted(missing))}")
+        return 0
+
+    if todo:
+        init_musicbrainz()
+        token = get_discogs_token() if {"genre", "year"} & set(fields) else None
+
+        pool = ThreadPoolExecutor(max_workers=workers)
+        try:
+            futures = {pool.submit(enrich, r, m, token): r for r, m in todo}
+            for n, fut in enumerate(as_completed(futures), start=1):
+                row = futures[fut]
+                try:
+                    updates, tracks = fut.result()
+                except Exception as e:
+                    print(f"[{n}/{len(todo)}] {row['artist']} - {row['album']}: {e}")
+                    continue
+                checkpoint.record(row, updates, tracks)
+                found = ", ".join(f"{k}={v}" for k, v in updates.items())
+                if tracks:
+                    found += (", " if found else "") + f"{len(tracks)} tracks"
+                print(f"[{n}/{len(todo)}] {row['artist']} - {row['album']}: {found or 'nothing new'}")
+        finally:
+            # on Ctrl-C or an error, drop the queued lookups: nobody would checkpoint their results
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    # one transaction for the catalog, one atomic replace for the CSV
+    updates = {e["id"]: e["updates"] for e in checkpoint.done.values() if e["updates"]}
+    tracks = {e["mbid"]: e["tracks"] for e in checkpoint.done.values() if e["tracks"] and e["mbid"]}
+    catalog.update_rows(updates, tracks)
+    if updates:
+        imported, _ = catalog.sync_csv(csv_path)
+        if imported:
+            print(f"Kept {imported} CSV rows the catalog didn't have.")
+    prune_genre_queue(catalog)
+    checkpoint.clear()
+
+    print(f"Updated {len(updates)} rows, stored {len(tracks)} track lists.")
+    return len(updates)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill in missing genre/year/tracks for catalogued discs.")
+    parser.add_argument("--fields", nargs="+", choices=FIELDS, default=list(FIELDS))
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS)
+    parser.add_argument("--limit", type=int, help="at most this many rows this run")
+    parser.add_argument("--dry-run", action="store_true", help="only list the rows that would be looked up")
+    args = parser.parse_args()
+
+    backfill(args.fields, args.workers, args.limit, args.dry_run)
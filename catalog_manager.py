@@ -0,0 +1,336 @@
+# catalog_manager.py
+# SQLite catalog of scanned discs, indexed on mbid, disc ID, artist, genre
+# and scan time so lookups and label subsets don't need a full CSV load.
+# data/cd_labels.csv stays in sync for tools that expect the flat file.
+import csv
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+# ---------------- CONFIG ----------------
+CATALOG_PATH = "data/catalog.db"
+CSV_PATH = "data/cd_labels.csv"
+FOLLOW_POLL_SECONDS = 0.5   # --follow checks for new rows this often
+# ---------------------------------------
+
+COLUMNS = ["drive", "artist", "album", "year", "genre", "mbid", "disc_id", "copies", "scanned_at"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS discs (
+    id         INTEGER PRIMARY KEY,
+    drive      TEXT,
+    artist     TEXT COLLATE NOCASE,
+    album      TEXT,
+    year       TEXT,
+    genre      TEXT COLLATE NOCASE,
+    mbid       TEXT,
+    disc_id    TEXT,
+    copies     INTEGER NOT NULL DEFAULT 1,
+    scanned_at TEXT
+);
+CREATE INDEX IF NOT EXISTS discs_mbid ON discs (mbid);
+CREATE INDEX IF NOT EXISTS discs_disc_id ON discs (disc_id);
+CREATE INDEX IF NOT EXISTS discs_artist ON discs (artist);
+CREATE INDEX IF NOT EXISTS discs_genre ON discs (genre);
+CREATE INDEX IF NOT EXISTS discs_scanned_at ON discs (scanned_at);
+CREATE TABLE IF NOT EXISTS tracks (
+    mbid   TEXT PRIMARY KEY,
+    titles TEXT NOT NULL
+);
+"""
+
+
+def now_stamp():
+    return time.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _like_prefix(text):
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + "%"
+
+
+class Catalog:
+    def __init__(self, path=CATALOG_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.row_factory = sqlite3.Row
+        # WAL lets --follow readers poll while the scanner is writing
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM discs").fetchone()[0]
+
+    def max_id(self):
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM discs").fetchone()[0]
+
+    # ---------- WRITES ----------
+
+    def _insert(self, row):
+        values = {c: row.get(c) or None for c in COLUMNS}
+        values["copies"] = int(float(values["copies"] or 1))
+        cur = self.conn.execute(
+            f"INSERT INTO discs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+            [values[c] for c in COLUMNS],
+        )
+        return cur.lastrowid
+
+    def add(self, row):
+        with self.conn:
+            return self._insert({**row, "scanned_at": row.get("scanned_at") or now_stamp()})
+
+    def increment_copies(self, mbid=None, disc_id=None):
+        if mbid:
+            where, key = "mbid = ?", mbid
+        elif disc_id:
+            where, key = "disc_id = ?", disc_id
+        else:
+            return 0
+
+        with self.conn:
+            row = self.conn.execute(f"SELECT id FROM discs WHERE {where} ORDER BY id LIMIT 1", (key,)).fetchone()
+            if row is None:
+                return 0
+            self.conn.execute("UPDATE discs SET copies = copies + 1 WHERE id = ?", (row["id"],))
+            return self.conn.execute("SELECT copies FROM discs WHERE id = ?", (row["id"],)).fetchone()[0]
+
+    def update_rows(self, updates, tracks=None):
+        """Apply {row_id: {column: value}} and {mbid: [titles]} in one transaction."""
+        with self.conn:
+            for row_id, values in updates.items():
+                values = {c: v for c, v in values.items() if c in COLUMNS}
+                if values:
+                    self.conn.execute(
+                        f"UPDATE discs SET {', '.join(f'{c} = ?' for c in values)} WHERE id = ?",
+                        [*values.values(), row_id],
+                    )
+            for mbid, titles in (tracks or {}).items():
+                self._store_tracks(mbid, titles)
+
+    def _store_tracks(self, mbid, titles):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO tracks (mbid, titles) VALUES (?, ?)",
+            (mbid, json.dumps(titles, ensure_ascii=False)),
+        )
+
+    # ---------- QUERIES ----------
+
+    def iter_rows(self, mbid=None, disc_id=None, artist=None, genre=None, since=None, limit=None, after_id=None):
+        """Rows matching every given filter, in scan order.
+
+        artist is a case-insensitive prefix, genre a case-insensitive exact
+        match, since a "YYYY-MM-DD[ HH:MM:SS]" lower bound on scanned_at,
+        after_id a row id to start after.
+        """
+        clauses, params = [], []
+        if after_id:
+            clauses.append("id > ?")
+            params.append(after_id)
+        if mbid:
+            clauses.append("mbid = ?")
+            params.append(mbid)
+        if disc_id:
+            clauses.append("disc_id = ?")
+            params.append(disc_id)
+        if artist:
+            clauses.append("artist LIKE ? ESCAPE '\\'")
+            params.append(_like_prefix(artist))
+        if genre:
+            clauses.append("genre = ?")
+            params.append(genre)
+        if since:
+            clauses.append("scanned_at >= ?")
+            params.append(since)
+
+        sql = "SELECT * FROM discs"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+
+        for r in self.conn.execute(sql, params):
+            yield dict(r)
+
+    def find(self, **filters):
+        return list(self.iter_rows(**filters))
+
+    def has_tracks(self, mbid):
+        return self.conn.execute("SELECT 1 FROM tracks WHERE mbid = ?", (mbid,)).fetchone() is not None
+
+    def follow_rows(self, after_id=0, poll_interval=FOLLOW_POLL_SECONDS, **filters):
+        """Yield matching rows added after after_id, forever (like tail -f)."""
+        last = after_id
+        while True:
+            rows = self.find(after_id=last, **filters)
+            for r in rows:
+                last = r["id"]
+                yield r
+            if not rows:
+                time.sleep(poll_interval)
+
+    # ---------- CSV COMPATIBILITY ----------
+
+    def import_csv(self, csv_path=CSV_PATH):
+        """Add CSV rows whose disc ID (or MBID, for rows without one) isn't catalogued yet."""
+        path = Path(csv_path)
+        if not path.exists():
+            return 0
+
+        added = 0
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+
+        with self.conn:
+            for r in rows:
+                r = {k: (v or "").strip() for k, v in r.items() if k}
+                if r.get("disc_id"):
+                    exists = self.conn.execute("SELECT 1 FROM discs WHERE disc_id = ?", (r["disc_id"],)).fetchone()
+                elif r.get("mbid"):
+                    exists = self.conn.execute("SELECT 1 FROM discs WHERE mbid = ?", (r["mbid"],)).fetchone()
+                else:
+                    exists = self.conn.execute(
+                        "SELECT 1 FROM discs WHERE artist = ? AND album = ?", (r.get("artist"), r.get("album"))
+                    ).fetchone()
+                if exists:
+                    continue
+
+                self._insert(r)
+                added += 1
+        return added
+
+    def export_csv(self, csv_path=CSV_PATH, **filters):
+        path = Path(csv_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+
+        count = 0
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS)
+            writer.writeheader()
+            for r in self.iter_rows(**filters):
+                writer.writerow({c: "" if r[c] is None else r[c] for c in COLUMNS})
+                count += 1
+        os.replace(tmp, path)
+        return count
+
+    def sync_csv(self, csv_path=CSV_PATH):
+        """Rewrite the CSV from the catalog, first importing any rows only the CSV has.
+
+        Returns (rows imported, rows written). Rewriting from the catalog
+        alone would silently drop CSV rows the catalog never saw.
+        """
+        imported = self.import_csv(csv_path)
+        return imported, self.export_csv(csv_path)
+
+
+class FollowOffset:
+    """Last catalog row id a --follow consumer has finished with."""
+
+    def __init__(self, path, default=0):
+        self.path = Path(path)
+        try:
+            self.value = int(self.path.read_text(encoding="utf-8").strip())
+        except (FileNotFoundError, ValueError):
+            self.value = default
+
+    def save(self, row_id):
+        self.value = row_id
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(str(row_id), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+# ---------- TRACK LISTS ----------
+# Renderers run fetches on worker threads, so these open their own short
+# connection instead of sharing a Catalog.
+
+def cached_tracks(mbid, path=CATALOG_PATH):
+    """Track titles stored for a release, or None if they were never fetched."""
+    if not mbid or not Path(path).exists():
+        return None
+    conn = sqlite3.connect(str(path), timeout=10)
+    try:
+        row = conn.execute("SELECT titles FROM tracks WHERE mbid = ?", (mbid,)).fetchone()
+    except sqlite3.OperationalError:
+        return None   # catalog from before track lists were stored
+    finally:
+        conn.close()
+    return json.loads(row[0]) if row else None
+
+
+def remember_tracks(mbid, titles, path=CATALOG_PATH):
+    if not mbid or not titles:
+        return
+    catalog = Catalog(path)
+    try:
+        with catalog.conn:
+            catalog._store_tracks(mbid, titles)
+    finally:
+        catalog.close()
+
+
+def open_catalog(path=CATALOG_PATH, csv_path=CSV_PATH):
+    """Open the catalog, importing the CSV the first time it is used."""
+    catalog = Catalog(path)
+    if len(catalog) == 0 and csv_path:
+        added = catalog.import_csv(csv_path)
+        if added:
+            print(f"Catalog created from {csv_path}: {added} discs")
+    return catalog
+
+
+# ---------- COMMAND-LINE FILTERS ----------
+
+def add_query_arguments(parser):
+    group = parser.add_argument_group("catalog query (renders only matching discs)")
+    group.add_argument("--mbid")
+    group.add_argument("--disc-id")
+    group.add_argument("--artist", help="artist name prefix, case-insensitive")
+    group.add_argument("--genre")
+    group.add_argument("--since", help="scanned on or after YYYY-MM-DD")
+    group.add_argument("--today", action="store_true", help="scanned today")
+
+
+def query_from_args(args):
+    """Filters for Catalog.iter_rows from parsed arguments, or None if none were given."""
+    query = {
+        "mbid": args.mbid,
+        "disc_id": args.disc_id,
+        "artist": args.artist,
+        "genre": args.genre,
+        "since": time.strftime("%Y-%m-%d") if args.today else args.since,
+    }
+    query = {k: v for k, v in query.items() if v}
+    return query or None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query and sync the disc catalog.")
+    parser.add_argument("command", choices=["import", "export", "find"])
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--db", default=CATALOG_PATH)
+    add_query_arguments(parser)
+    args = parser.parse_args()
+
+    catalog = Catalog(args.db)
+    query = query_from_args(args) or {}
+
+    if args.command == "import":
+        print(f"Imported {catalog.import_csv(args.csv)} discs from {args.csv}")
+    elif args.command == "export":
+        print(f"Exported {catalog.export_csv(args.csv, **query)} discs to {args.csv}")
+    else:
+        for r in catalog.iter_rows(**query):
+            print(f"{r['scanned_at'] or '':<19}  {r['artist']} - {r['album']} ({r['year'] or ''}) "
+                  f"[{r['genre'] or ''}]  {r['mbid'] or ''}")
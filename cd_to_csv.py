@@ -1,31 +1,49 @@
 import time
 
-from file_manager import append_to_csv
+from file_manager import disc_row, increment_copies, save_disc_row
+from catalog_manager import open_catalog
+from seen_disc_manager import SeenDiscIndex
+from journal_manager import ScanJournal, DETECTED, RESOLVED, WRITTEN, EJECTED
 from drive_manager import (
     get_optical_drives,
     get_current_disc_id,
+    get_disc_toc,
     print_track_durations,
     eject_cd,
 )
 from musicbrainz_manager import (
     init_musicbrainz,
-    search_mb_by_artist_album,
     get_musicbrainz_metadata,
-    get_release_by_mbid,
 )
 from discogs_manager import (
     get_discogs_token,
     get_discogs_genre,
-    search_discogs_by_artist_album,
-)
-from common_helper import (
-    prompt_for_mbid_with_clipboard,
-    prompt_for_artist_album,
-    clean_year,
 )
+from review_queue_manager import REVIEW_QUEUE_PATH, CandidatePrefetcher, ReviewQueue, identify_manually
+from station_manager import station_journal
+from circuit_breaker import Deadline
 
 # ---------------- CONFIG ----------------
 CSV_PATH = "data/cd_labels.csv"
+CATALOG_PATH = "data/catalog.db"
+SEEN_PATH = "data/seen_discs.jsonl"
+JOURNAL_PATH = "data/scan_journal.jsonl"
+
+# Duplicate discs are always skipped; with COUNT_COPIES the catalog row's
+# "copies" column is incremented instead of ignoring the extra copy.
+COUNT_COPIES = False
+
+# Time budget per disc for automatic lookups. Once spent (or once Discogs
+# is failing), the genre is left blank and queued in data/genre_backfill.jsonl.
+DISC_DEADLINE_SECONDS = 20
+
+# Discs MusicBrainz can't identify are queued with their TOC and ejected
+# straight away, for one review pass at the end (python review_discs.py).
+# False: prompt for them as they come, holding up the other drives.
+DEFER_REVIEW = True
+
+POLL_SECONDS = 1            # pause between polls of all drives
+DRIVE_SETTLE_SECONDS = 2    # wait after a disc is detected before reading it
 # ---------------------------------------
 
 init_musicbrainz()
@@ -44,87 +62,172 @@ if not DRIVES:
 
 print(f"Detected optical drives: {', '.join(DRIVES)}")
 
-if __name__ == "__main__":
-    print("Waiting for CD insertion on all drives...")
+# ---------- CATALOG ----------
 
-    last_disc_ids = {drive: None for drive in DRIVES}
+CATALOG = open_catalog(CATALOG_PATH, CSV_PATH)
 
-    while True:
-        try:
-            for drive in DRIVES:
-                current_disc_id = get_current_disc_id(drive)
-                last_disc_id = last_disc_ids[drive]
+# with station_manager.STATION set, rows also go to this station's journal
+# for merge_stations.py
+STATION_JOURNAL = station_journal()
 
-                if current_disc_id and current_disc_id != last_disc_id:
-                    print(f"\n[{drive}] CD detected. Processing...")
-                    time.sleep(2)
+# ---------- REVIEW QUEUE ----------
 
-                    artist, album, year, mbid = get_musicbrainz_metadata(drive)
-                    genre = ""
+REVIEW = ReviewQueue(REVIEW_QUEUE_PATH)
+PREFETCHER = CandidatePrefetcher(REVIEW)
 
-                    if not artist:
-                        print(f"[{drive}] Not found by disc ID.")
 
-                        # 1. Print track durations
-                        print_track_durations(drive)
+def handle_duplicate(drive, disc_id, mbid, seen):
+    print(f"[{drive}] Duplicate: disc already catalogued. Skipping.")
 
-                        # 2. Eject tray so user can grab disc + work
-                        eject_cd(drive)
-                        print(f"[{drive}] CD tray ejected.")
+    if COUNT_COPIES:
+        mbid = mbid or seen.mbid_for_disc(disc_id)
+        CATALOG.increment_copies(mbid=mbid, disc_id=disc_id)
+        copies = increment_copies(CSV_PATH, mbid=mbid, disc_id=disc_id)
+        if STATION_JOURNAL:
+            STATION_JOURNAL.copy(disc_id, mbid)
+        if copies:
+            print(f"[{drive}] Copies of this release: {copies}")
 
-                        # 3. Prompt for MBID (clipboard first)
-                        mbid_input = prompt_for_mbid_with_clipboard()
-                        if mbid_input:
-                            artist, album, year, mbid = get_release_by_mbid(mbid_input)
+    seen.add(disc_id, mbid)
+    eject_cd(drive)
+    print(f"[{drive}] CD tray ejected.")
 
-                        # 4. Artist/Album fallback
-                        if not artist:
-                            user_artist, user_album = prompt_for_artist_album()
 
-                            if user_artist and user_album:
-                                artist, album, year, mbid = search_mb_by_artist_album(user_artist, user_album)
+def defer_for_review(drive, disc_id):
+    """Queue an unidentified disc (candidates are looked up in the background) and eject it."""
+    toc_disc_id, toc = get_disc_toc(drive)
+    # a failed re-read still queues the disc ID already read, without a TOC
+    disc_id = toc_disc_id or disc_id
+    queued = bool(disc_id) and REVIEW.add(disc_id, toc, drive=drive)
+    if queued and toc:
+        PREFETCHER.submit(disc_id, toc)
+    eject_cd(drive)
 
-                                if not artist:
-                                    artist, album, year, genre = search_discogs_by_artist_album(
-                                        user_artist,
-                                        user_album,
-                                        token=DISCOGS_TOKEN
-                                    )
+    if queued:
+        print(f"[{drive}] Not found by disc ID; queued for review ({len(REVIEW)} waiting). CD tray ejected.")
+    elif disc_id:
+        print(f"[{drive}] Not found by disc ID; already waiting for review. CD tray ejected.")
+    else:
+        print(f"[{drive}] Not found and no disc ID could be read; NOT queued for review. CD tray ejected.")
 
-                        if not artist:
-                            print(f"[{drive}] No match found. Skipping.")
-                            last_disc_ids[drive] = current_disc_id
-                            continue
 
+def resume_journal(journal, seen):
+    for entry in journal.pending():
+        row = entry["row"]
+        disc_id = entry["disc_id"]
+        if not seen.has_disc(disc_id):
+            save_disc_row(row, CATALOG, CSV_PATH, STATION_JOURNAL)
+            seen.add(disc_id, row.get("mbid"))
+            print(f"Recovered from journal: {row['artist']} - {row['album']}")
+        journal.record(disc_id, WRITTEN, drive=entry.get("drive"))
 
+    for entry in journal.unresolved():
+        print(f"Needs rescanning (interrupted before lookup finished): disc {entry['disc_id']} in {entry.get('drive')}")
 
-                    if not genre:
-                        genre = get_discogs_genre(artist, album, token=DISCOGS_TOKEN)
+    journal.compact()
 
-                    year_clean = clean_year(year)
 
-                    row = {
-                        "drive": drive,
-                        "artist": artist,
-                        "album": album,
-                        "year": year_clean,
-                        "genre": genre,
-                        "mbid": mbid
-                    }
+def process_disc(drive, current_disc_id, seen, journal):
+    """Identify, catalogue and eject one newly inserted disc."""
+    if seen.has_disc(current_disc_id):
+        handle_duplicate(drive, current_disc_id, None, seen)
+        return
 
-                    print(f"[{drive}] Identified:")
-                    print(row)
+    print(f"\n[{drive}] CD detected. Processing...")
+    journal.record(current_disc_id, DETECTED, drive=drive)
+    time.sleep(DRIVE_SETTLE_SECONDS)
 
-                    append_to_csv(row, CSV_PATH)
-                    print(f"[{drive}] Saved to {CSV_PATH}")
+    deadline = Deadline(DISC_DEADLINE_SECONDS)
+    artist, album, year, mbid, genre = get_musicbrainz_metadata(drive, deadline=deadline)
+    genre_deferred = False
 
-                    eject_cd(drive)
-                    print(f"[{drive}] CD tray ejected.")
+    if not artist and DEFER_REVIEW:
+        defer_for_review(drive, current_disc_id)
+        journal.record(current_disc_id, EJECTED, drive=drive, skipped=True)
+        return
 
-                    last_disc_ids[drive] = current_disc_id
+    if not artist:
+        print(f"[{drive}] Not found by disc ID.")
 
-            time.sleep(1)
+        # 1. Print track durations
+        print_track_durations(drive)
 
-        except Exception as e:
-            print("Error:", e)
-            time.sleep(2)
+        # 2. Eject tray so user can grab disc + work
+        eject_cd(drive)
+        print(f"[{drive}] CD tray ejected.")
+
+        # 3. MBID (clipboard first), local index, then artist/album search
+        artist, album, year, mbid, genre = identify_manually(DISCOGS_TOKEN)
+
+        # time spent at the prompts doesn't count against the budget
+        deadline = Deadline(DISC_DEADLINE_SECONDS)
+
+        if not artist:
+            print(f"[{drive}] No match found. Skipping.")
+            journal.record(current_disc_id, EJECTED, drive=drive, skipped=True)
+            return
+
+    if seen.has_mbid(mbid):
+        handle_duplicate(drive, current_disc_id, mbid, seen)
+        journal.record(current_disc_id, EJECTED, drive=drive, skipped=True)
+        return
+
+    # Discogs only when the MusicBrainz tags gave no genre
+    if not genre:
+        genre = get_discogs_genre(artist, album, token=DISCOGS_TOKEN, deadline=deadline)
+        if genre is None:
+            print(f"[{drive}] Genre lookup skipped; queued for backfill.")
+            genre = ""
+            genre_deferred = True
+
+    row = disc_row(drive, artist, album, year, genre, mbid, current_disc_id)
+
+    print(f"[{drive}] Identified:")
+    print(row)
+    journal.record(current_disc_id, RESOLVED, drive=drive, row=row)
+
+    save_disc_row(row, CATALOG, CSV_PATH, STATION_JOURNAL, genre_deferred)
+    print(f"[{drive}] Saved to {CATALOG_PATH} and {CSV_PATH}")
+    seen.add(current_disc_id, mbid)
+    journal.record(current_disc_id, WRITTEN, drive=drive)
+
+    eject_cd(drive)
+    print(f"[{drive}] CD tray ejected.")
+    journal.record(current_disc_id, EJECTED, drive=drive)
+
+
+def main(stop=None):
+    """Poll every drive until stop() returns true (forever by default)."""
+    print("Waiting for CD insertion on all drives...")
+
+    last_disc_ids = {drive: None for drive in DRIVES}
+    seen = SeenDiscIndex(SEEN_PATH, csv_path=CSV_PATH)
+    print(f"Known discs: {len(seen)}")
+    journal = ScanJournal(JOURNAL_PATH)
+    resume_journal(journal, seen)
+    # candidates for discs left in the queue by an earlier session
+    PREFETCHER.prefetch_pending()
+
+    try:
+        while stop is None or not stop():
+            try:
+                for drive in DRIVES:
+                    current_disc_id = get_current_disc_id(drive)
+
+                    if current_disc_id and current_disc_id != last_disc_ids[drive]:
+                        process_disc(drive, current_disc_id, seen, journal)
+                        last_disc_ids[drive] = current_disc_id
+
+                time.sleep(POLL_SECONDS)
+
+            except Exception as e:
+                print("Error:", e)
+                time.sleep(2)
+    finally:
+        PREFETCHER.shutdown(wait=False)
+        if len(REVIEW):
+            print(f"\n{len(REVIEW)} disc(s) waiting for review: python review_discs.py")
+
+
+if __name__ == "__main__":
+    main()
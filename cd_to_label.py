@@ -1,7 +1,11 @@
-import time, os, win32ui
+import time, os
+import queue
 from pathlib import Path
-from PIL import Image, ImageWin
 from label_image_manager import generate_label_image
+from printer_manager import as_pool, get_printer
+from render_service import RenderServiceError, render_remote
+from seen_disc_manager import SeenDiscIndex
+from journal_manager import ScanJournal, DETECTED, RESOLVED, PRINTED, EJECTED
 from drive_manager import (
     get_optical_drives,
     get_current_disc_id,
@@ -17,10 +21,13 @@ from musicbrainz_manager import (
 from discogs_manager import (
     get_discogs_token,
     get_discogs_genre,
+    queue_genre_backfill,
     search_discogs_by_artist_album,
 )
+from circuit_breaker import Deadline
 from common_helper import (
     prompt_for_mbid_with_clipboard,
+    prompt_for_local_release,
     prompt_for_artist_album,
     clean_year,
 )
@@ -29,6 +36,22 @@ from common_helper import (
 DEBUG = False
 OUT_DIR = "data/auto_labels"
 PRINTER_NAME = "DYMO LabelWriter 4XL"
+# None uses printer_manager.PRINTER_BACKEND. Several printers share the work
+# with e.g. "pool:win32:DYMO LabelWriter 4XL,win32:DYMO LabelWriter 4XL (Copy 1)";
+# labels print in the background either way, so the next disc is scanned meanwhile.
+PRINTER_BACKEND = None
+RENDER_SERVER = None   # e.g. "http://127.0.0.1:8765" to print through a running render_service.py
+SEEN_PATH = "data/printed_discs.jsonl"
+JOURNAL_PATH = "data/label_journal.jsonl"
+REPRINT_DUPLICATES = False   # print again when a disc that already has a label is inserted
+
+# Time budget per disc for automatic lookups. Once spent (or once Discogs
+# is failing), the genre is left blank and queued in data/genre_backfill.jsonl.
+DISC_DEADLINE_SECONDS = 20
+
+POLL_SECONDS = 1            # pause between polls of all drives
+DRIVE_SETTLE_SECONDS = 2    # wait after a disc is detected before reading it
+PRINT_DRAIN_SECONDS = 60    # on exit, wait at most this long for queued labels
 
 # ================================================
 
@@ -49,102 +72,208 @@ print(f"Detected optical drives: {', '.join(DRIVES)}")
 
 # ===================== PRINTING =====================
 
-def print_image_to_dymo(image_path, printer_name=PRINTER_NAME):
-    img = Image.open(image_path)
+PRINTERS = None
+PRINTING = {}                   # disc_id -> drive, labels queued but not yet printed
+PRINT_RESULTS = queue.Queue()   # (drive, disc_id, row, label_path, ejected, error) from the printer threads
 
-    hdc = win32ui.CreateDC()
-    hdc.CreatePrinterDC(printer_name)
 
-    hdc.StartDoc("CD Label")
-    hdc.StartPage()
+def printers():
+    global PRINTERS
+    if PRINTERS is None:
+        PRINTERS = as_pool(get_printer(PRINTER_BACKEND, PRINTER_NAME))
+        print(f"Printing to {PRINTERS.name}")
+    return PRINTERS
 
-    dib = ImageWin.Dib(img)
-
-    width = hdc.GetDeviceCaps(8)
-    height = hdc.GetDeviceCaps(10)
-
-    dib.draw(hdc.GetHandleOutput(), (0, 0, width, height))
-
-    hdc.EndPage()
-    hdc.EndDoc()
-    hdc.DeleteDC()
-
-
-# ===================== MAIN LOOP =====================
-
-if __name__ == "__main__":
-    print("Waiting for CD insertion on any drive...")
-
-    last_disc_ids = {drive: None for drive in DRIVES}
 
+def print_label(drive, disc_id, row, ejected=False):
+    """Queue the label; finish_prints() records it once it has printed."""
+    if RENDER_SERVER and not DEBUG:
+        try:
+            render_remote("cd", row, print_label=True, server=RENDER_SERVER)
+            print(f"[{drive}] Label printed by render service.")
+            PRINTING[disc_id] = drive
+            PRINT_RESULTS.put((drive, disc_id, row, None, ejected, None))
+            return
+        except RenderServiceError as e:
+            print(f"[{drive}] {e}; rendering locally.")
+
+    label_path = generate_label_image(
+        row["artist"], row["album"], row["year"], row["genre"], row["mbid"]
+    )
+
+    print(f"[{drive}] Label generated: {label_path}")
+
+    time.sleep(1)
+    PRINTING[disc_id] = drive
+    if DEBUG:
+        PRINT_RESULTS.put((drive, disc_id, row, None, ejected, None))
+        return
+
+    future = printers().submit(label_path, doc_name="CD Label")
+    future.add_done_callback(
+        lambda f: PRINT_RESULTS.put((drive, disc_id, row, label_path, ejected, f.exception()))
+    )
+
+
+def finish_prints(seen, journal):
+    """Record the labels that have printed since the last call (main thread only)."""
     while True:
         try:
-            for drive in DRIVES:
-                current_disc_id = get_current_disc_id(drive)
-                last_disc_id = last_disc_ids[drive]
-
-                if current_disc_id and current_disc_id != last_disc_id:
-                    print(f"[{drive}] CD detected. Reading metadata...")
-
-                    time.sleep(2)  # drive settle
-
-                    artist, album, year, mbid = get_musicbrainz_metadata(drive)
-                    genre = ""
-
-                    if not artist:
-                        print(f"[{drive}] Not found in MusicBrainz.")
-                        print_track_durations(drive)
-                        eject_cd(drive)
-
-                        mbid_input = prompt_for_mbid_with_clipboard()
-                        if mbid_input:
-                            artist, album, year, mbid = get_release_by_mbid(mbid_input)
-
-                        if not artist:
-                            user_artist, user_album = prompt_for_artist_album()
-                            if user_artist and user_album:
-                                artist, album, year, mbid = search_mb_by_artist_album(user_artist, user_album)
-                                if not artist:
-                                    artist, album, year, genre = search_discogs_by_artist_album(
-                                        user_artist,
-                                        user_album,
-                                        token=DISCOGS_TOKEN
-                                    )
-
-                        if not artist:
-                            print(f"[{drive}] Not found in any source. Ejecting.")
-                            last_disc_ids[drive] = current_disc_id
-                            continue
-
-                    if not genre:
-                        genre = get_discogs_genre(artist, album, token=DISCOGS_TOKEN)
-                    year_clean = clean_year(year)
-
-                    print(f"[{drive}] {artist} - {album} ({year_clean}) [{genre}]")
-
-                    label_path = generate_label_image(
-                        artist, album, year_clean, genre, mbid
-                    )
-
-                    print(f"[{drive}] Label generated: {label_path}")
+            drive, disc_id, row, label_path, ejected, error = PRINT_RESULTS.get_nowait()
+        except queue.Empty:
+            return
+        PRINTING.pop(disc_id, None)
+
+        if error:
+            # stays RESOLVED in the journal, so it prints again on the next start
+            print(f"[{drive}] Label for {row['artist']} - {row['album']} failed: {error}")
+            continue
+
+        if label_path:
+            try:
+                os.remove(label_path)
+            except:
+                pass
+        seen.add(disc_id, row.get("mbid"))
+        journal.record(disc_id, PRINTED, drive=drive)
+        if ejected:
+            journal.record(disc_id, EJECTED, drive=drive)
+        print(f"[{drive}] Label printed: {row['artist']} - {row['album']}")
+
+
+def resume_journal(journal, seen):
+    for entry in journal.pending():
+        row = entry["row"]
+        disc_id = entry["disc_id"]
+        if seen.has_disc(disc_id):
+            journal.record(disc_id, PRINTED, drive=entry.get("drive"))
+        else:
+            print(f"Recovered from journal: {row['artist']} - {row['album']}")
+            print_label(entry.get("drive"), disc_id, row)
+
+    for entry in journal.unresolved():
+        print(f"Needs rescanning (interrupted before lookup finished): disc {entry['disc_id']} in {entry.get('drive')}")
+
+    journal.compact()
 
-                    time.sleep(1)
-                    if not DEBUG:
-                        print_image_to_dymo(label_path)
-                        try:
-                            os.remove(label_path)
-                        except:
-                            pass                    
-                    print(f"[{drive}] Label printed.")
 
-                    time.sleep(1)
-                    eject_cd(drive)
-                    print(f"[{drive}] CD tray ejected.")
+# ===================== MAIN LOOP =====================
 
-                    last_disc_ids[drive] = current_disc_id
+def process_disc(drive, current_disc_id, seen, journal):
+    """Identify one newly inserted disc, print its label and eject it."""
+    if (seen.has_disc(current_disc_id) or current_disc_id in PRINTING) and not REPRINT_DUPLICATES:
+        print(f"[{drive}] Duplicate: label already printed. Ejecting.")
+        eject_cd(drive)
+        return
+
+    print(f"[{drive}] CD detected. Reading metadata...")
+    journal.record(current_disc_id, DETECTED, drive=drive)
+
+    time.sleep(DRIVE_SETTLE_SECONDS)  # drive settle
+
+    deadline = Deadline(DISC_DEADLINE_SECONDS)
+    artist, album, year, mbid, genre = get_musicbrainz_metadata(drive, deadline=deadline)
+    genre_deferred = False
+
+    if not artist:
+        print(f"[{drive}] Not found in MusicBrainz.")
+        print_track_durations(drive)
+        eject_cd(drive)
+
+        mbid_input = prompt_for_mbid_with_clipboard()
+        if mbid_input:
+            artist, album, year, mbid, genre = get_release_by_mbid(mbid_input)
+
+        if not artist:
+            artist, album, year, mbid = prompt_for_local_release()
+
+        if not artist:
+            user_artist, user_album = prompt_for_artist_album()
+            if user_artist and user_album:
+                artist, album, year, mbid = search_mb_by_artist_album(user_artist, user_album)
+                if not artist:
+                    artist, album, year, genre = search_discogs_by_artist_album(
+                        user_artist,
+                        user_album,
+                        token=DISCOGS_TOKEN
+                    )
 
-            time.sleep(1)
+        # time spent at the prompts doesn't count against the budget
+        deadline = Deadline(DISC_DEADLINE_SECONDS)
+
+        if not artist:
+            print(f"[{drive}] Not found in any source. Ejecting.")
+            journal.record(current_disc_id, EJECTED, drive=drive, skipped=True)
+            return
+
+    # Discogs only when the MusicBrainz tags gave no genre
+    if not genre:
+        genre = get_discogs_genre(artist, album, token=DISCOGS_TOKEN, deadline=deadline)
+        if genre is None:
+            print(f"[{drive}] Genre lookup skipped; queued for backfill.")
+            genre = ""
+            genre_deferred = True
+    year_clean = clean_year(year)
+
+    print(f"[{drive}] {artist} - {album} ({year_clean}) [{genre}]")
+
+    row = {
+        "artist": artist,
+        "album": album,
+        "year": year_clean,
+        "genre": genre,
+        "mbid": mbid,
+    }
+    journal.record(current_disc_id, RESOLVED, drive=drive, row=row)
+    if genre_deferred:
+        queue_genre_backfill(row)
+
+    # PRINTED and EJECTED are journalled once the label is out, so a crash
+    # while it is still queued replays it from the RESOLVED entry
+    print_label(drive, current_disc_id, row, ejected=True)
+
+    time.sleep(1)
+    eject_cd(drive)
+    print(f"[{drive}] CD tray ejected.")
+
+
+def main(stop=None):
+    """Poll every drive until stop() returns true (forever by default)."""
+    print("Waiting for CD insertion on any drive...")
 
-        except Exception as e:
-            print("Error:", e)
-            time.sleep(2)
+    last_disc_ids = {drive: None for drive in DRIVES}
+    seen = SeenDiscIndex(SEEN_PATH)
+    journal = ScanJournal(JOURNAL_PATH)
+    resume_journal(journal, seen)
+
+    try:
+        while stop is None or not stop():
+            try:
+                for drive in DRIVES:
+                    current_disc_id = get_current_disc_id(drive)
+
+                    if current_disc_id and current_disc_id != last_disc_ids[drive]:
+                        process_disc(drive, current_disc_id, seen, journal)
+                        last_disc_ids[drive] = current_disc_id
+
+                finish_prints(seen, journal)
+                time.sleep(POLL_SECONDS)
+
+            except Exception as e:
+                print("Error:", e)
+                time.sleep(2)
+    finally:
+        if PRINTING and PRINTERS is not None:
+            print(f"Waiting up to {PRINT_DRAIN_SECONDS}s for {len(PRINTING)} label(s) to finish printing...")
+            deadline = time.monotonic() + PRINT_DRAIN_SECONDS
+            # short waits, so Ctrl-C still gets through on Windows
+            while not PRINTERS.join(timeout=1) and time.monotonic() < deadline:
+                pass
+        finish_prints(seen, journal)
+        for disc_id, drive in PRINTING.items():
+            # still RESOLVED in the journal, so resume_journal prints it on the next start
+            print(f"[{drive}] Label for disc {disc_id} not printed; it will print on the next start.")
+
+
+if __name__ == "__main__":
+    main()
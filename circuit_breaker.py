@@ -0,0 +1,145 @@
+# circuit_breaker.py
+# Shared per-service circuit breakers, rate limiters and per-disc latency
+# budgets, so a degraded MusicBrainz/Discogs/TMDb fails fast instead of
+# stalling every drive through a full retry/backoff cycle.
+import threading
+import time
+
+# ---------------- CONFIG ----------------
+FAILURE_THRESHOLD = 3     # consecutive failures before the breaker opens
+RESET_TIMEOUT = 60.0      # seconds open before a single trial call is allowed
+# ---------------------------------------
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_thread = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                self._trial_thread = threading.get_ident()
+                return True
+            return False
+
+    def release_trial(self):
+        """Give back a half-open trial this thread took without recording a verdict.
+
+        Call it in a finally after allow()/check(): a trial abandoned on a
+        429 or an expired deadline would otherwise keep the circuit shut for
+        the rest of the process. No-op when this thread holds no trial.
+        """
+        with self._lock:
+            if self._trial_in_flight and self._trial_thread == threading.get_ident():
+                self._trial_in_flight = False
+                self._trial_thread = None
+
+    def check(self):
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} unavailable (circuit open); skipping call")
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                print(f"{self.name}: service recovered, circuit closed.")
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+            self._trial_thread = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            self._trial_thread = None
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    print(f"{self.name}: {self.failures} failures, circuit open for {self.reset_timeout:.0f}s.")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return self.state == OPEN and time.monotonic() - self.opened_at < self.reset_timeout
+
+
+_BREAKERS = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_breaker(name):
+    with _BREAKERS_LOCK:
+        if name not in _BREAKERS:
+            _BREAKERS[name] = CircuitBreaker(name)
+        return _BREAKERS[name]
+
+
+def breaker_states():
+    with _BREAKERS_LOCK:
+        return {name: b.state for name, b in _BREAKERS.items()}
+
+
+class RateLimiter:
+    """Spaces calls to one service evenly across threads."""
+
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self, calls=1):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval * calls
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Deadline:
+    """Latency budget for one disc; None seconds means unlimited."""
+
+    def __init__(self, seconds=None):
+        self.expires_at = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self):
+        if self.expires_at is None:
+            return float("inf")
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def check(self, what="lookup"):
+        if self.expired():
+            raise DeadlineExceeded(f"Disc time budget exhausted before {what}")
+
+    def allows_wait(self, seconds):
+        return self.remaining() > seconds
@@ -1,6 +1,8 @@
 import win32clipboard
 import re
 
+from release_index_manager import get_release_index
+
 
 def get_clipboard_text():
     try:
@@ -58,6 +60,38 @@ def prompt_for_mbid_with_clipboard(input_func=input, print_func=print):
     print_func("No valid MBID found in clipboard.")
     return None
 
+
+def prompt_for_local_release(input_func=input, print_func=print, limit=8):
+    index = get_release_index()
+    if not len(index):
+        return None, None, None, None
+
+    print_func(f"\nSearch {len(index)} known releases locally.")
+    print_func("Type part of the artist/album, pick a number, or press Enter to skip.")
+
+    shown = []
+    while True:
+        raw = input_func("Local search: ").strip()
+        if not raw:
+            return None, None, None, None
+
+        if raw.isdigit() and shown:
+            idx = int(raw)
+            if 1 <= idx <= len(shown):
+                e = shown[idx - 1]
+                return e["artist"], e["album"], e["year"], e["mbid"] or None
+            print_func("Invalid selection.")
+            continue
+
+        shown = [e for _, e in index.search(raw, limit=limit)]
+        if not shown:
+            print_func("No local candidates. Refine or press Enter to search online.")
+            continue
+
+        for i, e in enumerate(shown, start=1):
+            year = f" ({e['year']})" if e["year"] else ""
+            print_func(f"{i:2d}. {e['artist']} - {e['album']}{year}")
+
    
 def prompt_for_artist_album():
     print("\nMetadata not found. Please enter artist and album to search.")
@@ -0,0 +1,150 @@
+# cover_art_manager.py
+# Front covers from the Cover Art Archive, pre-shrunk into a local
+# content-addressed cache. Prefetching is the only thing that touches the
+# network; renderers only ever look covers up in the cache.
+#
+#   data/cover_cache/objects/ab/ab12...ef.png   thumbnail, named by its SHA-256
+#   data/cover_cache/refs/<mbid>                that hash, or empty: no cover
+#
+# Reissues and box-set discs often share artwork, so identical thumbnails
+# are stored once however many releases point at them.
+import hashlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from PIL import Image, ImageOps
+
+from circuit_breaker import RateLimiter, get_breaker
+
+# ---------------- CONFIG ----------------
+COVER_ART_BASE = "https://coverartarchive.org"
+COVER_CACHE_DIR = "data/cover_cache"
+COVER_SOURCE_SIZE = 500     # CAA thumbnail to download (250, 500 or 1200)
+COVER_SIZE = 250            # pixels on the label (same as the QR code)
+COVER_MODE = "1"            # "1": dithered for the thermal head, "L": grayscale
+COVER_WORKERS = 4
+COVER_MAX_REQUESTS_PER_SECOND = 5
+# ---------------------------------------
+
+_RATE_LIMITER = RateLimiter(COVER_MAX_REQUESTS_PER_SECOND)
+
+
+def _ref_path(mbid, cache_dir=COVER_CACHE_DIR):
+    return Path(cache_dir) / "refs" / mbid
+
+
+def _object_path(digest, cache_dir=COVER_CACHE_DIR):
+    return Path(cache_dir) / "objects" / digest[:2] / f"{digest}.png"
+
+
+def _write_atomic(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def cover_path(mbid, cache_dir=COVER_CACHE_DIR):
+    """Cached thumbnail for a release, or None (not prefetched, or no cover art)."""
+    if not mbid:
+        return None
+    try:
+        digest = _ref_path(mbid, cache_dir).read_text(encoding="ascii").strip()
+    except (FileNotFoundError, OSError):
+        return None
+    if not digest:
+        return None
+    path = _object_path(digest, cache_dir)
+    return str(path) if path.exists() else None
+
+
+def make_thumbnail(img, size=COVER_SIZE, mode=COVER_MODE):
+    img = ImageOps.exif_transpose(img).convert("L")
+    img = ImageOps.autocontrast(ImageOps.contain(img, (size, size), Image.LANCZOS))
+    # Floyd-Steinberg here, once, so the printer's plain threshold keeps the shading
+    return img.convert("1") if mode == "1" else img
+
+
+def store_thumbnail(mbid, img, cache_dir=COVER_CACHE_DIR):
+    buf = io.BytesIO()
+    make_thumbnail(img).save(buf, format="PNG", optimize=True)
+    data = buf.getvalue()
+    digest = hashlib.sha256(data).hexdigest()
+
+    obj = _object_path(digest, cache_dir)
+    if not obj.exists():
+        _write_atomic(obj, data)
+    _write_atomic(_ref_path(mbid, cache_dir), digest.encode("ascii"))
+    return str(obj)
+
+
+def prefetch_cover(mbid, refresh=False, cache_dir=COVER_CACHE_DIR):
+    """Download and cache one release's front cover; returns the cached path or None."""
+    if not mbid:
+        return None
+    if not refresh and _ref_path(mbid, cache_dir).exists():
+        return cover_path(mbid, cache_dir)
+
+    breaker = get_breaker("Cover Art Archive")
+    if not breaker.allow():
+        return None
+
+    try:
+        try:
+            _RATE_LIMITER.wait()
+            r = requests.get(f"{COVER_ART_BASE}/release/{mbid}/front-{COVER_SOURCE_SIZE}", timeout=20)
+            if r.status_code == 404:
+                # no artwork uploaded; remembered so prefetch doesn't ask every run
+                breaker.record_success()
+                _write_atomic(_ref_path(mbid, cache_dir), b"")
+                return None
+            if 400 <= r.status_code < 500 and r.status_code != 429:
+                # a bad MBID, say: the archive is healthy, only this release is skipped
+                breaker.record_success()
+                print(f"Cover art for {mbid} rejected: HTTP {r.status_code}")
+                return None
+            r.raise_for_status()
+            img = Image.open(io.BytesIO(r.content))
+            img.load()
+        except requests.RequestException as e:
+            breaker.record_failure()
+            print(f"Cover art for {mbid} failed: {e}")
+            return None
+        except OSError as e:
+            breaker.record_success()
+            print(f"Cover art for {mbid} is not a readable image: {e}")
+            return None
+        breaker.record_success()
+    finally:
+        breaker.release_trial()
+
+    return store_thumbnail(mbid, img, cache_dir)
+
+
+def prefetch_covers(mbids, workers=COVER_WORKERS, refresh=False, cache_dir=COVER_CACHE_DIR):
+    """Fill the cache for many releases; returns (cached, without cover)."""
+    mbids = sorted({m for m in mbids if m})
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        paths = list(pool.map(lambda m: prefetch_cover(m, refresh, cache_dir), mbids))
+    found = sum(1 for p in paths if p)
+    return found, len(mbids) - found
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from catalog_manager import CATALOG_PATH, CSV_PATH, add_query_arguments, open_catalog, query_from_args
+
+    parser = argparse.ArgumentParser(description="Prefetch Cover Art Archive thumbnails for catalogued discs.")
+    parser.add_argument("--refresh", action="store_true", help="download again, including releases without art")
+    parser.add_argument("--workers", type=int, default=COVER_WORKERS)
+    add_query_arguments(parser)
+    args = parser.parse_args()
+
+    catalog = open_catalog(CATALOG_PATH, CSV_PATH)
+    mbids = [r["mbid"] for r in catalog.iter_rows(**(query_from_args(args) or {}))]
+    found, missing = prefetch_covers(mbids, args.workers, args.refresh)
+    print(f"{found} covers cached, {missing} releases without cover art.")
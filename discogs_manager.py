@@ -1,6 +1,17 @@
 import discogs_client
+import json
 import os
+from pathlib import Path
 from dotenv import load_dotenv
+
+from circuit_breaker import RateLimiter, get_breaker
+
+# Rows whose genre lookup was skipped (Discogs down or disc out of time)
+GENRE_BACKFILL_PATH = "data/genre_backfill.jsonl"
+
+# Discogs allows 60 authenticated requests a minute; shared across threads
+DISCOGS_MAX_REQUESTS_PER_MINUTE = 55
+_RATE_LIMITER = RateLimiter(DISCOGS_MAX_REQUESTS_PER_MINUTE / 60)
 
 _DISCOGS_TOKEN = None
 
@@ -28,38 +39,71 @@ def get_discogs_token():
     _DISCOGS_TOKEN = token
     return _DISCOGS_TOKEN
 
-def get_discogs_genre(artist, album, token=None):
-    token = token or get_discogs_token()
-    d = discogs_client.Client("CDLabeler/1.0", user_token=token)
+def get_discogs_genre(artist, album, token=None, deadline=None):
+    """Genre of the first Discogs match, or "" when unknown.
 
-    try:
-        results = d.search(artist=artist, release_title=album, type="release")
-    except Exception:
-        return ""
+    Returns None when the lookup was skipped because the Discogs circuit is
+    open or the disc's deadline has passed, so callers can queue a backfill.
+    """
+    breaker = get_breaker("Discogs")
+    if (deadline and deadline.expired()) or not breaker.allow():
+        return None
 
-    if results:
-        r = results[0]
-        if r.genres:
-            return r.genres[0]
+    try:
+        token = token or get_discogs_token()
+        d = discogs_client.Client("CDLabeler/1.0", user_token=token)
+
+        # r.genres is lazy: it may fetch the full release, so it stays inside the try
+        try:
+            _RATE_LIMITER.wait(2)   # search page + release
+            results = d.search(artist=artist, release_title=album, type="release")
+            genres = results[0].genres if results else None
+        except Exception:
+            breaker.record_failure()
+            return None
+        breaker.record_success()
+    finally:
+        breaker.release_trial()
+
+    if genres:
+        return genres[0]
 
     return ""
 
-def search_discogs_by_artist_album(artist, album, token=None):
-    token = token or get_discogs_token()
-    d = discogs_client.Client("CDLabeler/1.0", user_token=token)
+def queue_genre_backfill(row, path=GENRE_BACKFILL_PATH):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    entry = {k: row.get(k, "") for k in ("mbid", "disc_id", "artist", "album")}
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
 
-    try:
-        results = d.search(artist=artist, release_title=album, type="release")
-    except Exception:
+def search_discogs_by_artist_album(artist, album, token=None):
+    breaker = get_breaker("Discogs")
+    if not breaker.allow():
+        print("Discogs unavailable (circuit open); skipping search.")
         return None, None, None, None
 
-    if results:
-        r = results[0]
-        return (
-            r.artists[0].name if r.artists else "",
-            r.title,
-            str(r.year) if r.year else "",
-            r.genres[0] if r.genres else "",
-        )
-
-    return None, None, None, None
+    try:
+        token = token or get_discogs_token()
+        d = discogs_client.Client("CDLabeler/1.0", user_token=token)
+
+        try:
+            _RATE_LIMITER.wait(2)   # search page + release
+            results = d.search(artist=artist, release_title=album, type="release")
+            if not results:
+                breaker.record_success()
+                return None, None, None, None
+            r = results[0]
+            match = (
+                r.artists[0].name if r.artists else "",
+                r.title,
+                str(r.year) if r.year else "",
+                r.genres[0] if r.genres else "",
+            )
+        except Exception:
+            breaker.record_failure()
+            return None, None, None, None
+        breaker.record_success()
+    finally:
+        breaker.release_trial()
+
+    return match
@@ -35,6 +35,14 @@ def get_current_disc_id(drive):
         return disc.id
     except:
         return None
+
+def get_disc_toc(drive):
+    """(disc ID, TOC string "first last leadout offsets...") or (None, None)."""
+    try:
+        disc = discid.read(drive)
+        return disc.id, disc.toc_string
+    except:
+        return None, None
     
 def print_track_durations(drive, print_func=print):
     try:
@@ -0,0 +1,144 @@
+# dymo_raster.py
+# DYMO LabelWriter raster protocol. Labels go to the printer as 1-bit dot
+# rows at its native 300 dpi, run-length compressed wherever that is shorter,
+# so no driver has to scale or dither them.
+#
+# Job layout:  ESC @, density, ESC D <bytes/line>, ESC B <dot tab>,
+#              ESC L <lines>, one SYN (raw) or ETB (compressed) row per dot
+#              line, ESC E (feed to next label).
+import re
+
+from PIL import Image
+
+# ---------------- CONFIG ----------------
+HEAD_DOTS = 1248       # LabelWriter 4XL print head (4.16" at 300 dpi)
+DOT_TAB = 0            # bytes of left margin before each row
+DENSITY = "normal"     # light | medium | normal | dark
+ROTATE = 90            # 1800x1200 landscape labels feed 4" edge first
+RASTER_THRESHOLD = 160 # grey levels below this print black
+# ---------------------------------------
+
+ESC = 0x1B
+SYN = 0x16   # uncompressed row follows
+ETB = 0x17   # run-length row follows
+
+DENSITY_CODES = {"light": b"c", "medium": b"d", "normal": b"e", "dark": b"g"}
+MAX_RUN = 128
+_INVERT = bytes(255 - b for b in range(256))
+_RUNS = re.compile(r"0+|1+")
+
+
+def _esc(code, *args):
+    return bytes([ESC]) + code + bytes(args)
+
+
+def dot_rows(img, threshold=RASTER_THRESHOLD, rotate=ROTATE):
+    """The image as printer rows: (bytes per row, [row bytes]), black dots = 1 bits.
+
+    A mode "1" image is used as-is (PIL's 0 = black); anything else is
+    thresholded without dithering so text edges stay crisp.
+    """
+    if img.mode != "1":
+        img = img.convert("L").point(lambda p: 255 if p >= threshold else 0, mode="1")
+    if rotate:
+        img = img.rotate(rotate, expand=True)
+
+    width, height = img.size
+    if width > HEAD_DOTS - DOT_TAB * 8:
+        raise ValueError(f"label is {width} dots wide; the print head has {HEAD_DOTS - DOT_TAB * 8}")
+
+    bpl = (width + 7) // 8
+    data = img.tobytes().translate(_INVERT)   # PIL packs 1 = white
+    pad = bpl * 8 - width
+    rows = []
+    for y in range(height):
+        row = data[y * bpl:(y + 1) * bpl]
+        if pad:
+            # padding bits were white (0) before inverting
+            row = row[:-1] + bytes([row[-1] & (0xFF << pad) & 0xFF])
+        rows.append(row)
+    return bpl, rows
+
+
+def compress_row(row):
+    """ETB run-length bytes for one row: bit 7 = black, bits 0-6 = run length - 1."""
+    bits = format(int.from_bytes(row, "big"), f"0{len(row) * 8}b")
+    out = bytearray()
+    for m in _RUNS.finditer(bits):
+        colour = 0x80 if m.group()[0] == "1" else 0x00
+        length = len(m.group())
+        while length:
+            n = min(length, MAX_RUN)
+            out.append(colour | (n - 1))
+            length -= n
+    return bytes(out)
+
+
+def encode_row(row, compress=True):
+    if compress:
+        packed = compress_row(row)
+        if len(packed) < len(row):
+            return bytes([ETB]) + packed
+    return bytes([SYN]) + row
+
+
+def encode_label(img, threshold=RASTER_THRESHOLD, rotate=ROTATE, compress=True, density=DENSITY):
+    """Complete print job for one label."""
+    bpl, rows = dot_rows(img, threshold, rotate)
+    lines = len(rows)
+
+    out = bytearray()
+    out += _esc(b"@")
+    out += _esc(DENSITY_CODES[density])
+    out += _esc(b"D", bpl)
+    out += _esc(b"B", DOT_TAB)
+    out += _esc(b"L", lines >> 8, lines & 0xFF)
+    for row in rows:
+        out += encode_row(row, compress)
+    out += _esc(b"E")
+    return bytes(out)
+
+
+def decode_raster(data):
+    """Images (mode "1", as printed, before rotation back) from a raster byte stream.
+
+    The inverse of encode_label, for checking what a job will print.
+    """
+    labels, rows = [], []
+    bpl, i = 0, 0
+    while i < len(data):
+        b = data[i]
+        if b == ESC:
+            code = data[i + 1:i + 2]
+            if code == b"D":
+                bpl = data[i + 2]
+                i += 3
+            elif code == b"B":
+                i += 3
+            elif code == b"L":
+                i += 4
+            elif code == b"E" or code == b"G":
+                if rows:
+                    labels.append(_rows_to_image(rows, bpl))
+                rows = []
+                i += 2
+            else:
+                i += 2
+        elif b == SYN:
+            rows.append(data[i + 1:i + 1 + bpl])
+            i += 1 + bpl
+        elif b == ETB:
+            bits, i = [], i + 1
+            while sum(len(s) for s in bits) < bpl * 8:
+                run = data[i]
+                bits.append(("1" if run & 0x80 else "0") * ((run & 0x7F) + 1))
+                i += 1
+            rows.append(int("".join(bits), 2).to_bytes(bpl, "big"))
+        else:
+            raise ValueError(f"unexpected byte 0x{b:02x} at offset {i}")
+    return labels
+
+
+def _rows_to_image(rows, bpl):
+    data = b"".join(rows).translate(_INVERT)
+    return Image.frombytes("1", (bpl * 8, len(rows)), data)
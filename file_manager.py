@@ -1,6 +1,11 @@
 from pathlib import Path
 import pandas as pd
 
+from catalog_manager import now_stamp
+from common_helper import clean_year
+from discogs_manager import queue_genre_backfill
+from station_manager import station_drive
+
 # ---------- CORE FUNCTIONS ----------
 
 def append_to_csv(row, CSV_PATH):
@@ -14,3 +19,59 @@ def append_to_csv(row, CSV_PATH):
         df = pd.DataFrame([row])
 
     df.to_csv(csv_path, index=False)
+
+
+def increment_copies(CSV_PATH, mbid=None, disc_id=None):
+    csv_path = Path(CSV_PATH)
+    if not csv_path.exists():
+        return 0
+
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+
+    if mbid and "mbid" in df.columns:
+        match = df["mbid"] == mbid
+    elif disc_id and "disc_id" in df.columns:
+        match = df["disc_id"] == disc_id
+    else:
+        return 0
+
+    if not match.any():
+        return 0
+
+    if "copies" not in df.columns:
+        df["copies"] = "1"
+    df["copies"] = df["copies"].replace("", "1")
+
+    idx = match.idxmax()
+    copies = int(float(df.at[idx, "copies"])) + 1
+    df.at[idx, "copies"] = str(copies)
+
+    df.to_csv(csv_path, index=False)
+    return copies
+
+
+# ---------- IDENTIFIED DISCS ----------
+# cd_to_csv.py, rips_to_csv.py and review_discs.py all catalogue a disc
+# through these two, so a row is built and stored the same way everywhere.
+
+def disc_row(drive, artist, album, year, genre, mbid, disc_id):
+    return {
+        "drive": station_drive(drive),
+        "artist": artist,
+        "album": album,
+        "year": clean_year(year),
+        "genre": genre,
+        "mbid": mbid,
+        "disc_id": disc_id,
+        "scanned_at": now_stamp(),
+    }
+
+
+def save_disc_row(row, catalog, CSV_PATH, journal=None, genre_deferred=False):
+    # SQLite catalog for queries, CSV kept alongside for compatibility
+    catalog.add(row)
+    append_to_csv(row, CSV_PATH)
+    if journal:
+        journal.add(row)
+    if genre_deferred:
+        queue_genre_backfill(row)
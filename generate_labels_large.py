@@ -1,62 +1,56 @@
-from PIL import Image, ImageDraw, ImageFont
 import pandas as pd
 from pathlib import Path
-import qrcode
 import musicbrainzngs as mb
-import time, random
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-from label_config import (
-    LABEL_WIDTH,
-    LABEL_HEIGHT,
-    SAFE_LEFT,
-    SAFE_RIGHT,
-    SAFE_TOP,
-    SAFE_BOTTOM,
-    QR_SIZE,
-    LINE_SPACING,
-    TITLE_FONT_SIZE,
-    TRACK_FONT_SIZE,
+from cover_art_manager import COVER_WORKERS, cover_path, prefetch_cover
+from label_config import LABEL_WIDTH, LABEL_HEIGHT
+from label_image_manager import render_label_image, draw_label_pdf
+from label_pdf_manager import PdfLabelWriter
+from pipeline_manager import Pipeline, Stage
+from circuit_breaker import CircuitOpenError, DeadlineExceeded
+from musicbrainz_manager import is_client_error, mb_with_retry
+from catalog_manager import (
+    FollowOffset,
+    open_catalog,
+    add_query_arguments,
+    query_from_args,
+    cached_tracks,
+    remember_tracks,
 )
 
 # ---------------- CONFIG ----------------
 CSV_PATH = "data/cd_labels.csv"
+CATALOG_PATH = "data/catalog.db"
 OUT_DIR = "data/gif_labels_large"
+PDF_PATH = "data/gif_labels_large/labels_large.pdf"
+FOLLOW_STATE_PATH = "data/follow_large.offset"   # last catalog row rendered by --follow
 
-HEADER_Y   = SAFE_TOP + 0
-SUBHEADER_Y = SAFE_TOP + 60
-TRACKS_Y   = SAFE_TOP + 130
+# Pipeline sizing. musicbrainzngs serializes requests at 1/s on its own,
+# so a couple of fetchers is enough to keep a request always in flight.
+# Layout and fitting are pure Python and hold the GIL, so rendering runs in
+# RENDER_WORKERS processes, one per spare core.
+FETCH_WORKERS = 2
+RENDER_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+WRITE_WORKERS = 2
+QUEUE_SIZE = 4          # labels buffered between stages (bounds memory)
+COVERS = False          # front cover above the QR code (cover_art_manager)
+FOLLOW_RETRY_SECONDS = 60   # --follow waits this long for MusicBrainz before retrying a row
 # ---------------------------------------
 
-Path(OUT_DIR).mkdir(parents=True, exist_ok=True)
-
-df = pd.read_csv(CSV_PATH)
-
 mb.set_useragent("CDLabeler", "1.0", "you@example.com")
 
-FONT_TITLE = ImageFont.truetype("arialbd.ttf", TITLE_FONT_SIZE)
-FONT_TRACK = ImageFont.truetype("arial.ttf", TRACK_FONT_SIZE)
-
-
-def mb_with_retry(func, *args, retries=5, base_delay=1.0, **kwargs):
-    attempt = 0
-    while True:
-        try:
-            return func(*args, **kwargs)
-        except Exception as e:
-            attempt += 1
-            if attempt > retries:
-                print(f"MusicBrainz failed after {retries} retries: {e}")
-                raise
-
-            delay = base_delay * (2 ** (attempt - 1))
-            delay += random.uniform(0, 0.5)
-            print(f"MusicBrainz error: {e} — retrying in {delay:.1f}s (attempt {attempt}/{retries})")
-            time.sleep(delay)
-
 
 def get_track_list(mbid):
+    cached = cached_tracks(mbid, CATALOG_PATH)
+    if cached is not None:
+        return cached
+
     try:
-        result = mb_with_retry(mb.get_release_by_id, mbid, includes=["recordings"])
+        result = mb_with_retry(mb.get_release_by_id, mbid, includes=["recordings"], retries=5)
         tracks = []
 
         media = result["release"].get("medium-list", [])
@@ -66,125 +60,192 @@ def get_track_list(mbid):
                 title = t["recording"]["title"]
                 tracks.append(title)
 
+        remember_tracks(mbid, tracks, CATALOG_PATH)
         return tracks
 
+    except (CircuitOpenError, DeadlineExceeded):
+        raise
     except Exception as e:
+        if isinstance(e, mb.WebServiceError) and not is_client_error(e):
+            # MusicBrainz is down, not the release: skip the label rather than print it without tracks
+            raise
         print(f"Failed to fetch tracks for MBID {mbid}: {e}")
         return []
 
 
-def wrap_text(draw, text, font, max_width):
-    words = text.split()
-    lines = []
-    current = ""
+def fetch_skipped(pipeline):
+    """Tell the user about labels dropped because their track list couldn't be fetched."""
+    skipped = pipeline.stages[0].errors
+    if skipped:
+        print(f"{skipped} label(s) skipped: track list unavailable. Run again to render them.")
 
-    for w in words:
-        test = current + (" " if current else "") + w
-        bbox = draw.textbbox((0, 0), test, font=font)
-        if (bbox[2] - bbox[0]) <= max_width:
-            current = test
-        else:
-            if current:
-                lines.append(current)
-            current = w
 
-    if current:
-        lines.append(current)
+def label_from_row(r):
+    return r["id"], *(str(r[c] or "") for c in ("artist", "album", "year", "genre", "mbid"))
 
-    return lines
 
+def iter_labels(csv_path, query=None):
+    if query:
+        # indexed subset from the catalog instead of loading the whole CSV
+        for r in open_catalog(CATALOG_PATH, csv_path).iter_rows(**query):
+            yield label_from_row(r)
+        return
 
-for i, r in df.iterrows():
-    img = Image.new("RGB", (LABEL_WIDTH, LABEL_HEIGHT), "white")
-    draw = ImageDraw.Draw(img)
+    df = pd.read_csv(csv_path)
 
-    artist = str(r["artist"])
-    album  = str(r["album"])
-    year   = "" if pd.isna(r["year"]) else str(r["year"])
-    genre  = "" if pd.isna(r["genre"]) else str(r["genre"])
-    mbid   = str(r["mbid"])
+    for i, r in df.iterrows():
+        artist = str(r["artist"])
+        album  = str(r["album"])
+        year   = "" if pd.isna(r["year"]) else str(r["year"])
+        genre  = "" if pd.isna(r["genre"]) else str(r["genre"])
+        mbid   = "" if pd.isna(r["mbid"]) else str(r["mbid"])
 
-    # ---------------------------
-    # HEADER (LEFT)
-    # ---------------------------
-    draw.text((SAFE_LEFT, HEADER_Y), artist, fill="black", font=FONT_TITLE)
-    draw.text((SAFE_LEFT, SUBHEADER_Y), album, fill="black", font=FONT_TRACK)
+        # CSV row n is catalog row id n, so both paths name a disc's file the same
+        yield i + 1, artist, album, year, genre, mbid
 
-    # ---------------------------
-    # YEAR / GENRE (TOP RIGHT)
-    # ---------------------------
-    right_x = LABEL_WIDTH - SAFE_RIGHT
 
-    year_w = 0
-    genre_w = 0
+def fetch_stage(label):
+    i, artist, album, year, genre, mbid = label
+    tracks = get_track_list(mbid) if mbid else []
+    return i, artist, album, year, genre, mbid, tracks, None
 
-    if year:
-        bbox = draw.textbbox((0, 0), year, font=FONT_TITLE)
-        year_w = bbox[2] - bbox[0]
-
-    if genre:
-        bbox = draw.textbbox((0, 0), genre, font=FONT_TRACK)
-        genre_w = bbox[2] - bbox[0]
 
-    col_w = max(year_w, genre_w)
+def cover_stage(fetched):
+    # the only network access for covers; rendering reads the cache
+    *label, _ = fetched
+    mbid = label[5]
+    prefetch_cover(mbid)
+    return (*label, cover_path(mbid))
 
-    if year:
-        draw.text((right_x - col_w, HEADER_Y), year, fill="black", font=FONT_TITLE)
-
-    if genre:
-        draw.text((right_x - col_w, SUBHEADER_Y), genre, fill="black", font=FONT_TRACK)
-
-    # ---------------------------
-    # TRACK LIST
-    # ---------------------------
-    tracks = get_track_list(mbid)
-
-    y = TRACKS_Y
-
-    MAX_Y = LABEL_HEIGHT - SAFE_BOTTOM
-    QR_CUTOFF_Y = LABEL_HEIGHT - QR_SIZE - SAFE_BOTTOM - 20
-    truncated = False
 
-    for idx, title in enumerate(tracks, start=1):
+def fetch_stages(covers):
+    stages = [Stage("fetch", fetch_stage, FETCH_WORKERS, QUEUE_SIZE)]
+    if covers:
+        stages.append(Stage("covers", cover_stage, COVER_WORKERS, QUEUE_SIZE))
+    return stages
 
-        # Adjust width if overlapping QR zone
-        if y >= QR_CUTOFF_Y:
-            max_text_width = LABEL_WIDTH - QR_SIZE - SAFE_RIGHT - SAFE_LEFT - 20
-        else:
-            max_text_width = LABEL_WIDTH - SAFE_RIGHT - SAFE_LEFT
 
-        line = f"{idx}. {title}"
-        wrapped = wrap_text(draw, line, FONT_TRACK, max_text_width)
+def render_job(label):
+    # runs in a render process
+    i, artist, album, year, genre, mbid, tracks, cover = label
+    return i, render_label_image(artist, album, year, genre, mbid, tracks, cover)
 
-        for wline in wrapped:
-            if y + LINE_SPACING > MAX_Y:
-                truncated = True
-                break
 
-            draw.text((SAFE_LEFT, y), wline, fill="black", font=FONT_TRACK)
-            y += LINE_SPACING
+def generate_png_labels(csv_path=CSV_PATH, out_dir=OUT_DIR, query=None, covers=COVERS):
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
 
-        if truncated:
-            break
+    def write_stage(rendered):
+        i, img = rendered
+        out_path = Path(out_dir) / f"label_large_{i}.png"
+        img.save(out_path, format="PNG")
+        return out_path
 
-    # ---- TRUNCATION INDICATOR ----
-    if truncated:
-        draw.text((SAFE_LEFT, y), "…", fill="black", font=FONT_TRACK)
+    with ProcessPoolExecutor(max_workers=RENDER_WORKERS) as renderers:
+        # each render thread just waits on its process, so at most
+        # RENDER_WORKERS labels are being rendered at once
+        def render_stage(label):
+            return renderers.submit(render_job, label).result()
 
-    # ---------------------------
-    # QR CODE (BOTTOM RIGHT)
-    # ---------------------------
-    qr_payload = f"https://musicbrainz.org/release/{mbid}"
-    qr = qrcode.make(qr_payload).resize((QR_SIZE, QR_SIZE))
+        pipeline = Pipeline([
+            *fetch_stages(covers),
+            Stage("render", render_stage, RENDER_WORKERS, QUEUE_SIZE),
+            Stage("write", write_stage, WRITE_WORKERS, QUEUE_SIZE),
+        ])
 
-    qr_x = LABEL_WIDTH - QR_SIZE - SAFE_RIGHT
-    qr_y = LABEL_HEIGHT - QR_SIZE - SAFE_BOTTOM
+        for out_path in pipeline.run(iter_labels(csv_path, query)):
+            print("Generated:", out_path)
 
-    img.paste(qr, (qr_x, qr_y))
+    print("All 4x6 labels generated.")
+    print(pipeline.report())
+    fetch_skipped(pipeline)
 
-    out_path = Path(OUT_DIR) / f"label_large_{i}.png"
-    img.save(out_path, format="PNG")
+
+def generate_pdf_labels(csv_path=CSV_PATH, pdf_path=PDF_PATH, query=None, covers=COVERS):
+    writer = PdfLabelWriter(pdf_path, LABEL_WIDTH, LABEL_HEIGHT, title="CD labels")
+
+    # Fetches finish out of order; pages must not, so hold early ones back
+    pipeline = Pipeline(fetch_stages(covers))
+    labels = list(iter_labels(csv_path, query))
+    order = [label[0] for label in labels]
+    pending = {}
+    pos = 0
+
+    def draw(fetched):
+        i, artist, album, year, genre, mbid, tracks, cover = fetched
+        draw_label_pdf(writer, artist, album, year, genre, mbid, tracks, cover)
+        print(f"Generated page {writer.pages}: {artist} - {album}")
+
+    for fetched in pipeline.run(labels):
+        pending[fetched[0]] = fetched
+        while pos < len(order) and order[pos] in pending:
+            draw(pending.pop(order[pos]))
+            pos += 1
+
+    # anything left behind a failed fetch, still in catalog order
+    for i in order[pos:]:
+        if i in pending:
+            draw(pending.pop(i))
+
+    writer.close()
+    print(f"All 4x6 labels generated: {pdf_path}")
+    print(pipeline.report())
+    fetch_skipped(pipeline)
+
 
-    print("Generated:", out_path)
+def follow_labels(csv_path=CSV_PATH, out_dir=OUT_DIR, out_format="png", query=None,
+                  state_path=FOLLOW_STATE_PATH, covers=COVERS):
+    """Render each new catalog row as it lands, one file per label."""
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    catalog = open_catalog(CATALOG_PATH, csv_path)
+    # first run starts at the current end of the catalog, like tail -f
+    offset = FollowOffset(state_path, default=catalog.max_id())
+    print(f"Following {CATALOG_PATH} after row {offset.value} (Ctrl-C to stop)...")
 
-print("All 4x6 labels generated.")
+    try:
+        for r in catalog.follow_rows(offset.value, **(query or {})):
+            # the offset only moves past a row once its label is out
+            while True:
+                try:
+                    fetched = fetch_stage(label_from_row(r))
+                    break
+                except (CircuitOpenError, DeadlineExceeded, mb.WebServiceError) as e:
+                    print(f"Row {r['id']}: track list unavailable ({e}); retrying in {FOLLOW_RETRY_SECONDS}s")
+                    time.sleep(FOLLOW_RETRY_SECONDS)
+            if covers:
+                fetched = cover_stage(fetched)
+            i, artist, album, year, genre, mbid, tracks, cover = fetched
+            out_path = Path(out_dir) / f"label_large_{i}.{out_format}"
+
+            if out_format == "pdf":
+                writer = PdfLabelWriter(out_path, LABEL_WIDTH, LABEL_HEIGHT, title=f"{artist} - {album}")
+                draw_label_pdf(writer, artist, album, year, genre, mbid, tracks, cover)
+                writer.close()
+            else:
+                render_label_image(artist, album, year, genre, mbid, tracks, cover).save(out_path, format="PNG")
+
+            offset.save(i)
+            print("Generated:", out_path)
+    except KeyboardInterrupt:
+        print(f"\nStopped following at row {offset.value}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render large 4x6 CD labels from the CSV catalog.")
+    parser.add_argument("--format", choices=["png", "pdf"], default="png",
+                        help="png: one raster file per label; pdf: one multi-page vector PDF")
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--pdf-path", default=PDF_PATH)
+    parser.add_argument("--follow", action="store_true",
+                        help="keep running and render each new catalog row as it is scanned")
+    parser.add_argument("--covers", action="store_true", default=COVERS,
+                        help="print the front cover (Cover Art Archive) above the QR code")
+    add_query_arguments(parser)
+    args = parser.parse_args()
+    query = query_from_args(args)
+
+    if args.follow:
+        follow_labels(args.csv, out_format=args.format, query=query, covers=args.covers)
+    elif args.format == "pdf":
+        generate_pdf_labels(args.csv, args.pdf_path, query=query, covers=args.covers)
+    else:
+        generate_png_labels(args.csv, query=query, covers=args.covers)
@@ -1,9 +1,14 @@
 from PIL import Image, ImageDraw, ImageFont
 import pandas as pd
 from pathlib import Path
-import math
+import argparse
+
+from glyph_atlas import draw_text
+from label_pdf_manager import PdfLabelWriter, PDF_FONT_BOLD, PDF_FONT_REGULAR
+from catalog_manager import FollowOffset, open_catalog, add_query_arguments, query_from_args
 
 CSV_PATH = "data/cd_labels.csv"
+CATALOG_PATH = "data/catalog.db"
 OUT_DIR = "data/gif_labels"
 
 LABEL_WIDTH = 560
@@ -18,43 +23,43 @@ LINE1_OFFSET = 4
 LINE2_OFFSET = 30
 RIGHT_PADDING = 6
 
-Path(OUT_DIR).mkdir(exist_ok=True)
+FONT_BOLD_SIZE = 22
+FONT_REG_SIZE = 18
+
+# PDF output: label stock size in points, or None for the block size at 300 dpi
+PDF_PATH = "data/gif_labels/labels_small.pdf"
+PDF_PAGE_SIZE = None
 
-df = pd.read_csv(CSV_PATH)
+FOLLOW_STATE_PATH = "data/follow_small.offset"   # last catalog row in a flushed --follow block
 
-FONT_BOLD = ImageFont.truetype("arialbd.ttf", 22)
-FONT_REG  = ImageFont.truetype("arial.ttf", 18)
+FONT_BOLD = ImageFont.truetype("arialbd.ttf", FONT_BOLD_SIZE)
+FONT_REG  = ImageFont.truetype("arial.ttf", FONT_REG_SIZE)
 
 
-def fit_text(draw, text, font, max_width):
+def fit_text(measure, text, font, max_width):
     if not text:
         return text
 
-    bbox = draw.textbbox((0, 0), text, font=font)
-    text_w = bbox[2] - bbox[0]
+    text_w = measure(text, font)
     if text_w <= max_width:
         return text
 
     ellipsis = "…"
     for i in range(len(text), 0, -1):
         candidate = text[:i] + ellipsis
-        bbox = draw.textbbox((0, 0), candidate, font=font)
-        if (bbox[2] - bbox[0]) <= max_width:
+        if measure(candidate, font) <= max_width:
             return candidate
 
     return ellipsis
 
 
-total_rows = len(df)
-total_labels = math.ceil(total_rows / ROWS_PER_LABEL)
-
-for label_idx in range(total_labels):
-    img = Image.new("RGB", (LABEL_WIDTH, LABEL_HEIGHT), "white")
-    draw = ImageDraw.Draw(img)
+def layout_block(block, measure):
+    """Return (x, y, text, font) draw ops for up to ROWS_PER_LABEL rows.
 
-    start = label_idx * ROWS_PER_LABEL
-    end = min(start + ROWS_PER_LABEL, total_rows)
-    block = df.iloc[start:end]
+    font is "bold" or "regular"; measure(text, font) returns the text width
+    in pixels for whichever backend will draw the ops.
+    """
+    ops = []
 
     for row_idx, (_, r) in enumerate(block.iterrows()):
         y_base = row_idx * (ROW_HEIGHT + ROW_GAP)
@@ -65,13 +70,11 @@ for label_idx in range(total_labels):
         genre  = str(r["genre"]) if not pd.isna(r["genre"]) else ""
 
         # Measure right-aligned fields
-        bbox_year = draw.textbbox((0, 0), year, font=FONT_BOLD)
-        year_w = bbox_year[2] - bbox_year[0]
+        year_w = measure(year, "bold")
 
         genre_w = 0
         if genre:
-            bbox_genre = draw.textbbox((0, 0), genre, font=FONT_REG)
-            genre_w = bbox_genre[2] - bbox_genre[0]
+            genre_w = measure(genre, "regular")
 
         text_right_limit = LABEL_WIDTH - MARGIN
 
@@ -83,22 +86,141 @@ for label_idx in range(total_labels):
         line2_max_width = max(10, line2_max_width)
 
         # Fit text
-        artist_fit = fit_text(draw, artist, FONT_BOLD, line1_max_width)
-        album_fit  = fit_text(draw, album,  FONT_REG,  line2_max_width)
+        artist_fit = fit_text(measure, artist, "bold", line1_max_width)
+        album_fit  = fit_text(measure, album,  "regular", line2_max_width)
 
-        # Draw line 1
-        draw.text((MARGIN, y_base + LINE1_OFFSET), artist_fit, fill="black", font=FONT_BOLD)
-        draw.text((text_right_limit - year_w, y_base + LINE1_OFFSET), year, fill="black", font=FONT_BOLD)
+        # Line 1
+        ops.append((MARGIN, y_base + LINE1_OFFSET, artist_fit, "bold"))
+        ops.append((text_right_limit - year_w, y_base + LINE1_OFFSET, year, "bold"))
 
-        # Draw line 2
-        draw.text((MARGIN, y_base + LINE2_OFFSET), album_fit, fill="black", font=FONT_REG)
+        # Line 2
+        ops.append((MARGIN, y_base + LINE2_OFFSET, album_fit, "regular"))
 
         if genre:
-            draw.text((text_right_limit - genre_w, y_base + LINE2_OFFSET), genre, fill="black", font=FONT_REG)
-
-    out_path = Path(OUT_DIR) / f"label_block_{label_idx+1}.gif"
-    img.save(out_path, format="GIF")
-
-    print(f"Generated: {out_path}")
-
-print("All labels generated with spacing.")
+            ops.append((text_right_limit - genre_w, y_base + LINE2_OFFSET, genre, "regular"))
+
+    return ops
+
+
+def iter_blocks(csv_path, query=None):
+    if query:
+        # indexed subset from the catalog, still one label's worth at a time
+        rows = []
+        for r in open_catalog(CATALOG_PATH, csv_path).iter_rows(**query):
+            rows.append(r)
+            if len(rows) == ROWS_PER_LABEL:
+                yield pd.DataFrame(rows)
+                rows = []
+        if rows:
+            yield pd.DataFrame(rows)
+        return
+
+    # Read one label's worth of rows at a time so memory stays flat
+    for block in pd.read_csv(csv_path, chunksize=ROWS_PER_LABEL, dtype=str):
+        yield block
+
+
+def render_gif_block(block):
+    fonts = {"bold": FONT_BOLD, "regular": FONT_REG}
+    img = Image.new("RGB", (LABEL_WIDTH, LABEL_HEIGHT), "white")
+    draw = ImageDraw.Draw(img)
+
+    def measure(text, font):
+        bbox = draw.textbbox((0, 0), text, font=fonts[font])
+        return bbox[2] - bbox[0]
+
+    for x, y, text, font in layout_block(block, measure):
+        draw_text(img, (x, y), text, fonts[font])
+
+    return img
+
+
+def draw_pdf_block(writer, block):
+    fonts = {"bold": (PDF_FONT_BOLD, FONT_BOLD_SIZE), "regular": (PDF_FONT_REGULAR, FONT_REG_SIZE)}
+
+    def measure(text, font):
+        return writer.text_width(text, *fonts[font])
+
+    writer.begin_page()
+    for x, y, text, font in layout_block(block, measure):
+        writer.text((x, y), text, *fonts[font])
+    writer.end_page()
+
+
+def generate_gif_labels(csv_path=CSV_PATH, out_dir=OUT_DIR, query=None):
+    Path(out_dir).mkdir(exist_ok=True)
+
+    for label_idx, block in enumerate(iter_blocks(csv_path, query)):
+        out_path = Path(out_dir) / f"label_block_{label_idx+1}.gif"
+        render_gif_block(block).save(out_path, format="GIF")
+
+        print(f"Generated: {out_path}")
+
+    print("All labels generated with spacing.")
+
+
+def generate_pdf_labels(csv_path=CSV_PATH, pdf_path=PDF_PATH, page_size=PDF_PAGE_SIZE, query=None):
+    writer = PdfLabelWriter(pdf_path, LABEL_WIDTH, LABEL_HEIGHT, page_size=page_size, title="CD spine labels")
+
+    for block in iter_blocks(csv_path, query):
+        draw_pdf_block(writer, block)
+
+    writer.close()
+    print(f"Generated: {pdf_path} ({writer.pages} pages)")
+
+
+def follow_blocks(csv_path=CSV_PATH, out_dir=OUT_DIR, out_format="gif", query=None,
+                  state_path=FOLLOW_STATE_PATH, page_size=PDF_PAGE_SIZE):
+    """Tail the catalog and write a block each time ROWS_PER_LABEL new rows are in.
+
+    The offset only moves when a block is written, so rows of an unfinished
+    block are picked up again by the next --follow run.
+    """
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    catalog = open_catalog(CATALOG_PATH, csv_path)
+    offset = FollowOffset(state_path, default=catalog.max_id())
+    print(f"Following {CATALOG_PATH} after row {offset.value} (Ctrl-C to stop)...")
+
+    rows = []
+    try:
+        for r in catalog.follow_rows(offset.value, **(query or {})):
+            rows.append(r)
+            print(f"Queued {r['artist']} - {r['album']} ({len(rows)}/{ROWS_PER_LABEL})")
+            if len(rows) < ROWS_PER_LABEL:
+                continue
+
+            block = pd.DataFrame(rows)
+            out_path = Path(out_dir) / f"label_block_{rows[0]['id']}-{rows[-1]['id']}.{out_format}"
+            if out_format == "pdf":
+                writer = PdfLabelWriter(out_path, LABEL_WIDTH, LABEL_HEIGHT, page_size=page_size,
+                                        title="CD spine labels")
+                draw_pdf_block(writer, block)
+                writer.close()
+            else:
+                render_gif_block(block).save(out_path, format="GIF")
+
+            offset.save(rows[-1]["id"])
+            rows = []
+            print(f"Generated: {out_path}")
+    except KeyboardInterrupt:
+        print(f"\nStopped following; {len(rows)} row(s) wait for the next block.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render 8-row spine label blocks from the CSV catalog.")
+    parser.add_argument("--format", choices=["gif", "pdf"], default="gif",
+                        help="gif: one raster file per block; pdf: one multi-page vector PDF")
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--pdf-path", default=PDF_PATH)
+    parser.add_argument("--follow", action="store_true",
+                        help=f"keep running and write a block every {ROWS_PER_LABEL} newly scanned discs")
+    add_query_arguments(parser)
+    args = parser.parse_args()
+    query = query_from_args(args)
+
+    if args.follow:
+        follow_blocks(args.csv, out_format=args.format, query=query)
+    elif args.format == "pdf":
+        generate_pdf_labels(args.csv, args.pdf_path, query=query)
+    else:
+        generate_gif_labels(args.csv, query=query)
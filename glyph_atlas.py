@@ -0,0 +1,182 @@
+# glyph_atlas.py
+# Text rasterizer for the PIL label renderers. Each glyph is rendered by
+# FreeType once per (font, size, char) and the cached bitmap is blitted for
+# every later use, instead of rasterizing every string from scratch.
+#
+# Glyphs land where ImageDraw.text puts them with Pillow's basic layout: the
+# same hinted advances and pair kerning, with the pen rounded to whole pixels
+# the way FreeType does, so the output matches it pixel for pixel. Fonts keep
+# their own layout engine; with libraqm only strings the basic layout renders
+# correctly (no complex scripts, combining marks or right-to-left text) come
+# from the atlas. Everything else (those strings, multi-line strings,
+# fractional y) is handed to ImageDraw.text.
+#
+#   python glyph_atlas.py     # compare with ImageDraw.text on sample labels
+import argparse
+import math
+import time
+import unicodedata
+
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+# ---------------- CONFIG ----------------
+GLYPH_ATLAS = True     # False: every string goes through ImageDraw.text
+# ---------------------------------------
+
+
+# bidi controls and joiners change shaping even between Latin letters
+_SHAPING_CONTROLS = set("\u200c\u200d\u200e\u200f\u202a\u202b\u202c\u202d\u202e\u2066\u2067\u2068\u2069")
+
+
+def basic_layout_ok(text):
+    """True when the basic layout renders text as a shaping engine would."""
+    for ch in text:
+        cp = ord(ch)
+        if cp < 0x0300:   # Latin, Latin-1 and extensions
+            continue
+        if (0x0370 <= cp <= 0x052F or 0x1E00 <= cp <= 0x1FFF or 0x2000 <= cp <= 0x214F) \
+                and ch not in _SHAPING_CONTROLS and not unicodedata.combining(ch):
+            continue      # Greek, Cyrillic, punctuation, currency, letterlike symbols
+        return False
+    return True
+
+
+class GlyphAtlas:
+    """Glyph bitmaps, advances and kerning pairs, cached per font and size."""
+
+    MAX_GLYPHS = 20_000
+
+    def __init__(self):
+        self._glyphs = {}    # (path, size, index, char) -> (mask or None, (dx, dy), advance)
+        self._kerning = {}   # (path, size, index, pair) -> extra advance
+        self._basic = {}     # (path, size, index) -> the font with the basic layout
+
+    @staticmethod
+    def _font_key(font):
+        return (font.path, font.size, font.index)
+
+    def basic_font(self, font):
+        """font itself, or a basic-layout copy of a font loaded with libraqm."""
+        if font.layout_engine == ImageFont.Layout.BASIC:
+            return font
+        key = self._font_key(font)
+        basic = self._basic.get(key)
+        if basic is None:
+            basic = ImageFont.truetype(font.path, font.size, index=font.index,
+                                       layout_engine=ImageFont.Layout.BASIC)
+            self._basic[key] = basic
+        return basic
+
+    def glyph(self, font, ch):
+        key = self._font_key(font) + (ch,)
+        g = self._glyphs.get(key)
+        if g is None:
+            if len(self._glyphs) >= self.MAX_GLYPHS:
+                self._glyphs.clear()
+            core, offset = font.getmask2(ch, "L")
+            mask = Image.Image()._new(core) if core.size[0] and core.size[1] else None
+            g = (mask, offset, font.getlength(ch))
+            self._glyphs[key] = g
+        return g
+
+    def kerning(self, font, a, b):
+        key = self._font_key(font) + (a + b,)
+        k = self._kerning.get(key)
+        if k is None:
+            if len(self._kerning) >= self.MAX_GLYPHS:
+                self._kerning.clear()
+            k = font.getlength(a + b) - font.getlength(a) - font.getlength(b)
+            self._kerning[key] = k
+        return k
+
+    def can_draw(self, img, xy, text, font):
+        return (
+            img.mode in ("RGB", "L")
+            and isinstance(font, ImageFont.FreeTypeFont)
+            and xy[1] == int(xy[1])
+            and "\n" not in text
+            and (font.layout_engine == ImageFont.Layout.BASIC
+                 or (isinstance(font.path, str) and basic_layout_ok(text)))
+        )
+
+    def draw_text(self, img, xy, text, font, fill="black"):
+        """ImageDraw.Draw(img).text(xy, text, fill=fill, font=font), from cached glyphs."""
+        if not self.can_draw(img, xy, text, font):
+            ImageDraw.Draw(img).text(xy, text, fill=fill, font=font)
+            return
+
+        font = self.basic_font(font)
+        x, y = xy
+        left = int(x)
+        frac = x - left
+        top = int(y)
+        pen = 0.0
+        prev = None
+        for ch in text:
+            if prev is not None:
+                pen += self.kerning(font, prev, ch)
+            mask, (dx, dy), advance = self.glyph(font, ch)
+            if mask is not None:
+                # FreeType's PIXEL(): round the 26.6 pen position half up
+                img.paste(fill, (left + math.floor(pen + frac + 0.5) + dx, top + dy), mask)
+            pen += advance
+            prev = ch
+
+
+ATLAS = GlyphAtlas()
+
+
+def draw_text(img, xy, text, font, fill="black"):
+    """Draw one line of text on img, through the glyph atlas when GLYPH_ATLAS is on."""
+    if GLYPH_ATLAS:
+        ATLAS.draw_text(img, xy, text, font, fill)
+    else:
+        ImageDraw.Draw(img).text(xy, text, fill=fill, font=font)
+
+
+# ===================== SELF-CHECK =====================
+
+def _sample_labels():
+    from label_image_manager import render_label_image
+    from movie_label_image_manager import render_movie_label_image
+
+    tracks = [f"Track title number {i} (Remastered {1990 + i})" for i in range(1, 41)]
+    synopsis = " ".join(["A quiet town, a missing tape and a summer nobody talks about."] * 12)
+    return {
+        "cd": lambda: render_label_image("Artist Name", "Album Title – Deluxe Box Set", "1999", "Rock",
+                                         "00000000-0000-0000-0000-000000000000", tracks),
+        "movie": lambda: render_movie_label_image("A Film Title", "2004-05-01", 121, "PG-13", 7.4, 30_000_000,
+                                            [{"name": "Drama"}, {"name": "Mystery"}], synopsis,
+                                            ["First Actor", "Second Actor", "Third Actor"], 1234),
+    }
+
+
+def compare(repeat=5):
+    """Render the sample labels with and without the atlas; report max pixel difference and times."""
+    import glyph_atlas   # the renderers' copy of this module, also when run as a script
+
+    enabled = glyph_atlas.GLYPH_ATLAS
+    try:
+        for name, render in _sample_labels().items():
+            results = {}
+            for use_atlas in (False, True):
+                glyph_atlas.GLYPH_ATLAS = use_atlas
+                img = render()   # warms font, glyph and layout caches
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    render()
+                results[use_atlas] = (img, (time.perf_counter() - start) / repeat)
+
+            (plain, t_plain), (atlas, t_atlas) = results[False], results[True]
+            diff = ImageChops.difference(plain.convert("L"), atlas.convert("L")).getextrema()[1]
+            print(f"{name:6s} ImageDraw.text {t_plain * 1000:7.1f} ms   atlas {t_atlas * 1000:7.1f} ms   "
+                  f"max pixel difference {diff}")
+    finally:
+        glyph_atlas.GLYPH_ATLAS = enabled
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare glyph-atlas text with ImageDraw.text on sample labels.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    compare(args.repeat)
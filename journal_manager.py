@@ -0,0 +1,110 @@
+# journal_manager.py
+# Append-only write-ahead journal of per-disc state transitions so an
+# interrupted scan session can resume without redoing lookups or prints.
+import json
+import os
+import time
+from pathlib import Path
+
+DETECTED = "detected"
+RESOLVED = "resolved"
+WRITTEN = "written"
+PRINTED = "printed"
+EJECTED = "ejected"
+
+
+class ScanJournal:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}   # disc_id -> {"disc_id", "drive", "state", "row", "ts"}
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    e = json.loads(line)
+                except ValueError:
+                    # torn last line from a crash mid-write
+                    continue
+                self._apply(e)
+
+    def _apply(self, e):
+        disc_id = e.get("disc_id")
+        if not disc_id:
+            return
+
+        if e["state"] == DETECTED:
+            # a new pass over this disc starts from scratch
+            self.entries[disc_id] = {"disc_id": disc_id, "row": None}
+
+        entry = self.entries.setdefault(disc_id, {"disc_id": disc_id, "row": None})
+        entry["state"] = e["state"]
+        entry["drive"] = e.get("drive", entry.get("drive"))
+        entry["ts"] = e.get("ts")
+        if e.get("row"):
+            entry["row"] = e["row"]
+        if e.get("skipped"):
+            entry["skipped"] = True
+
+    def record(self, disc_id, state, drive=None, row=None, skipped=False):
+        e = {"disc_id": disc_id, "state": state, "drive": drive, "ts": time.time()}
+        if row:
+            e["row"] = row
+        if skipped:
+            e["skipped"] = True
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(e) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._apply(e)
+
+    def cached_row(self, disc_id):
+        entry = self.entries.get(disc_id)
+        return entry["row"] if entry else None
+
+    def pending(self):
+        """Entries resolved but not yet written/printed: replayable from the cached row."""
+        return [e for e in self.entries.values() if e["state"] == RESOLVED and e["row"]]
+
+    def unresolved(self):
+        """Entries detected but never resolved: the disc has to be scanned again."""
+        return [e for e in self.entries.values() if e["state"] == DETECTED]
+
+    def compact(self):
+        """Rewrite the journal keeping only entries that still need work."""
+        keep = self.pending() + self.unresolved()
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(tmp, "w", encoding="utf-8") as f:
+            for e in keep:
+                f.write(json.dumps({
+                    "disc_id": e["disc_id"],
+                    "state": DETECTED,
+                    "drive": e.get("drive"),
+                    "ts": e.get("ts"),
+                }) + "\n")
+                if e["state"] == RESOLVED:
+                    f.write(json.dumps({
+                        "disc_id": e["disc_id"],
+                        "state": RESOLVED,
+                        "drive": e.get("drive"),
+                        "row": e["row"],
+                        "ts": e.get("ts"),
+                    }) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp, self.path)
+        self.entries = {}
+        self._load()
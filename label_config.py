@@ -20,7 +20,13 @@ LINE_SPACING = 44
 TITLE_FONT_SIZE = 60
 TRACK_FONT_SIZE = 38
 
+# Auto-fit: track lists / synopses shrink down to this size, then spread
+# over more columns, before anything is truncated
+TRACK_FONT_SIZE_MIN = 20
+TRACK_MAX_COLUMNS = 3
+
 # Movie fonts
 MOVIE_TITLE_FONT_SIZE = 56
 MOVIE_META_FONT_SIZE = 36
 MOVIE_BODY_FONT_SIZE = 34
+MOVIE_BODY_FONT_SIZE_MIN = 22
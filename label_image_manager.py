@@ -1,86 +1,22 @@
 import tempfile
+from functools import lru_cache
 
 import musicbrainzngs as mb
 import qrcode
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageOps
 
-from label_config import (
-    LABEL_WIDTH,
-    LABEL_HEIGHT,
-    SAFE_LEFT,
-    SAFE_RIGHT,
-    SAFE_TOP,
-    SAFE_BOTTOM,
-    QR_SIZE,
-    LINE_SPACING,
-    TITLE_FONT_SIZE,
-    TRACK_FONT_SIZE,
-)
+from catalog_manager import cached_tracks, remember_tracks
+from glyph_atlas import draw_text
+from label_config import LABEL_WIDTH, LABEL_HEIGHT
+from label_templates import compile_template
+from layout_manager import PDF_METRICS, PIL_METRICS, font_at
 
-HEADER_Y = SAFE_TOP + 0
-SUBHEADER_Y = SAFE_TOP + 60
-TRACKS_Y = SAFE_TOP + 130
 
-FONT_TITLE = ImageFont.truetype("arialbd.ttf", TITLE_FONT_SIZE)
-FONT_TRACK = ImageFont.truetype("arial.ttf", TRACK_FONT_SIZE)
+def fetch_track_list(mbid):
+    cached = cached_tracks(mbid)
+    if cached is not None:
+        return cached
 
-
-def wrap_text(draw, text, font, max_width):
-    words = text.split()
-    lines = []
-    current = ""
-
-    for w in words:
-        test = current + (" " if current else "") + w
-        bbox = draw.textbbox((0, 0), test, font=font)
-        if (bbox[2] - bbox[0]) <= max_width:
-            current = test
-        else:
-            if current:
-                lines.append(current)
-            current = w
-
-    if current:
-        lines.append(current)
-
-    return lines
-
-
-def generate_label_image(artist, album, year, genre, mbid):
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-    out_path = tmp.name
-    tmp.close()
-
-    img = Image.new("RGB", (LABEL_WIDTH, LABEL_HEIGHT), "white")
-    draw = ImageDraw.Draw(img)
-
-    # HEADER
-    draw.text((SAFE_LEFT, HEADER_Y), artist, fill="black", font=FONT_TITLE)
-    draw.text((SAFE_LEFT, SUBHEADER_Y), album, fill="black", font=FONT_TRACK)
-
-    # YEAR / GENRE (RIGHT)
-    right_x = LABEL_WIDTH - SAFE_RIGHT
-
-    year_w = 0
-    genre_w = 0
-
-    if year:
-        bbox = draw.textbbox((0, 0), year, font=FONT_TITLE)
-        year_w = bbox[2] - bbox[0]
-
-    if genre:
-        bbox = draw.textbbox((0, 0), genre, font=FONT_TRACK)
-        genre_w = bbox[2] - bbox[0]
-
-    col_w = max(year_w, genre_w)
-
-    if year:
-        draw.text((right_x - col_w, HEADER_Y), year, fill="black", font=FONT_TITLE)
-
-    if genre:
-        draw.text((right_x - col_w, SUBHEADER_Y), genre, fill="black", font=FONT_TRACK)
-
-    # TRACK LIST (from MusicBrainz)
     tracks = []
     try:
         result = mb.get_release_by_id(mbid, includes=["recordings"])
@@ -91,46 +27,110 @@ def generate_label_image(artist, album, year, genre, mbid):
                 tracks.append(t["recording"]["title"])
     except:
         pass
-
-    y = TRACKS_Y
-    max_y = LABEL_HEIGHT - SAFE_BOTTOM
-    qr_cutoff_y = LABEL_HEIGHT - QR_SIZE - SAFE_BOTTOM - 20
-    truncated = False
-
-    for idx, title in enumerate(tracks, start=1):
-
-        if y >= qr_cutoff_y:
-            max_text_width = LABEL_WIDTH - QR_SIZE - SAFE_RIGHT - SAFE_LEFT - 20
-        else:
-            max_text_width = LABEL_WIDTH - SAFE_RIGHT - SAFE_LEFT
-
-        line = f"{idx}. {title}"
-        wrapped = wrap_text(draw, line, FONT_TRACK, max_text_width)
-
-        for wline in wrapped:
-            if y + LINE_SPACING > max_y:
-                truncated = True
-                break
-
-            draw.text((SAFE_LEFT, y), wline, fill="black", font=FONT_TRACK)
-            y += LINE_SPACING
-
-        if truncated:
-            break
-
-    if truncated:
-        draw.text((SAFE_LEFT, y), "...", fill="black", font=FONT_TRACK)
-
-    # ---------------------------
-    # QR CODE (BOTTOM RIGHT)
-    # ---------------------------
-    qr_x = LABEL_WIDTH - QR_SIZE - SAFE_RIGHT
-    qr_y = LABEL_HEIGHT - QR_SIZE - SAFE_BOTTOM
-
-    if mbid:
-        qr_payload = f"https://musicbrainz.org/release/{mbid}"
-        qr = qrcode.make(qr_payload).resize((QR_SIZE, QR_SIZE))
-        img.paste(qr, (qr_x, qr_y))
-
+    remember_tracks(mbid, tracks)
+    return tracks
+
+
+def cd_fields(artist, album, year, genre, mbid, tracks, cover=None):
+    return {
+        "artist": artist,
+        "album": album,
+        "year": year,
+        "genre": genre,
+        "mbid": mbid,
+        "tracks": [f"{idx}. {title}" for idx, title in enumerate(tracks, start=1)],
+        "cover": cover,
+    }
+
+
+def layout_cd_label(artist, album, year, genre, mbid, tracks, metrics=PIL_METRICS, cover=None):
+    """Return the draw ops for a large CD label (the "cd" template).
+
+    Ops are ("text", x, y, text, (kind, size)), ("caption", ...) with the
+    same fields for fixed template wording, ("qr", x, y, size, payload) and
+    ("image", x, y, size, path) for a cached cover thumbnail (cover_art_manager).
+    metrics supplies text widths for the backend that will draw them (PIL or
+    PDF). The track list is auto-fitted: the largest size (then column
+    count) that shows every track wins; truncation is the last resort.
+    """
+    return compile_template("cd").layout(cd_fields(artist, album, year, genre, mbid, tracks, cover), metrics)
+
+
+@lru_cache(maxsize=512)
+def qr_image(payload, size):
+    # pasted, never drawn on, so cached images can be shared between labels
+    return qrcode.make(payload).get_image().resize((size, size))
+
+
+@lru_cache(maxsize=256)
+def caption_image(text, font):
+    # template wording is rendered once and pasted; pasted, never drawn on
+    pil_font = font_at(*font)
+    _, _, right, bottom = pil_font.getbbox(text)
+    img = Image.new("RGB", (max(1, right), max(1, bottom)), "white")
+    draw_text(img, (0, 0), text, pil_font)
+    return img
+
+
+@lru_cache(maxsize=256)
+def cached_image(path, size):
+    # cover thumbnails are already shrunk; this only centres them in the box
+    with Image.open(path) as src:
+        src.load()
+        thumb = ImageOps.contain(src, (size, size)) if max(src.size) > size else src.copy()
+    img = Image.new("RGB", (size, size), "white")
+    img.paste(thumb, ((size - thumb.width) // 2, (size - thumb.height) // 2))
+    return img
+
+
+def render_ops_image(ops, base=None):
+    """Draw ops onto a copy of base (a template's static layer) or a blank label."""
+    img = base.copy() if base is not None else Image.new("RGB", (LABEL_WIDTH, LABEL_HEIGHT), "white")
+
+    for op in ops:
+        if op[0] == "text":
+            _, x, y, text, font = op
+            draw_text(img, (x, y), text, font_at(*font))
+        elif op[0] == "caption":
+            _, x, y, text, font = op
+            img.paste(caption_image(text, font), (round(x), round(y)))
+        elif op[0] == "qr":
+            _, x, y, size, payload = op
+            img.paste(qr_image(payload, size), (x, y))
+        elif op[0] == "image":
+            _, x, y, size, path = op
+            img.paste(cached_image(path, size), (x, y))
+
+    return img
+
+
+def render_template(name, fields):
+    """Render a template's variable ops on a copy of its pre-rendered base."""
+    template = compile_template(name)
+    return render_ops_image(template.variable_ops(fields), base=template.base_image())
+
+
+def render_label_image(artist, album, year, genre, mbid, tracks, cover=None):
+    return render_template("cd", cd_fields(artist, album, year, genre, mbid, tracks, cover))
+
+
+def generate_label_image(artist, album, year, genre, mbid, tracks=None, out_path=None):
+    if out_path is None:
+        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
+        out_path = tmp.name
+        tmp.close()
+
+    if tracks is None:
+        tracks = fetch_track_list(mbid)
+
+    img = render_label_image(artist, album, year, genre, mbid, tracks)
     img.save(out_path, format="PNG")
     return out_path
+
+
+def draw_label_pdf(writer, artist, album, year, genre, mbid, tracks, cover=None):
+    """Add one large CD label as a page of a PdfLabelWriter."""
+    ops = layout_cd_label(artist, album, year, genre, mbid, tracks, metrics=PDF_METRICS, cover=cover)
+    writer.begin_page()
+    writer.draw_ops(ops)
+    writer.end_page()
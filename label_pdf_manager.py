@@ -0,0 +1,109 @@
+# label_pdf_manager.py
+# Vector PDF backend. Layout code keeps working in the same pixel
+# coordinates as the PIL renderers; this writer maps them onto PDF pages.
+from pathlib import Path
+
+from reportlab.graphics import renderPDF
+from reportlab.graphics.barcode.qr import QrCodeWidget
+from reportlab.graphics.shapes import Drawing
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+# Pixel grid the raster layouts were designed for (DYMO LabelWriter 4XL)
+PDF_DPI = 300
+
+# Built-in PDF fonts: no embedding, metric-compatible with Arial
+PDF_FONT_REGULAR = "Helvetica"
+PDF_FONT_BOLD = "Helvetica-Bold"
+
+# PIL draws text from the ascender line; Arial's ascender is 0.905 em
+FONT_ASCENT = 0.905
+
+
+def text_width(text, font_name, size):
+    return stringWidth(text or "", font_name, size)
+
+
+class PdfLabelWriter:
+    """Multi-page PDF, one label per page, drawn in pixel coordinates.
+
+    page_size is the label stock in points; when omitted the page is the
+    label's pixel size at PDF_DPI. Pages are written one at a time and only
+    kept as compressed content streams until close().
+    """
+
+    def __init__(self, path, width_px, height_px, page_size=None, title=None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.width_px = width_px
+        self.height_px = height_px
+
+        if page_size is None:
+            page_size = (width_px * 72 / PDF_DPI, height_px * 72 / PDF_DPI)
+        self.page_size = page_size
+        self.scale = min(page_size[0] / width_px, page_size[1] / height_px)
+
+        self.canvas = canvas.Canvas(str(self.path), pagesize=page_size, pageCompression=1)
+        if title:
+            self.canvas.setTitle(title)
+        self.pages = 0
+        self._open = False
+
+    def begin_page(self):
+        c = self.canvas
+        c.saveState()
+        # top-left origin, same as the raster layouts
+        c.translate(0, self.page_size[1])
+        c.scale(self.scale, self.scale)
+        c.translate(0, -self.height_px)
+        self._open = True
+
+    def end_page(self):
+        self.canvas.restoreState()
+        self.canvas.showPage()
+        self.pages += 1
+        self._open = False
+
+    def text(self, xy, text, font_name, size):
+        if not text:
+            return
+        x, y = xy
+        c = self.canvas
+        c.setFont(font_name, size)
+        c.drawString(x, self.height_px - (y + size * FONT_ASCENT), text)
+
+    def text_width(self, text, font_name, size):
+        return text_width(text, font_name, size)
+
+    def image(self, xy, size, path):
+        """An image file fitted and centred in a size x size box."""
+        x, y = xy
+        self.canvas.drawImage(str(path), x, self.height_px - (y + size), size, size,
+                              preserveAspectRatio=True, anchor="c")
+
+    def qr(self, xy, size, payload):
+        x, y = xy
+        widget = QrCodeWidget(payload)
+        x0, y0, x1, y1 = widget.getBounds()
+        d = Drawing(size, size, transform=[size / (x1 - x0), 0, 0, size / (y1 - y0), 0, 0])
+        d.add(widget)
+        renderPDF.draw(d, self.canvas, x, self.height_px - (y + size))
+
+    def draw_ops(self, ops):
+        """Draw layout ops (see label_image_manager.layout_cd_label) on the current page."""
+        for op in ops:
+            if op[0] in ("text", "caption"):
+                _, x, y, text, (kind, size) = op
+                self.text((x, y), text, PDF_FONT_BOLD if kind == "bold" else PDF_FONT_REGULAR, size)
+            elif op[0] == "qr":
+                _, x, y, size, payload = op
+                self.qr((x, y), size, payload)
+            elif op[0] == "image":
+                _, x, y, size, path = op
+                self.image((x, y), size, path)
+
+    def close(self):
+        if self._open:
+            self.end_page()
+        self.canvas.save()
+        return self.path
@@ -0,0 +1,212 @@
+# label_templates.py
+# Label templates as data. Elements are placed against the safe area of a
+# label stock; compile_template() resolves them once per (template, stock)
+# into absolute positions plus a pre-rendered base image, so each label only
+# lays out its own text. A new stock is one more STOCKS entry.
+#
+# Element types (x from the safe left edge, y from the safe top edge):
+#   text    {"field" | "text", "x", "y", "font"}   one line; "text" is static
+#           and lives in the base image
+#   line    {"x", "y", "font", "sep", "parts": [(caption, field)]}   the parts
+#           whose field is set, joined by sep; captions are pre-rendered
+#   column  {"rows": [(field, y, font)]}   right-aligned to the safe right
+#           edge, all rows sharing the widest row's left edge
+#   block   {"field", "y", "kind", "sizes", "spacing_ratio", "max_columns",
+#            "avoid_qr"}   auto-fitted paragraphs down to the safe bottom;
+#           avoid_qr is True or the field that decides whether there is a QR;
+#           avoid_image names the field whose image, when set, is kept clear too
+#   qr      {"url", "when"?}   bottom-right; url is formatted with the fields,
+#           when names a field that must be set
+#   image   {"field"}   a cached image file (path in the field), fitted into a
+#           QR-sized square just above the QR; skipped when the field is empty
+from functools import lru_cache
+
+from PIL import Image
+
+from label_config import (
+    LABEL_WIDTH,
+    LABEL_HEIGHT,
+    SAFE_LEFT,
+    SAFE_RIGHT,
+    SAFE_TOP,
+    SAFE_BOTTOM,
+    QR_SIZE,
+    LINE_SPACING,
+    TITLE_FONT_SIZE,
+    TRACK_FONT_SIZE,
+    TRACK_FONT_SIZE_MIN,
+    TRACK_MAX_COLUMNS,
+    MOVIE_TITLE_FONT_SIZE,
+    MOVIE_META_FONT_SIZE,
+    MOVIE_BODY_FONT_SIZE,
+    MOVIE_BODY_FONT_SIZE_MIN,
+)
+from glyph_atlas import draw_text
+from layout_manager import ELLIPSIS, PIL_METRICS, fit_block, font_at
+
+QR_CLEARANCE = 20   # text stays this far from the QR code
+
+STOCKS = {
+    # DYMO LabelWriter 4XL, 6 x 4 in at 300 dpi
+    "4xl": {
+        "size": (LABEL_WIDTH, LABEL_HEIGHT),
+        "safe": (SAFE_LEFT, SAFE_TOP, SAFE_RIGHT, SAFE_BOTTOM),
+        "qr_size": QR_SIZE,
+    },
+}
+DEFAULT_STOCK = "4xl"
+
+CD_TITLE = ("bold", TITLE_FONT_SIZE)
+CD_TEXT = ("regular", TRACK_FONT_SIZE)
+MOVIE_TITLE = ("bold", MOVIE_TITLE_FONT_SIZE)
+MOVIE_META = ("regular", MOVIE_META_FONT_SIZE)
+
+TEMPLATES = {
+    "cd": [
+        {"type": "text", "field": "artist", "x": 0, "y": 0, "font": CD_TITLE},
+        {"type": "text", "field": "album", "x": 0, "y": 60, "font": CD_TEXT},
+        {"type": "column", "rows": [("year", 0, CD_TITLE), ("genre", 60, CD_TEXT)]},
+        {"type": "block", "field": "tracks", "y": 130, "kind": "regular",
+         "sizes": (TRACK_FONT_SIZE_MIN, TRACK_FONT_SIZE), "spacing_ratio": LINE_SPACING / TRACK_FONT_SIZE,
+         "max_columns": TRACK_MAX_COLUMNS, "avoid_qr": "mbid", "avoid_image": "cover"},
+        {"type": "image", "field": "cover"},
+        {"type": "qr", "url": "https://musicbrainz.org/release/{mbid}", "when": "mbid"},
+    ],
+    "movie": [
+        {"type": "text", "field": "title", "x": 0, "y": 0, "font": MOVIE_TITLE},
+        {"type": "line", "x": 0, "y": 70, "font": MOVIE_META, "sep": "    ",
+         "parts": [("Rating: ", "rating"), ("", "genres")]},
+        {"type": "column", "rows": [("year", 0, MOVIE_TITLE), ("runtime", 70, MOVIE_META)]},
+        {"type": "line", "x": 0, "y": 140, "font": MOVIE_META, "sep": "    ",
+         "parts": [("TMDB Score: ", "user_rating"), ("Budget: ", "budget")]},
+        {"type": "block", "field": "body", "y": 225, "kind": "regular",
+         "sizes": (MOVIE_BODY_FONT_SIZE_MIN, MOVIE_BODY_FONT_SIZE),
+         "spacing_ratio": LINE_SPACING / MOVIE_BODY_FONT_SIZE, "max_columns": 1, "avoid_qr": "tmdb_id"},
+        {"type": "qr", "url": "https://www.themoviedb.org/movie/{tmdb_id}", "when": "tmdb_id"},
+    ],
+}
+
+
+def _resolve(el, stock):
+    width, height = stock["size"]
+    left, top, right, bottom = stock["safe"]
+    qr = stock["qr_size"]
+    qr_x, qr_y = width - qr - right, height - qr - bottom
+    image_y = qr_y - QR_CLEARANCE - qr
+
+    kind = el["type"]
+    if kind in ("text", "line"):
+        return {**el, "x": left + el["x"], "y": top + el["y"]}
+    if kind == "column":
+        return {**el, "right_x": width - right, "rows": [(f, top + y, font) for f, y, font in el["rows"]]}
+    if kind == "block":
+        return {**el, "box": (left, top + el["y"], width - right, height - bottom),
+                "avoid": (qr_x - QR_CLEARANCE, qr_y - QR_CLEARANCE),
+                "avoid_with_image": (qr_x - QR_CLEARANCE, image_y - QR_CLEARANCE)}
+    if kind == "qr":
+        return {**el, "x": qr_x, "y": qr_y, "size": qr}
+    if kind == "image":
+        return {**el, "x": qr_x, "y": image_y, "size": qr}
+    raise ValueError(f"unknown template element: {kind}")
+
+
+class CompiledTemplate:
+    """A template resolved against one stock. layout() returns draw ops in the
+    label_image_manager format; the PIL renderer starts from base_image()."""
+
+    def __init__(self, elements, stock):
+        self.size = stock["size"]
+        self.static_ops = []
+        self.elements = []
+        for el in elements:
+            el = _resolve(el, stock)
+            if el["type"] == "text" and "text" in el:
+                self.static_ops.append(("text", el["x"], el["y"], el["text"], el["font"]))
+            else:
+                self.elements.append(el)
+        self._base = None
+
+    def base_image(self):
+        """White label with the static elements drawn; copy it, don't draw on it."""
+        if self._base is None:
+            img = Image.new("RGB", self.size, "white")
+            for _, x, y, text, font in self.static_ops:
+                draw_text(img, (x, y), text, font_at(*font))
+            self._base = img
+        return self._base
+
+    def variable_ops(self, fields, metrics=PIL_METRICS):
+        def width(text, font):
+            return metrics.width(text, *font)
+
+        ops = []
+        for el in self.elements:
+            kind = el["type"]
+
+            if kind == "text":
+                ops.append(("text", el["x"], el["y"], fields.get(el["field"]) or "", el["font"]))
+
+            elif kind == "line":
+                font, x, y = el["font"], el["x"], el["y"]
+                first = True
+                for caption, field in el["parts"]:
+                    value = fields.get(field)
+                    if not value:
+                        continue
+                    if not first:
+                        x += width(el["sep"], font)
+                    first = False
+                    if caption:
+                        ops.append(("caption", x, y, caption, font))
+                        x += width(caption, font)
+                    ops.append(("text", x, y, str(value), font))
+                    x += width(str(value), font)
+
+            elif kind == "column":
+                rows = [(fields.get(f) or "", y, font) for f, y, font in el["rows"]]
+                col_w = max((width(text, font) for text, _, font in rows if text), default=0)
+                for text, y, font in rows:
+                    if text:
+                        ops.append(("text", el["right_x"] - col_w, y, text, font))
+
+            elif kind == "block":
+                avoid_qr = el["avoid_qr"]
+                avoid = None
+                if el.get("avoid_image") and fields.get(el["avoid_image"]):
+                    avoid = el["avoid_with_image"]
+                elif avoid_qr is True or fields.get(avoid_qr):
+                    avoid = el["avoid"]
+                fit = fit_block(
+                    fields.get(el["field"]) or [],
+                    box=el["box"],
+                    kind=el["kind"],
+                    sizes=el["sizes"],
+                    spacing_ratio=el["spacing_ratio"],
+                    max_columns=el["max_columns"],
+                    avoid=avoid,
+                    metrics=metrics,
+                )
+                font = (el["kind"], fit.size)
+                for x, y, line in fit.lines:
+                    ops.append(("text", x, y, line, font))
+                if fit.truncated and fit.ellipsis_at:
+                    ops.append(("text", *fit.ellipsis_at, ELLIPSIS, font))
+
+            elif kind == "qr":
+                if "when" not in el or fields.get(el["when"]):
+                    ops.append(("qr", el["x"], el["y"], el["size"], el["url"].format(**fields)))
+
+            elif kind == "image":
+                if fields.get(el["field"]):
+                    ops.append(("image", el["x"], el["y"], el["size"], fields[el["field"]]))
+
+        return ops
+
+    def layout(self, fields, metrics=PIL_METRICS):
+        """Every op for one label, static ones included (for the PDF backend)."""
+        return self.static_ops + self.variable_ops(fields, metrics)
+
+
+@lru_cache(maxsize=None)
+def compile_template(name, stock=DEFAULT_STOCK):
+    return CompiledTemplate(TEMPLATES[name], STOCKS[stock])
@@ -0,0 +1,200 @@
+# layout_manager.py
+# Auto-fit text layout: finds the largest font size (and column count)
+# that fits a block of paragraphs into a box, instead of truncating.
+#
+# Fonts are referred to as (kind, size) with kind "regular" or "bold";
+# both the PIL and the PDF backend resolve that pair to a real font.
+from functools import lru_cache
+
+from PIL import ImageFont
+
+from label_pdf_manager import PDF_FONT_BOLD, PDF_FONT_REGULAR, text_width
+
+FONT_FILES = {"regular": "arial.ttf", "bold": "arialbd.ttf"}
+PDF_FONT_NAMES = {"regular": PDF_FONT_REGULAR, "bold": PDF_FONT_BOLD}
+
+COLUMN_GAP = 30
+ELLIPSIS = "…"
+
+
+@lru_cache(maxsize=None)
+def font_at(kind, size):
+    return ImageFont.truetype(FONT_FILES[kind], size)
+
+
+class TextMetrics:
+    """Width lookups with a per-(kind, size, text) cache.
+
+    Wrapping measures word by word, so once a label's vocabulary is cached
+    a full fit search costs little more than a single layout pass.
+    """
+
+    MAX_ENTRIES = 200_000
+
+    def __init__(self, width_fn):
+        self._width_fn = width_fn
+        self._cache = {}
+
+    def width(self, text, kind, size):
+        key = (kind, size, text)
+        w = self._cache.get(key)
+        if w is None:
+            if len(self._cache) >= self.MAX_ENTRIES:
+                self._cache.clear()
+            w = self._width_fn(text, kind, size)
+            self._cache[key] = w
+        return w
+
+
+PIL_METRICS = TextMetrics(lambda text, kind, size: font_at(kind, size).getlength(text))
+PDF_METRICS = TextMetrics(lambda text, kind, size: text_width(text, PDF_FONT_NAMES[kind], size))
+
+
+class FitResult:
+    def __init__(self, size, line_spacing, columns, lines, truncated, ellipsis_at):
+        self.size = size
+        self.line_spacing = line_spacing
+        self.columns = columns
+        self.lines = lines              # [(x, y, text)]
+        self.truncated = truncated
+        self.ellipsis_at = ellipsis_at  # (x, y) or None
+
+
+def _clip(word, metrics, kind, size, max_w):
+    """Shorten word and end it with an ellipsis so it fits max_w."""
+    for n in range(len(word) - 1, 0, -1):
+        clipped = word[:n] + ELLIPSIS
+        if metrics.width(clipped, kind, size) <= max_w:
+            return clipped
+    return ELLIPSIS
+
+
+def _place(paragraphs, metrics, kind, size, spacing, box, columns, avoid, clip=False):
+    left, top, right, bottom = box
+    col_w = (right - left - COLUMN_GAP * (columns - 1)) / columns
+    space_w = metrics.width(" ", kind, size)
+
+    lines = []
+    col = 0
+    y = top
+
+    def col_bottom(col):
+        if avoid:
+            ax, ay = avoid
+            x0 = left + col * (col_w + COLUMN_GAP)
+            # a column that would shrink to a sliver next to the QR ends above it
+            if ax - x0 < col_w / 2:
+                return min(bottom, ay)
+        return bottom
+
+    def line_width(col, y):
+        x0 = left + col * (col_w + COLUMN_GAP)
+        x1 = x0 + col_w
+        if avoid:
+            ax, ay = avoid
+            # narrow lines that would run into the reserved bottom-right zone
+            if y + spacing > ay and x1 > ax:
+                x1 = ax
+        return x0, x1 - x0
+
+    def next_slot():
+        nonlocal col, y
+        if col >= columns:
+            return False
+        if y + spacing > col_bottom(col):
+            col += 1
+            y = top
+            if col >= columns:
+                return False
+        return True
+
+    for para in paragraphs:
+        words = para.split()
+        if not words:
+            # blank spacer line between paragraphs
+            if lines:
+                if not next_slot():
+                    return lines, False
+                y += spacing
+            continue
+
+        current = []
+        current_w = 0
+        for w in words:
+            if not next_slot():
+                return lines, False
+            x0, max_w = line_width(col, y)
+            ww = metrics.width(w, kind, size)
+            if current and current_w + space_w + ww > max_w:
+                lines.append((x0, y, " ".join(current)))
+                y += spacing
+                current, current_w = [], 0
+                if not next_slot():
+                    return lines, False
+                x0, max_w = line_width(col, y)
+            if not current and ww > max_w:
+                # a word wider than its line would run into the next column or the QR
+                if not clip:
+                    return lines, False
+                w = _clip(w, metrics, kind, size, max_w)
+                ww = metrics.width(w, kind, size)
+            current_w = ww if not current else current_w + space_w + ww
+            current.append(w)
+
+        if current:
+            if not next_slot():
+                return lines, False
+            x0, _ = line_width(col, y)
+            lines.append((x0, y, " ".join(current)))
+            y += spacing
+
+    return lines, True
+
+
+def fit_block(paragraphs, box, kind="regular", sizes=(22, 38), spacing_ratio=44 / 38,
+              max_columns=1, avoid=None, metrics=PIL_METRICS):
+    """Lay out paragraphs in box=(left, top, right, bottom).
+
+    For each column count up to max_columns, binary-searches the largest
+    size in sizes=(min, max) that fits; the largest size wins, fewer
+    columns break ties.
+    avoid=(x, y) reserves the area right of x and below y (the QR code).
+    A size at which a single word is wider than its line doesn't fit.
+    If nothing fits, returns the smallest size at max_columns, truncated.
+    """
+    min_size, max_size = sizes
+
+    def attempt(size, columns, clip=False):
+        spacing = round(size * spacing_ratio)
+        lines, fits = _place(paragraphs, metrics, kind, size, spacing, box, columns, avoid, clip)
+        return spacing, lines, fits
+
+    best = None
+    for columns in range(1, max_columns + 1):
+        lo = min_size if best is None else best[0] + 1
+        hi = max_size
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            spacing, lines, fits = attempt(mid, columns)
+            if fits:
+                best = (mid, spacing, columns, lines)
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        if best and best[0] == max_size:
+            break
+
+    if best:
+        size, spacing, columns, lines = best
+        return FitResult(size, spacing, columns, lines, False, None)
+
+    # Nothing fits: smallest size, most columns, words too wide for a line
+    # are clipped, last line becomes the ellipsis
+    spacing, lines, fits = attempt(min_size, max_columns, clip=True)
+    if fits:
+        return FitResult(min_size, spacing, max_columns, lines, True, None)
+    ellipsis_at = None
+    if lines:
+        x, y, _ = lines.pop()
+        ellipsis_at = (x, y)
+    return FitResult(min_size, spacing, max_columns, lines, True, ellipsis_at)
@@ -0,0 +1,432 @@
+# load_test.py
+# End-to-end ingest load test. Simulated drives replay TOC fixtures into the
+# real cd_to_csv / cd_to_label scan loop while local stand-ins answer for
+# MusicBrainz, Discogs and TMDb. Reports discs/hour, latency percentiles and
+# API call counts, so concurrency, caching and backoff changes can be
+# measured before a long session.
+#
+#   python load_test.py --drives 4 --discs 200
+#   python load_test.py --target cd_to_label --mb-error-rate 0.2
+#   python load_test.py --target movies --titles 100
+#
+# Several stations against one merged catalog (overlapping discs 20-39):
+#   python load_test.py --station a --stations-dir /tmp/st --discs 40 &
+#   python load_test.py --station b --stations-dir /tmp/st --discs 60 --skip 20 &
+#   python merge_stations.py --stations-dir /tmp/st --db /tmp/merged.db --csv "" --follow
+#
+# Runs in a scratch directory, so the real data/ folder is never touched.
+import argparse
+import gzip
+import json
+import os
+import random
+import string
+import sys
+import tempfile
+import threading
+import time
+import types
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from circuit_breaker import breaker_states
+from standin_services import DiscogsStandIn, MusicBrainzStandIn, ServiceProfile, TMDbStandIn
+
+# ---------------- CONFIG ----------------
+DEFAULT_DRIVES = 2
+DEFAULT_DISCS = 50
+SWAP_SECONDS = 5.0          # mean operator time to swap a disc after eject
+GENRES = ["Rock", "Pop", "Jazz", "Electronic", "Classical", "Hip Hop", "Blues", "Reggae"]
+# ---------------------------------------
+
+
+# ===================== FIXTURES =====================
+
+def make_disc_fixtures(n, miss_rate=0.05, tag_rate=0.7, seed=1):
+    """Synthetic discs; miss_rate of them are unknown to MusicBrainz by disc ID."""
+    rng = random.Random(seed)
+    fixtures = []
+    for i in range(n):
+        track_count = rng.randint(8, 24)
+        offsets, pos = [], 150
+        for _ in range(track_count):
+            offsets.append(pos)
+            pos += rng.randint(9000, 30000)   # 2-7 minutes, in sectors
+        genre = rng.choice(GENRES)
+        fixtures.append({
+            "disc_id": "".join(rng.choice(string.ascii_letters + string.digits) for _ in range(27)) + "-",
+            "toc": " ".join(str(v) for v in [1, track_count, pos] + offsets),
+            "mbid": f"{i:08x}-0000-4000-8000-{rng.getrandbits(48):012x}",
+            "artist": f"Load Test Artist {i}",
+            "album": f"Load Test Album {i}",
+            "year": str(rng.randint(1960, 2024)),
+            "genre": genre,
+            "tags": [(genre.lower(), 5)] if rng.random() < tag_rate else [],
+            "tracks": [f"Track {t}" for t in range(1, track_count + 1)],
+            "in_musicbrainz": rng.random() >= miss_rate,
+        })
+    return fixtures
+
+
+def make_movie_fixtures(n, seed=1):
+    rng = random.Random(seed)
+    return [{
+        "tmdb_id": 1000 + i,
+        "title": f"Load Test Movie {i}",
+        "release_date": f"{rng.randint(1970, 2024)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+        "runtime": rng.randint(80, 180),
+        "vote_average": round(rng.uniform(4, 9), 1),
+        "budget": rng.randint(1, 200) * 1_000_000,
+        "genres": [rng.choice(["Drama", "Comedy", "Crime", "Action"])],
+        "overview": "A synthetic film used for load testing. " * rng.randint(2, 12),
+        "cast": [f"Actor {i}-{k}" for k in range(rng.randint(3, 10))],
+        "rating": rng.choice(["G", "PG", "PG-13", "R"]),
+    } for i in range(n)]
+
+
+def write_tmdb_export(movie_fixtures, path):
+    """The movie fixtures as a TMDb daily ID export (for tmdb_index_manager)."""
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for fx in movie_fixtures:
+            f.write(json.dumps({
+                "adult": False,
+                "id": fx["tmdb_id"],
+                "original_title": fx["title"],
+                "popularity": fx["vote_average"],
+                "video": False,
+            }) + "\n")
+    return path
+
+
+def load_fixtures(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# ===================== SIMULATED DRIVES =====================
+
+class DriveBay:
+    """N simulated drives fed from one stack of discs by a simulated operator."""
+
+    def __init__(self, n_drives, fixtures, swap_seconds=SWAP_SECONDS, seed=1):
+        self.names = [f"{string.ascii_uppercase[3 + i]}:" for i in range(n_drives)]
+        self.queue = deque(fixtures)
+        self.by_disc = {fx["disc_id"]: fx for fx in fixtures}
+        self.swap_seconds = swap_seconds
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+        now = time.monotonic()
+        self.slots = {name: {"fx": None, "ready_at": now} for name in self.names}
+        self.inserted_at = {}       # disc_id -> insertion time
+        self.latencies = []         # insertion -> process_disc finished, seconds
+        self.active = None          # fixture currently being processed
+        self.started = now
+        self.finished_at = None
+
+    def _swap_delay(self):
+        return self.rng.expovariate(1 / self.swap_seconds) if self.swap_seconds else 0.0
+
+    # ---------- drive_manager / discid surface ----------
+
+    def get_optical_drives(self):
+        return list(self.names)
+
+    def get_current_disc_id(self, drive):
+        now = time.monotonic()
+        with self.lock:
+            slot = self.slots[drive]
+            if slot["fx"] is None and self.queue and now >= slot["ready_at"]:
+                slot["fx"] = self.queue.popleft()
+                self.inserted_at[slot["fx"]["disc_id"]] = now
+            return slot["fx"]["disc_id"] if slot["fx"] else None
+
+    def eject_cd(self, drive):
+        with self.lock:
+            slot = self.slots[drive]
+            if slot["fx"] is not None:
+                slot["fx"] = None
+                slot["ready_at"] = time.monotonic() + self._swap_delay()
+
+    def read(self, drive):
+        with self.lock:
+            fx = self.slots[drive]["fx"]
+        if fx is None:
+            raise _DiscError(f"no disc in {drive}")
+        numbers = [int(v) for v in fx["toc"].split()]
+        first, last, leadout, offsets = numbers[0], numbers[1], numbers[2], numbers[3:]
+        ends = offsets[1:] + [leadout]
+        tracks = [types.SimpleNamespace(number=n, offset=o, length=e - o)
+                  for n, (o, e) in enumerate(zip(offsets, ends), start=first)]
+        return types.SimpleNamespace(id=fx["disc_id"], toc_string=fx["toc"], tracks=tracks,
+                                     first_track_num=first, last_track_num=last, sectors=leadout)
+
+    # ---------- bookkeeping ----------
+
+    def finished(self, disc_id):
+        with self.lock:
+            start = self.inserted_at.get(disc_id)
+            if start is not None:
+                self.latencies.append(time.monotonic() - start)
+            # a disc the loop skipped still has to leave the drive
+            for slot in self.slots.values():
+                if slot["fx"] and slot["fx"]["disc_id"] == disc_id:
+                    slot["fx"] = None
+                    slot["ready_at"] = time.monotonic() + self._swap_delay()
+
+    def done(self):
+        with self.lock:
+            idle = not self.queue and all(s["fx"] is None for s in self.slots.values())
+        if idle and self.finished_at is None:
+            self.finished_at = time.monotonic()
+        return idle
+
+
+class _DiscError(Exception):
+    pass
+
+
+def install_simulated_hardware(bay):
+    """Put the drive bay behind the drive_manager and discid modules the scan loop imports."""
+    fake_discid = types.ModuleType("discid")
+    fake_discid.read = bay.read
+    fake_discid.DiscError = _DiscError
+    sys.modules["discid"] = fake_discid
+
+    fake_drives = types.ModuleType("drive_manager")
+    fake_drives.get_optical_drives = bay.get_optical_drives
+    fake_drives.get_current_disc_id = bay.get_current_disc_id
+    fake_drives.get_disc_toc = lambda drive: (bay.read(drive).id, bay.read(drive).toc_string)
+    fake_drives.eject_cd = bay.eject_cd
+    fake_drives.print_track_durations = lambda drive, print_func=print: None
+    sys.modules["drive_manager"] = fake_drives
+
+
+# ===================== SERVICES =====================
+
+def start_standins(args, disc_fixtures, movie_fixtures):
+    def profile(prefix):
+        return ServiceProfile(
+            latency=getattr(args, f"{prefix}_latency"),
+            jitter=args.jitter,
+            error_rate=getattr(args, f"{prefix}_error_rate"),
+            rate_limit=getattr(args, f"{prefix}_rate_limit"),
+        )
+
+    services = [
+        MusicBrainzStandIn(disc_fixtures, profile("mb")).start(),
+        DiscogsStandIn(disc_fixtures, profile("discogs")).start(),
+        TMDbStandIn(movie_fixtures, profile("tmdb")).start(),
+    ]
+    mb_standin, discogs_standin, tmdb_standin = services
+
+    import musicbrainzngs as mb
+    import discogs_client
+    import tmdb_manager
+
+    mb.set_hostname(mb_standin.address, use_https=False)
+    if args.mb_client_interval:
+        mb.set_rate_limit(args.mb_client_interval)
+    else:
+        mb.set_rate_limit(False)
+    discogs_client.Client._base_url = f"http://{discogs_standin.address}"
+    tmdb_manager.TMDB_BASE = f"http://{tmdb_standin.address}"
+
+    os.environ.setdefault("DISCOGS_TOKEN", "load-test")
+    os.environ.setdefault("TMDB_API_KEY", "load-test")
+    return services
+
+
+# ===================== SCENARIOS =====================
+
+def run_scan(args, disc_fixtures):
+    bay = DriveBay(args.drives, disc_fixtures, swap_seconds=args.swap_seconds, seed=args.seed)
+    install_simulated_hardware(bay)
+
+    if args.station:
+        import station_manager
+        station_manager.STATION = args.station
+        station_manager.STATIONS_DIR = args.stations_dir
+
+    target = __import__(args.target)   # runs the script's start-up (drive detection, catalog, tokens)
+    target.POLL_SECONDS = args.poll_seconds
+    target.DRIVE_SETTLE_SECONDS = args.settle_seconds
+
+    # The operator types the right artist/album for discs MusicBrainz can't find by ID
+    # (cd_to_label prompts itself; cd_to_csv prompts through review_queue_manager)
+    import review_queue_manager
+    for module in (target, review_queue_manager):
+        module.prompt_for_mbid_with_clipboard = lambda *a, **k: None
+        module.prompt_for_local_release = lambda *a, **k: (None, None, None, None)
+        module.prompt_for_artist_album = lambda *a, **k: (bay.active["artist"], bay.active["album"])
+    if hasattr(target, "DEFER_REVIEW"):
+        target.DEFER_REVIEW = not args.inline_review
+
+    if args.target == "cd_to_label":
+        # simulated printers: null stand-ins taking --print-seconds per label
+        simulated = ",".join([f"null?seconds={args.print_seconds}"] * args.printers)
+        target.PRINTER_BACKEND = args.printer or f"pool:{simulated}"
+
+    process_disc = target.process_disc
+
+    def timed_process_disc(drive, disc_id, seen, journal):
+        bay.active = bay.by_disc.get(disc_id)
+        try:
+            process_disc(drive, disc_id, seen, journal)
+        finally:
+            bay.finished(disc_id)
+
+    target.process_disc = timed_process_disc
+    target.main(stop=bay.done)
+    if args.target == "cd_to_label":
+        bay.finished_at = time.monotonic()   # main() waits for the last labels to print
+    return bay
+
+
+def run_movies(args, movie_fixtures):
+    import movie_to_label
+
+    if args.offline_index:
+        # title searches then stay local; only details fetches reach TMDb
+        from tmdb_index_manager import TitleIndex, TMDB_INDEX_PATH
+
+        TitleIndex(TMDB_INDEX_PATH).import_export(write_tmdb_export(movie_fixtures, "movie_ids.json.gz"))
+
+    latencies = []
+    lock = threading.Lock()
+
+    def resolve(fx):
+        start = time.monotonic()
+        year = None if args.offline_index else fx["release_date"][:4]
+        status, _ = movie_to_label.resolve_title(fx["title"], year, "load-test")
+        with lock:
+            latencies.append(time.monotonic() - start)
+        return status
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        statuses = list(pool.map(resolve, movie_fixtures))
+
+    result = types.SimpleNamespace(latencies=latencies, started=started, finished_at=time.monotonic())
+    result.statuses = {s: statuses.count(s) for s in set(statuses)}
+    return result
+
+
+# ===================== REPORT =====================
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def build_report(args, run, services):
+    elapsed = (run.finished_at or time.monotonic()) - run.started
+    done = len(run.latencies)
+    return {
+        "target": args.target,
+        "drives": args.drives if args.target != "movies" else None,
+        "items": done,
+        "elapsed_seconds": round(elapsed, 1),
+        "per_hour": round(done / elapsed * 3600, 1) if elapsed else 0.0,
+        "latency_seconds": {
+            "p50": round(percentile(run.latencies, 50), 2),
+            "p90": round(percentile(run.latencies, 90), 2),
+            "p99": round(percentile(run.latencies, 99), 2),
+            "max": round(max(run.latencies, default=0.0), 2),
+        },
+        "api_calls": {
+            s.name: {f"{endpoint} {status}": n for (endpoint, status), n in sorted(s.calls.items())}
+            for s in services
+        },
+        "breakers": breaker_states(),
+        **({"statuses": run.statuses} if hasattr(run, "statuses") else {}),
+    }
+
+
+def print_report(report):
+    unit = "titles" if report["target"] == "movies" else "discs"
+    print("\n========== LOAD TEST ==========")
+    print(f"Target:      {report['target']}" + (f" ({report['drives']} drives)" if report["drives"] else ""))
+    print(f"Processed:   {report['items']} {unit} in {report['elapsed_seconds']}s")
+    print(f"Throughput:  {report['per_hour']} {unit}/hour")
+    lat = report["latency_seconds"]
+    print(f"Latency:     p50 {lat['p50']}s  p90 {lat['p90']}s  p99 {lat['p99']}s  max {lat['max']}s")
+    for service, calls in report["api_calls"].items():
+        total = sum(calls.values())
+        detail = ", ".join(f"{k}: {v}" for k, v in calls.items()) or "none"
+        print(f"{service + ':':<13}{total} calls ({detail})")
+    if report["breakers"]:
+        print("Breakers:    " + ", ".join(f"{k} {v}" for k, v in report["breakers"].items()))
+    if "statuses" in report:
+        print("Outcomes:    " + ", ".join(f"{k} {v}" for k, v in report["statuses"].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test ingest with simulated drives and local API stand-ins.")
+    parser.add_argument("--target", choices=["cd_to_csv", "cd_to_label", "movies"], default="cd_to_csv")
+    parser.add_argument("--drives", type=int, default=DEFAULT_DRIVES)
+    parser.add_argument("--discs", type=int, default=DEFAULT_DISCS)
+    parser.add_argument("--titles", type=int, default=DEFAULT_DISCS, help="movie titles (--target movies)")
+    parser.add_argument("--workers", type=int, default=8, help="lookup threads (--target movies)")
+    parser.add_argument("--offline-index", action="store_true",
+                        help="search titles in a local TMDb index built from the fixtures (--target movies)")
+    parser.add_argument("--fixtures", help="JSON lines of disc fixtures (disc_id, toc, mbid, artist, album, ...)")
+    parser.add_argument("--skip", type=int, default=0, help="leave out the first N discs (stations with overlapping stacks)")
+    parser.add_argument("--miss-rate", type=float, default=0.05, help="share of discs unknown by disc ID")
+    parser.add_argument("--tag-rate", type=float, default=0.7, help="share of releases with MusicBrainz genre tags")
+    parser.add_argument("--swap-seconds", type=float, default=SWAP_SECONDS, help="mean operator swap time")
+    parser.add_argument("--poll-seconds", type=float, default=1.0)
+    parser.add_argument("--settle-seconds", type=float, default=2.0)
+    parser.add_argument("--inline-review", action="store_true",
+                        help="prompt for unidentified discs during the scan instead of queueing them (cd_to_csv)")
+    parser.add_argument("--print-seconds", type=float, default=1.5, help="simulated printer time (cd_to_label)")
+    parser.add_argument("--printers", type=int, default=1, help="simulated printers sharing the labels (cd_to_label)")
+    parser.add_argument("--printer", help='real printer backend instead, e.g. "null" or "pool:file:a,file:b" (cd_to_label)')
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--mb-client-interval", type=float, default=1.0,
+                        help="musicbrainzngs client rate limit interval; 0 disables it")
+    for prefix, latency, rate in (("mb", 0.3, 1), ("discogs", 0.4, 1), ("tmdb", 0.15, 40)):
+        parser.add_argument(f"--{prefix}-latency", type=float, default=latency)
+        parser.add_argument(f"--{prefix}-error-rate", type=float, default=0.0)
+        parser.add_argument(f"--{prefix}-rate-limit", type=float, default=rate, help="requests/s, 0 = unlimited")
+    parser.add_argument("--workdir", help="scratch directory (default: a new temp dir)")
+    parser.add_argument("--station", help="scan as this station, journalling rows for merge_stations.py (cd_to_csv)")
+    parser.add_argument("--stations-dir", default="stations", help="station journals (outside the scratch directory)")
+    parser.add_argument("--report", help="also write the report as JSON here")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    disc_fixtures = load_fixtures(args.fixtures) if args.fixtures else \
+        make_disc_fixtures(args.discs, args.miss_rate, args.tag_rate, args.seed)
+    disc_fixtures = disc_fixtures[args.skip:]
+    movie_fixtures = make_movie_fixtures(args.titles, args.seed)
+
+    # scripts use relative data/ paths; keep the real catalog out of it
+    args.stations_dir = os.path.abspath(args.stations_dir)
+    repo_dir = str(Path(__file__).resolve().parent)
+    if repo_dir not in sys.path:
+        sys.path.insert(0, repo_dir)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="cdlabel_load_")
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    print(f"Scratch directory: {workdir}")
+
+    services = start_standins(args, disc_fixtures, movie_fixtures)
+    try:
+        run = run_movies(args, movie_fixtures) if args.target == "movies" else run_scan(args, disc_fixtures)
+    finally:
+        for s in services:
+            s.stop()
+
+    report = build_report(args, run, services)
+    print_report(report)
+    if args.report:
+        Path(args.report).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# merge_stations.py
+# Folds the scan stations' journals (station_manager.py) into one catalog
+# and rewrites the CSV when anything changed. Safe to run repeatedly or
+# continuously while the stations are scanning: each pass only reads what
+# was appended since the last one.
+#
+#   python merge_stations.py                       # one pass over data/stations/
+#   python merge_stations.py --follow              # keep merging as stations ingest
+#   python merge_stations.py --stations-dir S:/scans --db data/catalog.db
+import argparse
+import time
+
+from catalog_manager import CATALOG_PATH, CSV_PATH, open_catalog
+from station_manager import STATIONS_DIR, StationMerger
+
+# ---------------- CONFIG ----------------
+MERGE_POLL_SECONDS = 5      # --follow looks for new journal lines this often
+# ---------------------------------------
+
+
+def report(results):
+    for name, stats in results.items():
+        detail = ", ".join(f"{n} {outcome}" for outcome, n in sorted(stats.items()))
+        print(f"{name}: {sum(stats.values())} new ({detail})")
+
+
+def merge_once(merger, csv_path=CSV_PATH):
+    results = merger.merge()
+    report(results)
+    changed = any(n for stats in results.values() for outcome, n in stats.items()
+                  if outcome not in ("already merged", "skipped", "copy waiting"))
+    if changed and csv_path:
+        imported, _ = merger.catalog.sync_csv(csv_path)
+        if imported:
+            # rows written to the CSV outside the merge; later journal lines must find them
+            print(f"Kept {imported} CSV rows the catalog didn't have.")
+            merger.load_index()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge scan station journals into one catalog.")
+    parser.add_argument("--stations-dir", default=STATIONS_DIR)
+    parser.add_argument("--db", default=CATALOG_PATH)
+    parser.add_argument("--csv", default=CSV_PATH, help='rewritten after each pass that changed rows; "" to skip')
+    parser.add_argument("--follow", action="store_true", help="keep merging until interrupted")
+    parser.add_argument("--interval", type=float, default=MERGE_POLL_SECONDS)
+    args = parser.parse_args()
+
+    catalog = open_catalog(args.db, args.csv or None)
+    merger = StationMerger(catalog, args.stations_dir)
+
+    try:
+        merge_once(merger, args.csv)
+        while args.follow:
+            time.sleep(args.interval)
+            merge_once(merger, args.csv)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Catalog: {len(catalog)} discs")
+        catalog.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 # movie_to_label.py
+import argparse
 import os
+import re
 import time
-import win32ui
-from PIL import Image, ImageWin
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
 
 from tmdb_manager import (
     TMDbError,
@@ -13,28 +15,35 @@ from tmdb_manager import (
     get_movie_certification,
     prompt_select_movie,
 )
-from movie_label_image_manager import generate_movie_label_image
+from movie_label_image_manager import generate_movie_label_image, write_movie_labels_pdf
+from printer_manager import print_image_to_dymo
+from render_service import RenderServiceError, render_remote
 
 DEBUG = False
 PRINTER_NAME = "DYMO LabelWriter 4XL"
-
-def print_image_to_dymo(image_path, printer_name=PRINTER_NAME):
-    img = Image.open(image_path)
-
-    hdc = win32ui.CreateDC()
-    hdc.CreatePrinterDC(printer_name)
-
-    hdc.StartDoc("Movie Label")
-    hdc.StartPage()
-
-    dib = ImageWin.Dib(img)
-    width = hdc.GetDeviceCaps(8)
-    height = hdc.GetDeviceCaps(10)
-    dib.draw(hdc.GetHandleOutput(), (0, 0, width, height))
-
-    hdc.EndPage()
-    hdc.EndDoc()
-    hdc.DeleteDC()
+RENDER_SERVER = None   # e.g. "http://127.0.0.1:8765" to print through a running render_service.py
+BATCH_OUT_DIR = "data/movie_labels"
+BATCH_LOOKUP_WORKERS = 8
+
+def label_fields(details, certification, cast_names):
+    return dict(
+        title=details.get("title") or "",
+        release_date=details.get("release_date") or "",
+        runtime_min=details.get("runtime"),
+        rating=certification,
+        user_rating=details.get("vote_average"),
+        budget=details.get("budget"),
+        genres=details.get("genres") or [],
+        synopsis=details.get("overview") or "",
+        cast=cast_names,
+        tmdb_id=details.get("id"),
+    )
+
+def fetch_label_fields(movie_id, api_key):
+    details = get_movie_details(movie_id, api_key=api_key)
+    certification = get_movie_certification(movie_id, api_key=api_key)
+    cast_names = get_movie_cast(movie_id, api_key=api_key)
+    return label_fields(details, certification, cast_names)
 
 def main():
     api_key = get_tmdb_api_key()
@@ -56,28 +65,23 @@ def main():
             else:
                 movie_id = prompt_select_movie(results)
 
-            details = get_movie_details(movie_id, api_key=api_key)
-            certification = get_movie_certification(movie_id, api_key=api_key)
-            cast_names = get_movie_cast(movie_id, api_key=api_key)
-
-            label_path = generate_movie_label_image(
-                title=details.get("title") or "",
-                release_date=details.get("release_date") or "",
-                runtime_min=details.get("runtime"),
-                rating=certification,
-                user_rating=details.get("vote_average"),
-                budget=details.get("budget"),
-                genres=details.get("genres") or [],
-                synopsis=details.get("overview") or "",
-                cast=cast_names,
-                tmdb_id=details.get("id"),
-            )
+            fields = fetch_label_fields(movie_id, api_key)
+
+            if RENDER_SERVER and not DEBUG:
+                try:
+                    render_remote("movie", fields, print_label=True, server=RENDER_SERVER)
+                    print("Label printed by render service.")
+                    continue
+                except RenderServiceError as exc:
+                    print(f"{exc}; rendering locally.")
+
+            label_path = generate_movie_label_image(**fields)
 
             print(f"Label generated: {label_path}")
             time.sleep(0.5)
 
             if not DEBUG:
-                print_image_to_dymo(label_path)
+                print_image_to_dymo(label_path, PRINTER_NAME, doc_name="Movie Label")
                 try:
                     os.remove(label_path)
                 except:
@@ -92,5 +96,153 @@ def main():
             print("\nExiting.")
             break
 
+# ===================== BATCH MODE =====================
+
+_TITLE_YEAR = re.compile(r"^(?P<title>.+?)\s*(?:\((?P<y1>\d{4})\)|[,;|\t]\s*(?P<y2>\d{4}))\s*$")
+
+def read_titles(path):
+    """Read "Title", "Title (1999)" or "Title, 1999" lines; # starts a comment."""
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            m = _TITLE_YEAR.match(line)
+            if m:
+                entries.append((m.group("title"), int(m.group("y1") or m.group("y2"))))
+            else:
+                entries.append((line, None))
+    return entries
+
+def _normalize_title(title):
+    return re.sub(r"[^0-9a-z]+", " ", (title or "").lower()).strip()
+
+def pick_unambiguous(title, year, results):
+    """Return the movie id when the search results leave no real choice, else None."""
+    if len(results) == 1:
+        return results[0]["id"]
+
+    wanted = _normalize_title(title)
+    exact = [
+        m for m in results
+        if wanted in (_normalize_title(m.get("title")), _normalize_title(m.get("original_title")))
+        and (not year or (m.get("release_date") or "")[:4] == str(year))
+    ]
+    if len(exact) == 1:
+        return exact[0]["id"]
+    return None
+
+def resolve_title(title, year, api_key):
+    """Returns ("ok", fields), ("review", results) or ("missing", None)."""
+    results = search_movies(title, api_key=api_key, year=year)
+    if not results and year:
+        results = search_movies(title, api_key=api_key)
+    if not results:
+        return "missing", None
+
+    movie_id = pick_unambiguous(title, year, results)
+    if movie_id is None:
+        return "review", results
+    return "ok", fetch_label_fields(movie_id, api_key)
+
+def _render_png(job):
+    out_path, fields = job
+    return generate_movie_label_image(**fields, out_path=out_path)
+
+def _label_filename(i, fields):
+    slug = re.sub(r"[^0-9A-Za-z]+", "_", fields["title"]).strip("_")[:60]
+    return f"{i:04d}_{slug or fields['tmdb_id']}.png"
+
+def run_batch(titles_path, out_format="png", workers=BATCH_LOOKUP_WORKERS, print_labels=False):
+    api_key = get_tmdb_api_key()
+    entries = read_titles(titles_path)
+    print(f"Resolving {len(entries)} titles with {workers} workers...")
+
+    resolved = {}
+    review = []
+    missing = []
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(resolve_title, title, year, api_key) for title, year in entries]
+        for i, ((title, year), fut) in enumerate(zip(entries, futures)):
+            label = f"{title} ({year})" if year else title
+            try:
+                status, payload = fut.result()
+            except TMDbError as exc:
+                print(f"[{label}] {exc}")
+                missing.append(label)
+                continue
+
+            if status == "ok":
+                resolved[i] = payload
+            elif status == "review":
+                review.append((i, label, payload))
+            else:
+                missing.append(label)
+
+    print(f"Resolved {len(resolved)}, {len(review)} need review, {len(missing)} not found.")
+
+    # Ambiguous matches are reviewed together at the end, not per title
+    chosen = []
+    for i, label, results in review:
+        print(f"\nAmbiguous: {label}")
+        try:
+            chosen.append((i, label, prompt_select_movie(results)))
+        except TMDbError as exc:
+            print(exc)
+            missing.append(label)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [(i, label, pool.submit(fetch_label_fields, movie_id, api_key)) for i, label, movie_id in chosen]
+        for i, label, fut in futures:
+            try:
+                resolved[i] = fut.result()
+            except TMDbError as exc:
+                print(f"[{label}] {exc}")
+                missing.append(label)
+
+    labels = [resolved[i] for i in sorted(resolved)]
+    if not labels:
+        print("Nothing to render.")
+        return []
+
+    batch_dir = Path(BATCH_OUT_DIR) / time.strftime("batch_%Y%m%d_%H%M%S")
+    batch_dir.mkdir(parents=True, exist_ok=True)
+
+    if out_format == "pdf":
+        outputs = [write_movie_labels_pdf(labels, batch_dir / "movie_labels.pdf")]
+    else:
+        jobs = [(str(batch_dir / _label_filename(n, fields)), fields) for n, fields in enumerate(labels, start=1)]
+        with ProcessPoolExecutor() as pool:
+            outputs = list(pool.map(_render_png, jobs))
+
+    for path in outputs:
+        print(f"Generated: {path}")
+    if missing:
+        print("\nNot labelled:")
+        for label in missing:
+            print(f"  {label}")
+
+    if print_labels and out_format == "png" and not DEBUG:
+        for path in outputs:
+            print_image_to_dymo(path, PRINTER_NAME, doc_name="Movie Label")
+        print(f"Printed {len(outputs)} labels.")
+
+    return outputs
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Movie labels from TMDb.")
+    sub = parser.add_subparsers(dest="command")
+    batch = sub.add_parser("batch", help="label every title listed in a file")
+    batch.add_argument("titles", help='text file, one "Title" or "Title (Year)" per line')
+    batch.add_argument("--format", choices=["png", "pdf"], default="png")
+    batch.add_argument("--workers", type=int, default=BATCH_LOOKUP_WORKERS)
+    batch.add_argument("--print", dest="print_labels", action="store_true",
+                       help="send the rendered PNGs to the label printer")
+    args = parser.parse_args()
+
+    if args.command == "batch":
+        run_batch(args.titles, args.format, args.workers, args.print_labels)
+    else:
+        main()
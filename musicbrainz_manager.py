@@ -5,10 +5,68 @@ import random
 import urllib.error
 import re
 
+from release_index_manager import get_release_index, remember_release
+from circuit_breaker import CircuitOpenError, DeadlineExceeded, get_breaker
+
 MAX_RETRY_COUNT=3
 
+# MusicBrainz tags are free-form; map the common ones onto the Discogs-style
+# genre names already used in the genre column. Exact tags win, then keywords.
+GENRE_TAGS = {
+    "rock": "Rock", "hard rock": "Rock", "alternative rock": "Rock", "indie rock": "Rock",
+    "punk": "Rock", "punk rock": "Rock", "metal": "Rock", "heavy metal": "Rock",
+    "grunge": "Rock", "new wave": "Rock", "post-punk": "Rock", "progressive rock": "Rock",
+    "pop": "Pop", "synth-pop": "Pop", "dance-pop": "Pop", "pop rock": "Pop",
+    "electronic": "Electronic", "electronica": "Electronic", "techno": "Electronic",
+    "house": "Electronic", "ambient": "Electronic", "trance": "Electronic",
+    "drum and bass": "Electronic", "idm": "Electronic", "trip hop": "Electronic",
+    "hip hop": "Hip Hop", "hip-hop": "Hip Hop", "rap": "Hip Hop",
+    "jazz": "Jazz", "bebop": "Jazz", "fusion": "Jazz",
+    "classical": "Classical", "baroque": "Classical", "opera": "Classical",
+    "contemporary classical": "Classical",
+    "soul": "Funk / Soul", "funk": "Funk / Soul", "r&b": "Funk / Soul",
+    "rhythm and blues": "Funk / Soul", "disco": "Funk / Soul",
+    "blues": "Blues",
+    "folk": "Folk, World, & Country", "country": "Folk, World, & Country",
+    "singer-songwriter": "Folk, World, & Country", "world": "Folk, World, & Country",
+    "reggae": "Reggae", "ska": "Reggae", "dub": "Reggae",
+    "latin": "Latin", "salsa": "Latin", "bossa nova": "Latin",
+    "soundtrack": "Stage & Screen", "musical": "Stage & Screen", "score": "Stage & Screen",
+    "children's music": "Children's", "spoken word": "Non-Music", "comedy": "Non-Music",
+}
+GENRE_KEYWORDS = ["metal", "punk", "rock", "hip hop", "jazz", "blues", "folk", "country",
+                  "soul", "funk", "reggae", "electronic", "techno", "house", "pop", "classical"]
+
 def init_musicbrainz(app_name="CDLabeler", version="1.0", contact="you@example.com"):
     mb.set_useragent(app_name, version, contact)
+    # The web service accepts tags on disc ID lookups; musicbrainzngs' include
+    # whitelist just doesn't list them.
+    discid_includes = mb.musicbrainz.VALID_INCLUDES["discid"]
+    if "tags" not in discid_includes:
+        discid_includes.append("tags")
+
+def genre_from_tags(*tag_lists):
+    """Best genre for the given MusicBrainz tag-lists (most votes first), or ""."""
+    tags = sorted(
+        (t for tags in tag_lists for t in (tags or [])),
+        key=lambda t: -int(t.get("count", 0) or 0),
+    )
+    for t in tags:
+        genre = GENRE_TAGS.get(t.get("name", "").lower())
+        if genre:
+            return genre
+    for t in tags:
+        name = t.get("name", "").lower()
+        for keyword in GENRE_KEYWORDS:
+            if keyword in name:
+                return GENRE_TAGS[keyword]
+    return ""
+
+def release_genre(release):
+    return genre_from_tags(
+        release.get("release-group", {}).get("tag-list"),
+        release.get("tag-list"),
+    )
 
 def extract_mbid_from_text(text):
     if not text:
@@ -24,32 +82,50 @@ def extract_mbid_from_text(text):
     return None
 
 
-def mb_with_retry(func, *args, retries=MAX_RETRY_COUNT, base_delay=1.0, **kwargs):
+def is_client_error(e):
+    # 400 (bad request) and 404 (unknown disc/release) won't change on retry
     response_error = getattr(mb, "ResponseError", None)
+    cause = getattr(e, "cause", None)
+    return (
+        response_error
+        and isinstance(e, response_error)
+        and getattr(cause, "code", getattr(e, "status", None)) in (400, 404)
+    ) or (isinstance(e, urllib.error.HTTPError) and e.code in (400, 404))
+
+def mb_with_retry(func, *args, retries=MAX_RETRY_COUNT, base_delay=1.0, deadline=None, **kwargs):
+    breaker = get_breaker("MusicBrainz")
     attempt = 0
     while True:
+        if deadline:
+            deadline.check("MusicBrainz request")
+        breaker.check()
         try:
-            return func(*args, **kwargs)
+            result = func(*args, **kwargs)
+            breaker.record_success()
+            return result
         except Exception as e:
-            if (
-                response_error
-                and isinstance(e, response_error)
-                and getattr(e, "status", None) == 404
-            ) or (isinstance(e, urllib.error.HTTPError) and e.code == 404):
+            if is_client_error(e):
+                # the service answered; a missing disc/release is not an outage
+                breaker.record_success()
                 raise
+            breaker.record_failure()
             attempt += 1
-            if attempt > retries:
-                print(f"MusicBrainz failed after {retries} retries: {e}")
+            if attempt > retries or breaker.is_open:
+                print(f"MusicBrainz failed after {attempt} attempt(s): {e}")
                 raise
 
             delay = base_delay * (2 ** (attempt - 1))
             delay += random.uniform(0, 0.5)
+            if deadline and not deadline.allows_wait(delay):
+                raise DeadlineExceeded(f"MusicBrainz retry would exceed disc time budget: {e}") from e
             print(f"MusicBrainz error: {e} - retrying in {delay:.1f}s (attempt {attempt}/{retries})")
             time.sleep(delay)
+        finally:
+            breaker.release_trial()
 
 def get_release_by_mbid(mbid, print_func=print):
     try:
-        result = mb_with_retry(mb.get_release_by_id, mbid, includes=["recordings", "artists"])
+        result = mb_with_retry(mb.get_release_by_id, mbid, includes=["recordings", "artists", "release-groups", "tags"])
         release = result["release"]
 
         artist = ""
@@ -67,39 +143,63 @@ def get_release_by_mbid(mbid, print_func=print):
         date = release.get("date", "")
         year = date[:4] if date else ""
         mbid = release.get("id", mbid)
+        genre = release_genre(release)
 
-        return artist, album, year, mbid
+        remember_release(artist, album, year, mbid, genre)
+        return artist, album, year, mbid, genre
 
     except Exception as e:
         print_func(f"Failed to fetch release for MBID {mbid}: {e}")
-        return None, None, None, None
+        return None, None, None, None, None
 
-def get_musicbrainz_metadata(drive):
+def get_musicbrainz_metadata(drive, deadline=None):
     try:
         disc = discid.read(drive)
+    except Exception:
+        return None, None, None, None, None
+    return lookup_disc_id(disc.id, deadline=deadline)
 
+def lookup_disc_id(disc_id, toc=None, deadline=None):
+    """Release for a disc ID. With a TOC ("first last leadout offsets..."),
+    MusicBrainz falls back to fuzzy TOC matching when the ID itself is unknown."""
+    try:
         result = mb_with_retry(
             mb.get_releases_by_discid,
-            disc.id,
-            includes=["artists", "release-groups"]
+            disc_id,
+            includes=["artists", "release-groups", "tags"],
+            toc=toc,
+            deadline=deadline,
         )
 
-        release = result["disc"]["release-list"][0]
+        if "disc" in result:
+            release = result["disc"]["release-list"][0]
+        else:
+            release = result["release-list"][0]
 
         artist = release["artist-credit"][0]["artist"]["name"]
         album = release["title"]
         year = release.get("date", "")[:4]
         mbid = release["id"]
+        genre = release_genre(release)
 
-        return artist, album, year, mbid
+        remember_release(artist, album, year, mbid, genre)
+        return artist, album, year, mbid, genre
 
+    except (CircuitOpenError, DeadlineExceeded) as e:
+        print(e)
+        return None, None, None, None, None
     except Exception:
-        return None, None, None, None
+        return None, None, None, None, None
     
 
 # ---------- SEARCH / FALLBACK HELPERS ----------
 
 def search_mb_by_artist_album(artist, album):
+    local = get_release_index().best_match(artist, album)
+    if local and local["mbid"]:
+        print(f"Matched local index: {local['artist']} - {local['album']}")
+        return local["artist"], local["album"], local["year"], local["mbid"]
+
     try:
         result = mb_with_retry(
             mb.search_releases,
@@ -113,6 +213,14 @@ def search_mb_by_artist_album(artist, album):
     if not releases:
         return None, None, None, None
 
+    for r in releases:
+        remember_release(
+            r.get("artist-credit", [{}])[0].get("artist", {}).get("name", ""),
+            r.get("title", ""),
+            r.get("date", "")[:4],
+            r.get("id"),
+        )
+
     r = releases[0]
     return (
         r.get("artist-credit", [{}])[0].get("artist", {}).get("name", ""),
@@ -0,0 +1,128 @@
+# pipeline_manager.py
+# Small staged pipeline: each stage is a pool of threads reading from a
+# bounded queue, so network waits, rendering and disk writes overlap while
+# memory stays capped by the queue sizes.
+import queue
+import threading
+import time
+
+_DONE = object()
+
+
+class Stage:
+    def __init__(self, name, func, workers=1, queue_size=8):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.queue_size = queue_size
+
+        self.items = 0
+        self.errors = 0
+        self.busy = 0.0      # seconds spent inside func, summed over workers
+        self._lock = threading.Lock()
+
+    def _record(self, elapsed, ok):
+        with self._lock:
+            self.busy += elapsed
+            if ok:
+                self.items += 1
+            else:
+                self.errors += 1
+
+
+class Pipeline:
+    """Run items through stages in order; each stage's func maps one item
+    to one item (return None to drop it). Iterate run() for the results of
+    the last stage, in completion order.
+    """
+
+    def __init__(self, stages, log=print):
+        self.stages = stages
+        self.log = log
+        self.wall = 0.0
+
+    def _worker(self, stage, q_in, q_out, remaining, downstream):
+        while True:
+            item = q_in.get()
+            if item is _DONE:
+                with remaining["lock"]:
+                    remaining["count"] -= 1
+                    last = remaining["count"] == 0
+                if last:
+                    # one sentinel per worker of the next stage
+                    for _ in range(downstream):
+                        q_out.put(_DONE)
+                return
+
+            start = time.perf_counter()
+            try:
+                result = stage.func(item)
+                ok = True
+            except Exception as e:
+                self.log(f"[{stage.name}] failed: {e}")
+                result = None
+                ok = False
+            stage._record(time.perf_counter() - start, ok)
+
+            if result is not None:
+                q_out.put(result)
+
+    def run(self, items):
+        start = time.perf_counter()
+        queues = [queue.Queue(maxsize=s.queue_size) for s in self.stages]
+        queues.append(queue.Queue(maxsize=self.stages[-1].queue_size))
+
+        threads = []
+        for i, stage in enumerate(self.stages):
+            remaining = {"count": stage.workers, "lock": threading.Lock()}
+            downstream = self.stages[i + 1].workers if i + 1 < len(self.stages) else 1
+            for _ in range(stage.workers):
+                t = threading.Thread(
+                    target=self._worker,
+                    args=(stage, queues[i], queues[i + 1], remaining, downstream),
+                    name=f"{stage.name}-worker",
+                    daemon=True,
+                )
+                t.start()
+                threads.append(t)
+
+        feed_error = []
+
+        def feed():
+            try:
+                for item in items:
+                    queues[0].put(item)
+            except Exception as e:
+                # the input (a CSV reader, a catalog query) failed; drain and re-raise in run()
+                feed_error.append(e)
+            finally:
+                for _ in range(self.stages[0].workers):
+                    queues[0].put(_DONE)
+
+        threading.Thread(target=feed, name="pipeline-feed", daemon=True).start()
+
+        out = queues[-1]
+        try:
+            while True:
+                item = out.get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            self.wall = time.perf_counter() - start
+
+        if feed_error:
+            raise feed_error[0]
+
+    def report(self):
+        """Per-stage occupancy: share of worker time spent doing work."""
+        lines = [f"Pipeline wall time: {self.wall:.1f}s"]
+        for stage in self.stages:
+            capacity = max(self.wall * stage.workers, 1e-9)
+            occupancy = 100.0 * stage.busy / capacity
+            per_item = stage.busy / stage.items if stage.items else 0.0
+            lines.append(
+                f"  {stage.name:<8} workers={stage.workers:<2} items={stage.items:<5} "
+                f"errors={stage.errors:<3} occupancy={occupancy:5.1f}%  avg={per_item:.3f}s/item"
+            )
+        return "\n".join(lines)
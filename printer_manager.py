@@ -0,0 +1,602 @@
+# printer_manager.py
+# Shared DYMO printing, used by the label scripts and the render service.
+#
+# Printing goes through a backend picked by PRINTER_BACKEND:
+#   "win32"        the Windows printer PRINTER_NAME (default)
+#   "win32:<name>" a specific Windows printer
+#   "file:<dir>"   write each job as a 1-bit PNG into <dir> (headless testing)
+#   "raw:<name>"   DYMO raster data straight to a Windows printer queue in RAW
+#                  mode, or to a device such as raw:/dev/usb/lp0
+#   "raster:<dir>" save each job's raster byte stream as a .bin file
+#   "null"         prepare the job and throw it away (throughput benchmarks)
+#   "pool"         share the work between the printers in PRINTER_POOL, or
+#   "pool:<spec>,<spec>,..."  between the listed ones (see PrinterPool)
+#
+# The file: and null stand-ins take ?labels=<n> (labels left on the roll) and
+# ?seconds=<s> (time per label), e.g. "file:out/a?labels=20&seconds=1.5", so
+# pools and failover can be tested headless.
+import argparse
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from PIL import Image
+
+from dymo_raster import encode_label
+
+# ---------------- CONFIG ----------------
+PRINTER_NAME = "DYMO LabelWriter 4XL"
+PRINTER_BACKEND = "win32"
+PRINT_THRESHOLD = 160      # grey levels at or above this print as white
+
+# Several printers sharing the work (PRINTER_BACKEND = "pool"), as backend
+# specs, e.g. ["win32:DYMO LabelWriter 4XL", "win32:DYMO LabelWriter 4XL (Copy 1)"]
+PRINTER_POOL = []
+POOL_POLICY = "least-queue"    # or "round-robin"
+HEALTH_CHECK_SECONDS = 15      # printer status is checked at most this often
+MAX_ATTEMPTS = 3               # printers a job is tried on before it fails
+# ---------------------------------------
+
+HORZRES = 8     # GetDeviceCaps indexes
+VERTRES = 10
+
+# win32print PRINTER_INFO_2 status bits that mean jobs won't come out
+PRINTER_STATUS_PROBLEMS = {
+    0x00000002: "error",
+    0x00000008: "label jam",
+    0x00000010: "out of labels",
+    0x00000040: "label problem",
+    0x00000080: "offline",
+    0x00001000: "not available",
+    0x00100000: "needs attention",
+    0x00400000: "door open",
+}
+PRINTER_ATTRIBUTE_WORK_OFFLINE = 0x400
+
+
+class PrinterError(Exception):
+    pass
+
+
+def prepare_image(img, size=None, threshold=PRINT_THRESHOLD):
+    """Scale to the device's printable area and threshold to 1-bit.
+
+    The DYMO is a thermal printer, so this is what it would do anyway;
+    doing it here means GDI only ever sees a small monochrome bitmap at
+    native resolution instead of stretching full RGB.
+    """
+    img = img.convert("L")
+    if size and img.size != tuple(size):
+        img = img.resize(size, Image.LANCZOS)
+    return img.point(lambda p: 255 if p >= threshold else 0, mode="1")
+
+
+def win32_printer_status(printer_name):
+    """(ok, reason) from the Windows spooler's view of a printer."""
+    import win32print
+
+    handle = win32print.OpenPrinter(printer_name)
+    try:
+        info = win32print.GetPrinter(handle, 2)
+    finally:
+        win32print.ClosePrinter(handle)
+
+    if info["Attributes"] & PRINTER_ATTRIBUTE_WORK_OFFLINE:
+        return False, "offline"
+    problems = [text for bit, text in PRINTER_STATUS_PROBLEMS.items() if info["Status"] & bit]
+    return not problems, ", ".join(problems)
+
+
+def _open_image(image):
+    if isinstance(image, Image.Image):
+        return image
+    with Image.open(image) as img:
+        img.load()
+        return img
+
+
+class PrinterBackend:
+    """One print destination; print_image() takes a PIL image or a file path."""
+
+    name = "printer"
+
+    def __init__(self, threshold=PRINT_THRESHOLD):
+        self.threshold = threshold
+        self.jobs = 0
+        self._lock = threading.Lock()   # one job at a time per printer
+
+    def device_size(self):
+        return None
+
+    def print_image(self, image, doc_name="Label"):
+        img = prepare_image(_open_image(image), self.device_size(), self.threshold)
+        with self._lock:
+            self._send(img, doc_name)
+            self.jobs += 1
+
+    def _send(self, img, doc_name):
+        raise NotImplementedError
+
+    def check(self):
+        """(ok, reason): whether a job sent now would print."""
+        return True, ""
+
+    def close(self):
+        pass
+
+
+class Win32Printer(PrinterBackend):
+    """Windows GDI printer. The printer DC and its resolution are created once
+    and reused for every job; a failed job drops the DC and retries once."""
+
+    def __init__(self, printer_name=PRINTER_NAME, threshold=PRINT_THRESHOLD):
+        super().__init__(threshold)
+        self.name = printer_name
+        self._hdc = None
+        self._size = None
+
+    def _dc(self):
+        if self._hdc is None:
+            import win32ui
+
+            hdc = win32ui.CreateDC()
+            hdc.CreatePrinterDC(self.name)
+            self._size = (hdc.GetDeviceCaps(HORZRES), hdc.GetDeviceCaps(VERTRES))
+            self._hdc = hdc
+        return self._hdc
+
+    def device_size(self):
+        with self._lock:
+            self._dc()
+            return self._size
+
+    def _draw(self, img, doc_name):
+        from PIL import ImageWin
+
+        hdc = self._dc()
+        hdc.StartDoc(doc_name)
+        hdc.StartPage()
+        ImageWin.Dib(img).draw(hdc.GetHandleOutput(), (0, 0) + self._size)
+        hdc.EndPage()
+        hdc.EndDoc()
+
+    def _send(self, img, doc_name):
+        try:
+            self._draw(img, doc_name)
+        except Exception as e:
+            # printer switched off, driver reset, etc.: start over with a fresh DC
+            print(f"{self.name}: {e}; reopening printer.")
+            self._reset()
+            try:
+                self._draw(img, doc_name)
+            except Exception as e:
+                self._reset()
+                raise PrinterError(f"Printing to {self.name} failed: {e}") from e
+
+    def check(self):
+        return win32_printer_status(self.name)
+
+    def _reset(self):
+        if self._hdc is not None:
+            try:
+                self._hdc.DeleteDC()
+            except Exception:
+                pass
+        self._hdc = None
+
+    def close(self):
+        with self._lock:
+            self._reset()
+
+
+class StandInPrinter(PrinterBackend):
+    """Headless printer with an optional roll of `labels` labels and `seconds`
+    per label, so pools, failover and throughput can be tested without hardware."""
+
+    def __init__(self, size=None, threshold=PRINT_THRESHOLD, labels=None, seconds=0.0):
+        super().__init__(threshold)
+        self.size = size
+        self.labels = labels
+        self.seconds = seconds
+
+    def device_size(self):
+        return self.size
+
+    def check(self):
+        return (False, "out of labels") if self.labels == 0 else (True, "")
+
+    def refill(self, labels=None):
+        self.labels = labels
+
+    def _send(self, img, doc_name):
+        if self.labels == 0:
+            raise PrinterError("out of labels")
+        if self.seconds:
+            time.sleep(self.seconds)
+        self._output(img, doc_name)
+        if self.labels is not None:
+            self.labels -= 1
+
+    def _output(self, img, doc_name):
+        pass
+
+
+class FilePrinter(StandInPrinter):
+    """Writes each job as a numbered 1-bit PNG, exactly as the printer would get it."""
+
+    def __init__(self, out_dir, size=None, threshold=PRINT_THRESHOLD, labels=None, seconds=0.0):
+        super().__init__(size, threshold, labels, seconds)
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.name = f"file:{self.out_dir}"
+
+    def _output(self, img, doc_name):
+        safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in doc_name)
+        img.save(self.out_dir / f"{self.jobs + 1:05d}_{safe}.png")
+
+
+class RawPrinter(PrinterBackend):
+    """DYMO raster protocol with no driver in between: labels print at the
+    head's native 300 dpi, 1 bit per dot, with no GDI scaling or dithering.
+    The Windows printer handle is opened once and reused."""
+
+    def __init__(self, target=PRINTER_NAME, threshold=PRINT_THRESHOLD):
+        super().__init__(threshold)
+        self.name = f"raw:{target}"
+        self.target = target
+        self._handle = None
+
+    def _write(self, data, doc_name):
+        if self.target.startswith("/dev/"):
+            with open(self.target, "wb") as f:
+                f.write(data)
+            return
+
+        import win32print
+
+        if self._handle is None:
+            self._handle = win32print.OpenPrinter(self.target)
+        win32print.StartDocPrinter(self._handle, 1, (doc_name, None, "RAW"))
+        try:
+            win32print.StartPagePrinter(self._handle)
+            win32print.WritePrinter(self._handle, data)
+            win32print.EndPagePrinter(self._handle)
+        finally:
+            win32print.EndDocPrinter(self._handle)
+
+    def _send(self, img, doc_name):
+        data = encode_label(img)
+        try:
+            self._write(data, doc_name)
+        except Exception as e:
+            self.close_handle()
+            raise PrinterError(f"Printing to {self.name} failed: {e}") from e
+
+    def check(self):
+        if self.target.startswith("/dev/"):
+            return (True, "") if os.path.exists(self.target) else (False, "not connected")
+        return win32_printer_status(self.target)
+
+    def close_handle(self):
+        if self._handle is not None:
+            import win32print
+
+            try:
+                win32print.ClosePrinter(self._handle)
+            except Exception:
+                pass
+        self._handle = None
+
+    def close(self):
+        with self._lock:
+            self.close_handle()
+
+
+class RasterFilePrinter(PrinterBackend):
+    """Saves each job's DYMO raster byte stream (see dymo_raster.decode_raster)."""
+
+    def __init__(self, out_dir, threshold=PRINT_THRESHOLD):
+        super().__init__(threshold)
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.name = f"raster:{self.out_dir}"
+
+    def _send(self, img, doc_name):
+        safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in doc_name)
+        (self.out_dir / f"{self.jobs + 1:05d}_{safe}.bin").write_bytes(encode_label(img))
+
+
+class NullPrinter(StandInPrinter):
+    """Prepares every job and discards it."""
+
+    name = "null"
+
+
+# ===================== PRINTER POOL =====================
+
+class _Member:
+    def __init__(self, printer):
+        self.printer = printer
+        self.jobs = deque()
+        self.busy = False
+        self.healthy = True
+        self.reason = ""
+        self.checked_at = 0.0
+        self.retry_at = 0.0
+
+    @property
+    def load(self):
+        return len(self.jobs) + self.busy
+
+
+class _Job:
+    def __init__(self, image, doc_name):
+        self.image = image
+        self.doc_name = doc_name
+        self.attempts = 0
+        self.future = Future()
+
+
+class PrinterPool:
+    """Several printers behind one print queue.
+
+    Each printer gets its own job queue and worker thread. A job goes to the
+    next healthy printer in turn ("round-robin") or to the one with the fewest
+    jobs waiting ("least-queue"). Printers are status-checked before a job at
+    most every health_interval seconds. A printer that fails a check or a job
+    (out of labels, offline, jammed) leaves the rotation, and its jobs move
+    to the others; it is checked again every health_interval and rejoins once
+    it is fine. Jobs no printer can take wait for the first one back.
+    """
+
+    def __init__(self, printers, policy=POOL_POLICY, health_interval=HEALTH_CHECK_SECONDS):
+        if policy not in ("round-robin", "least-queue"):
+            raise ValueError(f"unknown pool policy: {policy}")
+        self.members = [_Member(p) for p in printers]
+        self.name = "pool:" + ",".join(p.name for p in printers)
+        self.policy = policy
+        self.health_interval = health_interval
+        self.jobs = 0
+        self._waiting = deque()    # jobs that no healthy printer could take
+        self._next = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._threads = [
+            threading.Thread(target=self._work, args=(m,), name=f"printer-{m.printer.name}", daemon=True)
+            for m in self.members
+        ]
+        for t in self._threads:
+            t.start()
+
+    # ---------- SUBMITTING ----------
+
+    def submit(self, image, doc_name="Label"):
+        """Queue a job; returns a Future that completes when it has printed."""
+        job = _Job(image, doc_name)
+        with self._cond:
+            if self._closed:
+                raise PrinterError("printer pool is closed")
+            self._dispatch(job)
+            self._cond.notify_all()
+        return job.future
+
+    def print_image(self, image, doc_name="Label"):
+        self.submit(image, doc_name).result()
+
+    def _dispatch(self, job):
+        # caller holds self._cond
+        healthy = [m for m in self.members if m.healthy]
+        if not healthy:
+            self._waiting.append(job)
+            return
+        if self.policy == "round-robin":
+            member = healthy[self._next % len(healthy)]
+            self._next += 1
+        else:
+            # ties go to the printer that has printed least, so idle printers alternate
+            member = min(healthy, key=lambda m: (m.load, m.printer.jobs))
+        member.jobs.append(job)
+
+    # ---------- WORKERS ----------
+
+    def _work(self, m):
+        while True:
+            with self._cond:
+                while True:
+                    if m.healthy and m.jobs:
+                        job = m.jobs.popleft()
+                        m.busy = True
+                        break
+                    if self._closed and not m.jobs:
+                        return
+                    if not m.healthy and time.monotonic() >= m.retry_at:
+                        job = None
+                        break
+                    timeout = None if m.healthy else max(0.0, m.retry_at - time.monotonic())
+                    self._cond.wait(timeout)
+
+            if job is None:
+                self._recheck(m)
+                continue
+
+            if time.monotonic() - m.checked_at >= self.health_interval:
+                ok, reason = self._check(m)
+                if not ok:
+                    self._fail(m, job, reason, attempted=False)
+                    continue
+
+            try:
+                m.printer.print_image(job.image, job.doc_name)
+            except Exception as e:
+                self._fail(m, job, str(e))
+                continue
+
+            with self._cond:
+                m.busy = False
+                self.jobs += 1
+                self._cond.notify_all()
+            job.future.set_result(m.printer.name)
+
+    def _check(self, m):
+        try:
+            ok, reason = m.printer.check()
+        except Exception as e:
+            ok, reason = False, str(e)
+        m.checked_at = time.monotonic()
+        return ok, reason
+
+    def _recheck(self, m):
+        ok, reason = self._check(m)
+        with self._cond:
+            if ok:
+                m.healthy, m.reason = True, ""
+                print(f"{m.printer.name}: back in the pool.")
+                while self._waiting:
+                    self._dispatch(self._waiting.popleft())
+            else:
+                m.reason = reason
+                m.retry_at = time.monotonic() + self.health_interval
+            self._cond.notify_all()
+
+    def _fail(self, m, job, reason, attempted=True):
+        failed = []
+        with self._cond:
+            m.busy = False
+            m.healthy, m.reason = False, reason
+            m.retry_at = time.monotonic() + self.health_interval
+            print(f"{m.printer.name}: {reason}; taken out of the pool.")
+
+            if attempted:
+                job.attempts += 1
+            moved = [job] + list(m.jobs)
+            m.jobs.clear()
+            for j in moved:
+                if j.attempts >= MAX_ATTEMPTS:
+                    failed.append(j)
+                else:
+                    self._dispatch(j)
+            self._cond.notify_all()
+
+        for j in failed:
+            j.future.set_exception(PrinterError(f"{j.doc_name}: failed on {j.attempts} printer(s), last: {reason}"))
+
+    # ---------- STATE ----------
+
+    def pending(self):
+        with self._cond:
+            return len(self._waiting) + sum(m.load for m in self.members)
+
+    def join(self, timeout=None):
+        """Wait until every queued job has printed (or failed); False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._waiting and not any(m.load for m in self.members), timeout)
+
+    def status(self):
+        with self._cond:
+            return [{
+                "printer": m.printer.name,
+                "healthy": m.healthy,
+                "reason": m.reason,
+                "queued": m.load,
+                "printed": m.printer.jobs,
+            } for m in self.members]
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join()
+        for m in self.members:
+            m.printer.close()
+
+
+def as_pool(printer):
+    """A PrinterPool for printer (itself if it already is one), for asynchronous printing."""
+    return printer if isinstance(printer, PrinterPool) else PrinterPool([printer])
+
+
+# ===================== BACKEND SPECS =====================
+
+_PRINTERS = {}
+_PRINTERS_LOCK = threading.Lock()
+
+
+def make_printer(spec, printer_name=PRINTER_NAME):
+    """A new backend for a PRINTER_BACKEND-style spec."""
+    kind, _, arg = spec.partition(":")
+    if kind == "pool":
+        specs = arg.split(",") if arg else PRINTER_POOL
+        if not specs:
+            raise ValueError("printer pool is empty: set PRINTER_POOL or use pool:<spec>,<spec>")
+        return PrinterPool([make_printer(s, printer_name) for s in specs])
+
+    spec, _, query = spec.partition("?")
+    options = {k: v[-1] for k, v in parse_qs(query).items()}
+    stand_in = {}
+    if "labels" in options:
+        stand_in["labels"] = int(options["labels"])
+    if "seconds" in options:
+        stand_in["seconds"] = float(options["seconds"])
+
+    kind, _, arg = spec.partition(":")
+    if kind == "win32":
+        return Win32Printer(arg or printer_name)
+    if kind == "raw":
+        return RawPrinter(arg or printer_name)
+    if kind == "raster":
+        return RasterFilePrinter(arg or "printed")
+    if kind == "file":
+        return FilePrinter(arg or "printed", **stand_in)
+    if kind == "null":
+        return NullPrinter(**stand_in)
+    raise ValueError(f"unknown printer backend: {spec}")
+
+
+def get_printer(spec=None, printer_name=PRINTER_NAME):
+    """Shared backend for a PRINTER_BACKEND-style spec, created on first use."""
+    spec = spec or PRINTER_BACKEND
+    with _PRINTERS_LOCK:
+        key = (spec, printer_name)
+        if key not in _PRINTERS:
+            _PRINTERS[key] = make_printer(spec, printer_name)
+        return _PRINTERS[key]
+
+
+def print_image_to_dymo(image_path, printer_name=PRINTER_NAME, doc_name="Label"):
+    get_printer(PRINTER_BACKEND, printer_name).print_image(image_path, doc_name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print a label image, or time repeated prints.")
+    parser.add_argument("image")
+    parser.add_argument("--backend", default=PRINTER_BACKEND,
+                        help='"win32[:name]", "raw:<name>", "raster:<dir>", "file:<dir>", "null" or "pool[:<spec>,...]"')
+    parser.add_argument("--copies", type=int, default=1)
+    args = parser.parse_args()
+
+    printer = get_printer(args.backend)
+    img = _open_image(args.image)
+
+    start = time.perf_counter()
+    if isinstance(printer, PrinterPool):
+        futures = [printer.submit(img, doc_name=f"Label {n + 1}") for n in range(args.copies)]
+        for f in futures:
+            f.exception()
+    else:
+        for n in range(args.copies):
+            printer.print_image(img, doc_name=f"Label {n + 1}")
+    elapsed = time.perf_counter() - start
+
+    if isinstance(printer, PrinterPool):
+        for st in printer.status():
+            state = "ok" if st["healthy"] else f"out of the pool ({st['reason']})"
+            print(f"  {st['printer']}: {st['printed']} printed, {state}")
+    printer.close()
+
+    print(f"{args.copies} label(s) to {printer.name} in {elapsed:.2f}s "
+          f"({args.copies / elapsed:.1f} labels/s)")
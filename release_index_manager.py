@@ -0,0 +1,243 @@
+# release_index_manager.py
+# Local trigram index over every release we have already seen
+# (catalog rows, lookup cache, imported dumps) for the manual fallback path.
+import csv
+import gzip
+import json
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from pathlib import Path
+
+# ---------------- CONFIG ----------------
+CSV_PATH = "data/cd_labels.csv"
+CACHE_PATH = "data/release_index.jsonl"
+
+# Both artist and album must score at least this (Dice over trigrams)
+# before the local hit is trusted without asking MusicBrainz.
+STRONG_MATCH = 0.7
+# ---------------------------------------
+
+_INDEX = None
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFKD", str(text or ""))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r"[^0-9a-z]+", " ", text.lower())
+    return text.strip()
+
+
+def trigrams(text):
+    grams = set()
+    for word in normalize(text).split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+def dice(a, b):
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+class ReleaseIndex:
+    def __init__(self):
+        self.entries = []
+        self._keys = {}
+        self._grams = []
+        self._postings = defaultdict(set)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, artist, album, year="", mbid="", genre=""):
+        artist = str(artist or "").strip()
+        album = str(album or "").strip()
+        if not artist or not album:
+            return None
+
+        key = mbid or f"{normalize(artist)}|{normalize(album)}"
+        if key in self._keys:
+            entry = self.entries[self._keys[key]]
+            entry["year"] = entry["year"] or str(year or "")
+            entry["genre"] = entry["genre"] or str(genre or "")
+            return entry
+
+        entry = {
+            "artist": artist,
+            "album": album,
+            "year": str(year or ""),
+            "mbid": mbid or "",
+            "genre": str(genre or ""),
+        }
+        idx = len(self.entries)
+        self.entries.append(entry)
+        self._keys[key] = idx
+
+        artist_grams = trigrams(artist)
+        album_grams = trigrams(album)
+        self._grams.append((artist_grams, album_grams))
+        for g in artist_grams | album_grams:
+            self._postings[g].add(idx)
+
+        return entry
+
+    def _candidates(self, grams):
+        hits = Counter()
+        for g in grams:
+            for idx in self._postings.get(g, ()):
+                hits[idx] += 1
+        return hits
+
+    def search(self, query, limit=10):
+        """Rank releases for a free-text query (partial input is fine)."""
+        q = trigrams(query)
+        if not q:
+            return []
+
+        ranked = []
+        for idx, shared in self._candidates(q).items():
+            artist_grams, album_grams = self._grams[idx]
+            full = artist_grams | album_grams
+            # containment rewards a partially typed query,
+            # dice breaks ties in favour of the closer overall match
+            containment = shared / len(q)
+            ranked.append((containment, dice(q, full), idx))
+
+        ranked.sort(key=lambda t: (-t[0], -t[1], t[2]))
+        return [(score, self.entries[idx]) for score, _, idx in ranked[:limit]]
+
+    def best_match(self, artist, album):
+        """Return the best entry if both artist and album match strongly, else None."""
+        qa = trigrams(artist)
+        qb = trigrams(album)
+        if not qa or not qb:
+            return None
+
+        best = None
+        best_score = 0.0
+        for idx in self._candidates(qa | qb):
+            artist_grams, album_grams = self._grams[idx]
+            score = min(dice(qa, artist_grams), dice(qb, album_grams))
+            if score > best_score:
+                best, best_score = idx, score
+
+        if best is None or best_score < STRONG_MATCH:
+            return None
+        return self.entries[best]
+
+
+# ---------- LOADING / PERSISTENCE ----------
+
+def _open_text(path):
+    path = Path(path)
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def load_catalog_rows(index, csv_path=CSV_PATH):
+    path = Path(csv_path)
+    if not path.exists():
+        return 0
+
+    count = 0
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for r in csv.DictReader(f):
+            if index.add(r.get("artist"), r.get("album"), r.get("year"), r.get("mbid"), r.get("genre")):
+                count += 1
+    return count
+
+
+def load_cache(index, cache_path=CACHE_PATH):
+    path = Path(cache_path)
+    if not path.exists():
+        return 0
+
+    count = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                e = json.loads(line)
+            except ValueError:
+                continue
+            if index.add(e.get("artist"), e.get("album"), e.get("year"), e.get("mbid"), e.get("genre")):
+                count += 1
+    return count
+
+
+def _release_from_dump(obj):
+    # MusicBrainz JSON dump release, or an already flat record
+    if "artist" in obj and "album" in obj:
+        return obj.get("artist"), obj.get("album"), obj.get("year", ""), obj.get("mbid", ""), obj.get("genre", "")
+
+    credit = obj.get("artist-credit") or []
+    artist = ""
+    if credit:
+        first = credit[0]
+        artist = first.get("name") or (first.get("artist") or {}).get("name", "")
+    date = obj.get("date") or ""
+    return artist, obj.get("title", ""), date[:4], obj.get("id", ""), ""
+
+
+def import_dump(path, index=None, cache_path=CACHE_PATH):
+    """Import a release dump (JSON lines or CSV, optionally gzipped) into the cache."""
+    if index is None:
+        index = get_release_index()
+    path = Path(path)
+    is_csv = ".csv" in path.suffixes
+
+    count = 0
+    with _open_text(path) as f:
+        rows = csv.DictReader(f) if is_csv else (json.loads(l) for l in f if l.strip())
+        for obj in rows:
+            artist, album, year, mbid, genre = _release_from_dump(obj)
+            if remember_release(artist, album, year, mbid, genre, index=index, cache_path=cache_path):
+                count += 1
+    return count
+
+
+def remember_release(artist, album, year="", mbid="", genre="", index=None, cache_path=CACHE_PATH):
+    """Add a release to the index and persist it to the cache if it is new."""
+    if index is None:
+        index = get_release_index()
+    before = len(index)
+    entry = index.add(artist, album, year, mbid, genre)
+    if entry is None or len(index) == before:
+        return None
+
+    path = Path(cache_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+    return entry
+
+
+def get_release_index():
+    global _INDEX
+    if _INDEX is None:
+        index = ReleaseIndex()
+        load_catalog_rows(index)
+        load_cache(index)
+        _INDEX = index
+    return _INDEX
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) >= 3 and sys.argv[1] == "import":
+        for dump in sys.argv[2:]:
+            print(f"Imported {import_dump(dump)} releases from {dump}")
+    elif len(sys.argv) >= 3 and sys.argv[1] == "search":
+        for score, e in get_release_index().search(" ".join(sys.argv[2:])):
+            print(f"{score:.2f}  {e['artist']} - {e['album']} ({e['year']})  {e['mbid']}")
+    else:
+        print("Usage: python release_index_manager.py import <dump.jsonl[.gz]|dump.csv> ...")
+        print("       python release_index_manager.py search <text>")
@@ -0,0 +1,285 @@
+# render_service.py
+# Long-running label renderer with a small local HTTP/JSON API.
+# Fonts, text metrics and QR codes stay warm between jobs, so scanners and
+# batch tools on this machine (or other stations) skip the per-run startup.
+#
+#   POST /render/cd     {"artist", "album", "year", "genre", "mbid", "tracks"?}
+#   POST /render/movie  {layout_movie_label fields}
+#   GET  /health
+#
+# Add "format": "png" | "pdf" (default png) to get the label bytes back, or
+# "print": true to spool it to the DYMO instead.
+import argparse
+import http.client
+import io
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from label_config import (
+    LABEL_WIDTH,
+    LABEL_HEIGHT,
+    TITLE_FONT_SIZE,
+    TRACK_FONT_SIZE,
+    TRACK_FONT_SIZE_MIN,
+    MOVIE_TITLE_FONT_SIZE,
+    MOVIE_META_FONT_SIZE,
+    MOVIE_BODY_FONT_SIZE,
+    MOVIE_BODY_FONT_SIZE_MIN,
+)
+from label_image_manager import draw_label_pdf, fetch_track_list, render_label_image
+from label_pdf_manager import PdfLabelWriter
+from layout_manager import font_at
+from movie_label_image_manager import draw_movie_label_pdf, render_movie_label_image
+
+# ---------------- CONFIG ----------------
+RENDER_HOST = "127.0.0.1"
+RENDER_PORT = 8765
+RENDER_SERVER = f"http://{RENDER_HOST}:{RENDER_PORT}"   # or "unix:/path/to/socket"
+RENDER_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+PRINTER_NAME = "DYMO LabelWriter 4XL"
+REQUEST_TIMEOUT = 60
+# ---------------------------------------
+
+CD_FIELDS = ("artist", "album", "year", "genre", "mbid")
+MOVIE_DEFAULTS = {
+    "title": "",
+    "release_date": "",
+    "runtime_min": None,
+    "rating": "",
+    "user_rating": None,
+    "budget": None,
+    "genres": [],
+    "synopsis": "",
+    "cast": [],
+    "tmdb_id": None,
+}
+
+
+class RenderServiceError(Exception):
+    pass
+
+
+class PayloadError(Exception):
+    """A request body the service can't render; answered with a 400."""
+
+
+# ===================== RENDERING =====================
+
+def _png_bytes(img):
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _pdf_bytes(draw):
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = PdfLabelWriter(Path(tmp) / "label.pdf", LABEL_WIDTH, LABEL_HEIGHT)
+        draw(writer)
+        return writer.close().read_bytes()
+
+
+def render_cd(payload, fmt="png"):
+    fields = {k: str(payload.get(k) or "") for k in CD_FIELDS}
+    tracks = payload.get("tracks")
+    if tracks is None:
+        tracks = fetch_track_list(fields["mbid"]) if fields["mbid"] else []
+
+    if fmt == "pdf":
+        return _pdf_bytes(lambda writer: draw_label_pdf(writer, tracks=tracks, **fields))
+    return _png_bytes(render_label_image(tracks=tracks, **fields))
+
+
+def render_movie(payload, fmt="png"):
+    fields = {k: payload.get(k, default) for k, default in MOVIE_DEFAULTS.items()}
+
+    if fmt == "pdf":
+        return _pdf_bytes(lambda writer: draw_movie_label_pdf(writer, **fields))
+    return _png_bytes(render_movie_label_image(**fields))
+
+
+RENDERERS = {"cd": render_cd, "movie": render_movie}
+
+def spool_png(png, doc_name):
+    from PIL import Image
+    from printer_manager import PRINTER_BACKEND, get_printer
+
+    # the backend keeps the printer DC open and serialises jobs itself
+    get_printer(PRINTER_BACKEND, PRINTER_NAME).print_image(Image.open(io.BytesIO(png)), doc_name)
+
+
+def run_job(kind, payload):
+    fmt = payload.get("format", "png")
+    if fmt not in ("png", "pdf"):
+        raise PayloadError(f"unsupported format: {fmt}")
+
+    if payload.get("print"):
+        spool_png(RENDERERS[kind](payload, "png"), f"{kind.upper()} Label")
+        return "application/json", json.dumps({"printed": True}).encode()
+
+    content_type = "application/pdf" if fmt == "pdf" else "image/png"
+    return content_type, RENDERERS[kind](payload, fmt)
+
+
+def warm_up():
+    """Load every font size the layouts can pick and prime the metric caches."""
+    for size in range(TRACK_FONT_SIZE_MIN, TRACK_FONT_SIZE + 1):
+        font_at("regular", size)
+    for size in range(MOVIE_BODY_FONT_SIZE_MIN, MOVIE_BODY_FONT_SIZE + 1):
+        font_at("regular", size)
+    font_at("bold", TITLE_FONT_SIZE)
+    font_at("bold", MOVIE_TITLE_FONT_SIZE)
+    font_at("regular", MOVIE_META_FONT_SIZE)
+
+    render_cd({"artist": "Warm up", "album": "Warm up", "year": "2000", "tracks": ["Warm up"]})
+    render_movie({"title": "Warm up", "synopsis": "Warm up", "tmdb_id": 1})
+
+
+# ===================== SERVER =====================
+
+class RenderHandler(BaseHTTPRequestHandler):
+    server_version = "CDLabelRender/1.0"
+    pool = None
+    stats = {"rendered": 0, "failed": 0}
+    stats_lock = threading.Lock()
+
+    def address_string(self):
+        # Unix socket peers have no host/port
+        return self.client_address[0] if self.client_address else "unix"
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, obj):
+        self._send(status, "application/json", json.dumps(obj).encode())
+
+    def _count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def _read_payload(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            raise PayloadError(f"invalid request body: {e}") from e
+        if not isinstance(payload, dict):
+            raise PayloadError("request body must be a JSON object")
+        return payload
+
+    def do_GET(self):
+        if self.path == "/health":
+            with self.stats_lock:
+                stats = dict(self.stats)
+            self._send_json(200, {"status": "ok", "workers": RENDER_WORKERS, **stats})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        kind = self.path.rsplit("/", 1)[-1]
+        if not self.path.startswith("/render/") or kind not in RENDERERS:
+            self._send_json(404, {"error": "not found"})
+            return
+
+        try:
+            payload = self._read_payload()
+            content_type, body = self.pool.submit(run_job, kind, payload).result()
+        except PayloadError as e:
+            self._count("failed")
+            self._send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self._count("failed")
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+
+        self._count("rendered")
+        self._send(200, content_type, body)
+
+
+class ThreadingUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(host=RENDER_HOST, port=RENDER_PORT, socket_path=None, workers=RENDER_WORKERS):
+    print("Warming fonts and layout caches...")
+    warm_up()
+
+    RenderHandler.pool = ThreadPoolExecutor(max_workers=workers)
+
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = ThreadingUnixServer(socket_path, RenderHandler)
+        print(f"Render service listening on unix:{socket_path} ({workers} workers)")
+    else:
+        server = ThreadingHTTPServer((host, port), RenderHandler)
+        print(f"Render service listening on http://{host}:{port} ({workers} workers)")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping render service.")
+    finally:
+        server.server_close()
+        RenderHandler.pool.shutdown()
+
+
+# ===================== CLIENT =====================
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def _connect(server, timeout):
+    if server.startswith("unix:"):
+        return _UnixHTTPConnection(server[len("unix:"):], timeout)
+    parts = urlsplit(server)
+    return http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+
+
+def render_remote(kind, fields, fmt="png", print_label=False, server=RENDER_SERVER, timeout=REQUEST_TIMEOUT):
+    """Render (or print) one label on a running render service; returns the response bytes."""
+    body = json.dumps({**fields, "format": fmt, "print": print_label}, default=str).encode()
+    conn = _connect(server, timeout)
+    try:
+        conn.request("POST", f"/render/{kind}", body, {"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        data = resp.read()
+    except OSError as e:
+        raise RenderServiceError(f"Render service unreachable at {server}: {e}") from e
+    finally:
+        conn.close()
+
+    if resp.status != 200:
+        raise RenderServiceError(f"Render service error {resp.status}: {data.decode(errors='replace')}")
+    return data
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Warm label-rendering service (local HTTP/JSON API).")
+    parser.add_argument("--host", default=RENDER_HOST)
+    parser.add_argument("--port", type=int, default=RENDER_PORT)
+    parser.add_argument("--socket", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=RENDER_WORKERS)
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.socket, args.workers)
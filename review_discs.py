@@ -0,0 +1,161 @@
+# review_discs.py
+# One focused pass over the discs cd_to_csv.py (and rips_to_csv.py) could
+# not identify. Candidate releases were looked up in the background while
+# scanning; any still missing are fetched here, ahead of the disc on screen.
+# Identified discs are written exactly as a scan would have written them.
+#
+#   python review_discs.py            # review every queued disc
+#   python review_discs.py --list     # just show the queue
+import argparse
+
+from catalog_manager import open_catalog
+from discogs_manager import get_discogs_genre, get_discogs_token, search_discogs_by_artist_album
+from file_manager import disc_row, save_disc_row
+from musicbrainz_manager import get_release_by_mbid, init_musicbrainz, search_mb_by_artist_album
+from review_queue_manager import (
+    REVIEW_QUEUE_PATH,
+    CandidatePrefetcher,
+    ReviewQueue,
+    format_duration,
+    identify_manually,
+)
+from seen_disc_manager import SeenDiscIndex
+from station_manager import station_journal
+
+# ---------------- CONFIG ----------------
+CSV_PATH = "data/cd_labels.csv"
+CATALOG_PATH = "data/catalog.db"
+SEEN_PATH = "data/seen_discs.jsonl"
+# ---------------------------------------
+
+
+def show_entry(entry, n, total):
+    where = entry.get("source") or entry.get("drive") or "?"
+    print(f"\n===== Disc {n}/{total}: {entry['disc_id']} ({where}) =====")
+
+    durations = entry["durations"]
+    print(f"{len(durations)} tracks, {format_duration(sum(durations))}")
+    rows = (len(durations) + 2) // 3
+    for r in range(rows):
+        print("   ".join(
+            f"{i + 1:2d}. {format_duration(durations[i])}"
+            for i in range(r, len(durations), rows)
+        ))
+
+    candidates = entry["candidates"] or []
+    if candidates:
+        print("\nCandidates:")
+    for i, c in enumerate(candidates, start=1):
+        year = f" ({c['year']})" if c["year"] else ""
+        tracks = f", {c['tracks']} tracks" if c["tracks"] else ""
+        print(f"{i:2d}. {c['artist']} - {c['album']}{year}  [{c['source']}{tracks}]")
+
+
+def identify_candidate(candidate, token):
+    if candidate["mbid"]:
+        return get_release_by_mbid(candidate["mbid"])
+    # CD stubs carry no MBID; search by their artist/title
+    artist, album, year, mbid = search_mb_by_artist_album(candidate["artist"], candidate["album"])
+    genre = None
+    if not artist:
+        artist, album, year, genre = search_discogs_by_artist_album(candidate["artist"], candidate["album"], token=token)
+    return artist, album, year, mbid, genre
+
+
+def save(entry, identified, catalog, seen, token, journal=None):
+    artist, album, year, mbid, genre = identified
+    if seen.has_mbid(mbid):
+        print(f"Already catalogued: {artist} - {album}")
+        seen.add(entry["disc_id"], mbid)
+        return
+
+    genre_deferred = False
+    if not genre:
+        genre = get_discogs_genre(artist, album, token=token)
+        if genre is None:
+            genre, genre_deferred = "", True
+
+    row = disc_row(entry.get("drive") or "", artist, album, year, genre, mbid, entry["disc_id"])
+    save_disc_row(row, catalog, CSV_PATH, journal, genre_deferred)
+    seen.add(entry["disc_id"], mbid)
+    print(f"Saved: {artist} - {album} ({row['year'] or '?'})")
+
+
+def review(queue_path=REVIEW_QUEUE_PATH):
+    queue = ReviewQueue(queue_path)
+    pending = queue.pending()
+    if not pending:
+        print("Review queue is empty.")
+        return
+
+    init_musicbrainz()
+    token = get_discogs_token()
+    catalog = open_catalog(CATALOG_PATH, CSV_PATH)
+    seen = SeenDiscIndex(SEEN_PATH, csv_path=CSV_PATH)
+    journal = station_journal()
+
+    prefetcher = CandidatePrefetcher(queue)
+    futures = prefetcher.prefetch_pending()
+    print(f"{len(pending)} disc(s) to review.")
+
+    try:
+        for n, entry in enumerate(pending, start=1):
+            disc_id = entry["disc_id"]
+            if seen.has_disc(disc_id):
+                # identified by a later scan (e.g. after a MusicBrainz submission)
+                queue.resolve(disc_id, seen.mbid_for_disc(disc_id))
+                continue
+
+            future = futures.get(disc_id)
+            if future and not future.done():
+                print("Looking up candidates...")
+                future.result()
+            entry = queue.entries[disc_id]
+            show_entry(entry, n, len(pending))
+            if entry["candidates"] is None:
+                print("\nCandidates unavailable (MusicBrainz lookup failed); looked up again next review.")
+
+            candidates = entry["candidates"] or []
+            choice = input("\nPick a candidate, Enter to search manually, s to skip, d to discard: ").strip().lower()
+
+            if choice == "s":
+                continue
+            if choice == "d":
+                queue.discard(disc_id)
+                continue
+            if choice.isdigit() and 1 <= int(choice) <= len(candidates):
+                identified = identify_candidate(candidates[int(choice) - 1], token)
+            else:
+                identified = identify_manually(token)
+
+            if not identified[0]:
+                print("No match; left in the queue.")
+                continue
+            save(entry, identified, catalog, seen, token, journal)
+            queue.resolve(disc_id, identified[3])
+    except KeyboardInterrupt:
+        print("\nReview stopped; the rest stay queued.")
+    finally:
+        prefetcher.shutdown(wait=False)
+        queue.compact()
+
+    print(f"{len(queue)} disc(s) still waiting for review.")
+
+
+def list_queue(queue_path=REVIEW_QUEUE_PATH):
+    pending = ReviewQueue(queue_path).pending()
+    for e in pending:
+        found = "not looked up" if e["candidates"] is None else f"{len(e['candidates'])} candidate(s)"
+        print(f"{e['disc_id']}  {len(e['durations']):2d} tracks  {found}  {e.get('source') or e.get('drive') or ''}")
+    print(f"{len(pending)} disc(s) waiting for review.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Identify the discs queued for manual review.")
+    parser.add_argument("--list", action="store_true", help="show the queue without reviewing")
+    args = parser.parse_args()
+
+    if args.list:
+        list_queue()
+    else:
+        review()
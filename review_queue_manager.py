@@ -0,0 +1,281 @@
+# review_queue_manager.py
+# Discs that could not be identified automatically, set aside for one manual
+# review pass at the end of a session instead of holding up the scan line.
+# Each entry keeps the disc's TOC and track durations; candidate releases
+# are looked up in the background so the review is mostly picking from a list.
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import musicbrainzngs as mb
+
+from common_helper import prompt_for_artist_album, prompt_for_local_release, prompt_for_mbid_with_clipboard
+from discogs_manager import search_discogs_by_artist_album
+from musicbrainz_manager import get_release_by_mbid, is_client_error, mb_with_retry, search_mb_by_artist_album
+
+# ---------------- CONFIG ----------------
+REVIEW_QUEUE_PATH = "data/review_queue.jsonl"
+CANDIDATE_LIMIT = 8
+PREFETCH_WORKERS = 1        # musicbrainzngs serializes requests at 1/s anyway
+# ---------------------------------------
+
+QUEUED = "queued"
+CANDIDATES = "candidates"
+RESOLVED = "resolved"
+DISCARDED = "discarded"
+
+
+def durations_from_toc(toc):
+    """Track lengths in seconds from a "first last leadout offsets..." TOC."""
+    values = [int(v) for v in toc.split()]
+    leadout, offsets = values[2], values[3:]
+    ends = offsets[1:] + [leadout]
+    return [(end - start) // 75 for start, end in zip(offsets, ends)]
+
+
+def format_duration(seconds):
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+class ReviewQueue:
+    def __init__(self, path=REVIEW_QUEUE_PATH):
+        self.path = Path(path)
+        self.entries = {}   # disc_id -> {"disc_id", "toc", "durations", "drive", "source", "state", "candidates", "ts"}
+        self._lock = threading.Lock()   # the prefetcher records from its own thread
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    e = json.loads(line)
+                except ValueError:
+                    # torn last line from a crash mid-write
+                    continue
+                self._apply(e)
+
+    def _apply(self, e):
+        disc_id = e.get("disc_id")
+        if not disc_id:
+            return
+
+        if e["state"] == QUEUED:
+            self.entries[disc_id] = {
+                "disc_id": disc_id,
+                "toc": e.get("toc"),
+                "durations": e.get("durations") or [],
+                "drive": e.get("drive"),
+                "source": e.get("source"),
+                "state": QUEUED,
+                "candidates": None,
+                "ts": e.get("ts"),
+            }
+            return
+
+        entry = self.entries.get(disc_id)
+        if entry is None:
+            return
+        if e["state"] == CANDIDATES:
+            entry["candidates"] = e.get("candidates") or []
+        else:
+            entry["state"] = e["state"]
+            entry["mbid"] = e.get("mbid")
+
+    def _record(self, e):
+        e["ts"] = time.time()
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(e, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._apply(e)
+
+    # ---------- UPDATES ----------
+
+    def add(self, disc_id, toc, drive=None, source=None):
+        """Queue a disc; a disc already waiting for review is not queued twice."""
+        if self.is_pending(disc_id):
+            return False
+        self._record({
+            "disc_id": disc_id,
+            "state": QUEUED,
+            "toc": toc,
+            "durations": durations_from_toc(toc) if toc else [],
+            "drive": drive,
+            "source": source,
+        })
+        return True
+
+    def set_candidates(self, disc_id, candidates):
+        self._record({"disc_id": disc_id, "state": CANDIDATES, "candidates": candidates})
+
+    def resolve(self, disc_id, mbid):
+        self._record({"disc_id": disc_id, "state": RESOLVED, "mbid": mbid})
+
+    def discard(self, disc_id):
+        self._record({"disc_id": disc_id, "state": DISCARDED})
+
+    # ---------- QUERIES ----------
+
+    def __len__(self):
+        return len(self.pending())
+
+    def is_pending(self, disc_id):
+        entry = self.entries.get(disc_id)
+        return bool(entry) and entry["state"] == QUEUED
+
+    def pending(self):
+        """Entries still waiting for review, oldest first."""
+        with self._lock:
+            waiting = [e for e in self.entries.values() if e["state"] == QUEUED]
+        return sorted(waiting, key=lambda e: e["ts"] or 0)
+
+    def compact(self):
+        """Rewrite the queue keeping only entries still waiting for review."""
+        keep = self.pending()
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        with self._lock:
+            with open(tmp, "w", encoding="utf-8") as f:
+                for e in keep:
+                    queued = {k: e[k] for k in ("disc_id", "toc", "durations", "drive", "source", "ts")}
+                    queued["state"] = QUEUED
+                    f.write(json.dumps(queued, ensure_ascii=False) + "\n")
+                    if e["candidates"] is not None:
+                        f.write(json.dumps({"disc_id": e["disc_id"], "state": CANDIDATES,
+                                            "candidates": e["candidates"], "ts": e["ts"]}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self.entries = {}
+        self._load()
+
+
+# ---------- CANDIDATES ----------
+
+def _candidate(release, source):
+    credit = release.get("artist-credit") or [{}]
+    artist = release.get("artist-credit-phrase") or (credit[0].get("artist") or {}).get("name", "")
+    tracks = sum(int(m.get("track-count") or len(m.get("track-list", []))) for m in release.get("medium-list", []))
+    return {
+        "mbid": release.get("id"),
+        "artist": artist,
+        "album": release.get("title", ""),
+        "year": (release.get("date") or "")[:4],
+        "tracks": tracks or None,
+        "source": source,
+    }
+
+
+def find_candidates(disc_id, toc, limit=CANDIDATE_LIMIT):
+    """Likely releases for an unidentified disc, best first.
+
+    Asks MusicBrainz again by disc ID (it may have been submitted since the
+    scan) with the TOC for fuzzy matching, and includes CD stubs, which only
+    carry an artist and title. Returns None when the lookup failed (MusicBrainz
+    down, circuit open), so the disc is looked up again later.
+    """
+    try:
+        result = mb_with_retry(mb.get_releases_by_discid, disc_id, includes=["artists"], toc=toc, cdstubs=True)
+    except Exception as e:
+        if is_client_error(e):   # 404: nothing close to this TOC
+            return []
+        print(f"Candidate lookup failed for {disc_id}: {e}")
+        return None
+
+    candidates = []
+    if "disc" in result:
+        candidates += [_candidate(r, "disc ID") for r in result["disc"].get("release-list", [])]
+    candidates += [_candidate(r, "TOC") for r in result.get("release-list", [])]
+    if "cdstub" in result:
+        stub = result["cdstub"]
+        candidates.append({
+            "mbid": None,
+            "artist": stub.get("artist", ""),
+            "album": stub.get("title", ""),
+            "year": "",
+            "tracks": int(stub.get("track-count") or 0) or None,
+            "source": "CD stub",
+        })
+
+    # releases with the disc's own track count first
+    track_count = len(toc.split()) - 3 if toc else None
+    candidates.sort(key=lambda c: c["tracks"] != track_count)
+    return candidates[:limit]
+
+
+class CandidatePrefetcher:
+    """Looks up candidates for queued discs on a background thread."""
+
+    def __init__(self, queue, workers=PREFETCH_WORKERS):
+        self.queue = queue
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="review-prefetch")
+        self.futures = {}
+
+    def submit(self, disc_id, toc):
+        if disc_id not in self.futures:
+            self.futures[disc_id] = self.pool.submit(self._fetch, disc_id, toc)
+        return self.futures[disc_id]
+
+    def _fetch(self, disc_id, toc):
+        candidates = find_candidates(disc_id, toc)
+        if candidates is None:
+            # not "no candidates": leave it unlooked-up so prefetch_pending tries again
+            self.futures.pop(disc_id, None)
+            return None
+        self.queue.set_candidates(disc_id, candidates)
+        return candidates
+
+    def prefetch_pending(self):
+        """Start lookups for every queued disc that has no candidates yet."""
+        for e in self.queue.pending():
+            if e["candidates"] is None:
+                self.submit(e["disc_id"], e["toc"])
+        return self.futures
+
+    def shutdown(self, wait=True):
+        self.pool.shutdown(wait=wait)
+
+
+# ---------- MANUAL IDENTIFICATION ----------
+
+def identify_manually(discogs_token=None):
+    """The interactive fallbacks: MBID (clipboard first), local index, then
+    an artist/album search on MusicBrainz and Discogs.
+
+    Returns (artist, album, year, mbid, genre); artist is None if nothing matched.
+    """
+    artist = album = year = mbid = genre = None
+
+    mbid_input = prompt_for_mbid_with_clipboard()
+    if mbid_input:
+        artist, album, year, mbid, genre = get_release_by_mbid(mbid_input)
+
+    if not artist:
+        artist, album, year, mbid = prompt_for_local_release()
+
+    if not artist:
+        user_artist, user_album = prompt_for_artist_album()
+
+        if user_artist and user_album:
+            artist, album, year, mbid = search_mb_by_artist_album(user_artist, user_album)
+
+            if not artist:
+                artist, album, year, genre = search_discogs_by_artist_album(
+                    user_artist,
+                    user_album,
+                    token=discogs_token
+                )
+
+    return artist, album, year, mbid, genre
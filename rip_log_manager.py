@@ -0,0 +1,204 @@
+# rip_log_manager.py
+# Disc TOCs from EAC/XLD rip logs and cue sheets, and MusicBrainz disc IDs
+# computed from them locally (the same ID libdiscid reads from a drive).
+#
+# Offsets are CD frames (1/75 s) and, as on the disc, include the 150-frame
+# lead-in, so a TOC here is exactly what MusicBrainz expects for ?toc=.
+import base64
+import hashlib
+import re
+import struct
+import wave
+from pathlib import Path
+
+# ---------------- CONFIG ----------------
+LOG_SUFFIXES = (".log",)
+CUE_SUFFIXES = (".cue",)
+# ---------------------------------------
+
+LEAD_IN = 150                # frames before LBA 0
+DATA_SESSION_GAP = 11400     # frames between an audio session and a data session
+SAMPLES_PER_FRAME = 588      # 44.1 kHz / 75
+
+# "  1  |  0:00.00 |  4:31.17 |   0  |  20356  " (EAC and XLD)
+_TOC_ROW = re.compile(r"^\s*(\d+)\s*\|\s*[\d:.]+\s*\|\s*[\d:.]+\s*\|\s*(\d+)\s*\|\s*(\d+)\s*$")
+_CUE_FILE = re.compile(r'^\s*FILE\s+"?(.+?)"?\s+\w+\s*$', re.I)
+_CUE_TRACK = re.compile(r"^\s*TRACK\s+(\d+)\s+(\S+)", re.I)
+_CUE_INDEX = re.compile(r"^\s*INDEX\s+01\s+(\d+):(\d+):(\d+)", re.I)
+
+
+class Toc:
+    """first and last audio track, lead-out and track offsets, all in frames."""
+
+    def __init__(self, first, last, leadout, offsets, source=None):
+        self.first = first
+        self.last = last
+        self.leadout = leadout
+        self.offsets = list(offsets)
+        self.source = source
+
+    @property
+    def disc_id(self):
+        return disc_id(self.first, self.last, self.leadout, self.offsets)
+
+    @property
+    def toc_string(self):
+        return " ".join(str(v) for v in [self.first, self.last, self.leadout] + self.offsets)
+
+    def __repr__(self):
+        return f"Toc({self.toc_string!r}, source={self.source!r})"
+
+
+def disc_id(first, last, leadout, offsets):
+    """MusicBrainz disc ID: SHA-1 over the hex TOC, in URL-safe base64."""
+    sha = hashlib.sha1()
+    sha.update(b"%02X%02X" % (first, last))
+    # lead-out, then one slot per track number 1-99 (zero when absent)
+    slots = [0] * (first - 1) + list(offsets)
+    for value in [leadout] + slots + [0] * (99 - len(slots)):
+        sha.update(b"%08X" % value)
+    return base64.b64encode(sha.digest()).decode("ascii").translate(str.maketrans("+/=", "._-"))
+
+
+def read_text(path):
+    """EAC writes UTF-16 logs, XLD UTF-8, older tools the ANSI code page."""
+    data = Path(path).read_bytes()
+    if data[:2] in (b"\xff\xfe", b"\xfe\xff"):
+        return data.decode("utf-16")
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data.decode("cp1252", errors="replace")
+
+
+# ---------- RIP LOGS ----------
+
+def parse_log(path):
+    """The TOC from a rip log, or None if the file has no TOC table."""
+    rows = []
+    for line in read_text(path).splitlines():
+        m = _TOC_ROW.match(line)
+        if m:
+            rows.append(tuple(int(v) for v in m.groups()))
+        elif rows:
+            break   # first table only; appended re-rips repeat it
+    if not rows:
+        return None
+
+    # An enhanced CD's data track follows the audio session after a fixed
+    # gap; the disc ID only covers the audio session.
+    audio = rows[:1]
+    for row in rows[1:]:
+        if row[1] - audio[-1][2] - 1 == DATA_SESSION_GAP:
+            break
+        audio.append(row)
+
+    return Toc(
+        audio[0][0],
+        audio[-1][0],
+        audio[-1][2] + 1 + LEAD_IN,
+        [start + LEAD_IN for _, start, _ in audio],
+        source=str(path),
+    )
+
+
+# ---------- CUE SHEETS ----------
+
+def audio_frames(path):
+    """Length in CD frames of a WAV or FLAC file, or None if unknown."""
+    path = Path(path)
+    try:
+        if path.suffix.lower() == ".wav":
+            with wave.open(str(path), "rb") as w:
+                return w.getnframes() // SAMPLES_PER_FRAME
+        if path.suffix.lower() == ".flac":
+            with open(path, "rb") as f:
+                header = f.read(42)
+            if header[:4] != b"fLaC" or header[4] & 0x7F != 0:
+                return None
+            # STREAMINFO: 20-bit sample rate, 3+5 bits format, 36-bit sample count
+            (packed,) = struct.unpack(">Q", header[18:26])
+            if packed >> 44 != 44100:
+                return None
+            return (packed & ((1 << 36) - 1)) // SAMPLES_PER_FRAME
+    except (OSError, EOFError, wave.Error, struct.error):
+        return None
+    return None
+
+
+def parse_cue(path):
+    """The TOC from a cue sheet, or None.
+
+    The lead-out is not in the sheet, so the referenced audio files must be
+    next to it (WAV or FLAC) to be measured. Sheets with data tracks are
+    skipped: their session layout is only reliable in the rip log.
+    """
+    path = Path(path)
+    files = []      # [file name, [(track, frames into file)]]
+    track = None
+    for line in read_text(path).splitlines():
+        file_m, track_m, index_m = _CUE_FILE.match(line), _CUE_TRACK.match(line), _CUE_INDEX.match(line)
+        if file_m:
+            files.append([file_m.group(1), []])
+        elif track_m:
+            if track_m.group(2).upper() != "AUDIO":
+                return None
+            track = int(track_m.group(1))
+        elif index_m and files and track is not None:
+            mm, ss, ff = (int(v) for v in index_m.groups())
+            files[-1][1].append((track, (mm * 60 + ss) * 75 + ff))
+            track = None
+
+    tracks, position = [], 0
+    for name, indexes in files:
+        length = audio_frames(path.parent / name)
+        if length is None:
+            return None
+        tracks += [(n, position + frames) for n, frames in indexes]
+        position += length
+    if not tracks:
+        return None
+
+    return Toc(
+        tracks[0][0],
+        tracks[-1][0],
+        position + LEAD_IN,
+        [frames + LEAD_IN for _, frames in tracks],
+        source=str(path),
+    )
+
+
+# ---------- DIRECTORIES ----------
+
+def tocs_in_directory(directory, names):
+    """TOCs for one rip directory, one per distinct disc ID.
+
+    Logs are preferred: they carry the drive's own TOC. Cue sheets are only
+    read for directories without a usable log.
+    """
+    directory = Path(directory)
+    logs = sorted(n for n in names if n.lower().endswith(LOG_SUFFIXES))
+    cues = sorted(n for n in names if n.lower().endswith(CUE_SUFFIXES))
+
+    tocs = {}
+    for parse, candidates in ((parse_log, logs), (parse_cue, cues)):
+        for name in candidates:
+            try:
+                toc = parse(directory / name)
+            except (OSError, ValueError) as e:
+                print(f"Could not read {directory / name}: {e}")
+                continue
+            if toc:
+                tocs.setdefault(toc.disc_id, toc)
+        if tocs:
+            break
+    return list(tocs.values())
+
+
+if __name__ == "__main__":
+    import sys
+
+    for arg in sys.argv[1:]:
+        p = Path(arg)
+        toc = parse_cue(p) if p.suffix.lower() in CUE_SUFFIXES else parse_log(p)
+        print(f"{p}: {toc.disc_id}  {toc.toc_string}" if toc else f"{p}: no TOC found")
@@ -0,0 +1,135 @@
+# rips_to_csv.py
+# Catalogue discs that were already ripped, from their EAC/XLD logs and cue
+# sheets, without a drive. Directories are parsed in parallel, disc IDs are
+# computed locally (rip_log_manager), and each disc goes through the same
+# MusicBrainz lookup and catalog/CSV writes as cd_to_csv.py.
+#
+#   python rips_to_csv.py D:\Music
+#   python rips_to_csv.py ~/Music --dry-run
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from catalog_manager import open_catalog
+from circuit_breaker import Deadline
+from discogs_manager import get_discogs_genre, get_discogs_token
+from file_manager import disc_row, save_disc_row
+from musicbrainz_manager import init_musicbrainz, lookup_disc_id
+from review_queue_manager import REVIEW_QUEUE_PATH, ReviewQueue
+from rip_log_manager import CUE_SUFFIXES, LOG_SUFFIXES, tocs_in_directory
+from seen_disc_manager import SeenDiscIndex
+from station_manager import station_journal
+
+# ---------------- CONFIG ----------------
+CSV_PATH = "data/cd_labels.csv"
+CATALOG_PATH = "data/catalog.db"
+SEEN_PATH = "data/seen_discs.jsonl"
+
+PARSE_WORKERS = 8           # directories read at once
+LOOKUP_WORKERS = 2          # musicbrainzngs serializes requests at 1/s on its own
+DISC_DEADLINE_SECONDS = 20
+
+# Discogs allows far fewer requests than MusicBrainz. When a disc has no
+# MusicBrainz genre tags, queue it for backfill_catalog.py instead of
+# waiting on Discogs inside the bulk run.
+INLINE_DISCOGS = False
+
+RIP_DRIVE = "rip"           # "drive" column for discs catalogued from rips
+# ---------------------------------------
+
+
+def find_tocs(root, workers=PARSE_WORKERS):
+    """One TOC per distinct disc ID under root."""
+    suffixes = LOG_SUFFIXES + CUE_SUFFIXES
+    dirs = [
+        (d, files) for d, _, files in os.walk(root)
+        if any(f.lower().endswith(suffixes) for f in files)
+    ]
+    tocs = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for found in pool.map(lambda a: tocs_in_directory(*a), dirs):
+            for toc in found:
+                tocs.setdefault(toc.disc_id, toc)
+    return list(tocs.values())
+
+
+def identify(toc, token=None):
+    """(artist, album, year, mbid, genre, genre_deferred) for a TOC; artist None if unknown."""
+    deadline = Deadline(DISC_DEADLINE_SECONDS)
+    artist, album, year, mbid, genre = lookup_disc_id(toc.disc_id, toc=toc.toc_string, deadline=deadline)
+    if not artist:
+        return None, None, None, None, None, False
+
+    deferred = False
+    if not genre:
+        genre = get_discogs_genre(artist, album, token=token, deadline=deadline) if INLINE_DISCOGS else None
+        if genre is None:
+            genre, deferred = "", True
+    return artist, album, year, mbid, genre, deferred
+
+
+def ingest(root, parse_workers=PARSE_WORKERS, lookup_workers=LOOKUP_WORKERS, dry_run=False):
+    start = time.perf_counter()
+    seen = SeenDiscIndex(SEEN_PATH, csv_path=CSV_PATH)
+    tocs = find_tocs(root, parse_workers)
+    todo = [t for t in tocs if not seen.has_disc(t.disc_id)]
+    print(f"{len(tocs)} discs found in rip logs/cue sheets under {root} "
+          f"({len(tocs) - len(todo)} already catalogued) in {time.perf_counter() - start:.1f}s")
+
+    if dry_run:
+        for toc in todo:
+            print(f"  {toc.disc_id}  {toc.source}")
+        return 0
+
+    catalog = open_catalog(CATALOG_PATH, CSV_PATH)
+    journal = station_journal()
+    review = ReviewQueue(REVIEW_QUEUE_PATH)
+    init_musicbrainz()
+    token = get_discogs_token() if INLINE_DISCOGS else None
+
+    added = unmatched = duplicates = 0
+    with ThreadPoolExecutor(max_workers=lookup_workers) as pool:
+        futures = {pool.submit(identify, toc, token): toc for toc in todo}
+        for n, fut in enumerate(as_completed(futures), start=1):
+            toc = futures[fut]
+            prefix = f"[{n}/{len(todo)}]"
+            try:
+                artist, album, year, mbid, genre, deferred = fut.result()
+            except Exception as e:
+                print(f"{prefix} {toc.source}: {e}")
+                continue
+
+            if not artist:
+                print(f"{prefix} Not found by disc ID or TOC: {toc.source}")
+                review.add(toc.disc_id, toc.toc_string, drive=RIP_DRIVE, source=toc.source)
+                unmatched += 1
+                continue
+
+            if seen.has_mbid(mbid):
+                # another pressing (or rip) of a release already catalogued
+                print(f"{prefix} Duplicate: {artist} - {album}")
+                seen.add(toc.disc_id, mbid)
+                duplicates += 1
+                continue
+
+            row = disc_row(RIP_DRIVE, artist, album, year, genre, mbid, toc.disc_id)
+            save_disc_row(row, catalog, CSV_PATH, journal, deferred)
+            seen.add(toc.disc_id, mbid)
+            added += 1
+            print(f"{prefix} {artist} - {album} ({row['year'] or '?'})")
+
+    elapsed = time.perf_counter() - start
+    print(f"Added {added} discs, {duplicates} duplicates, {unmatched} queued for review "
+          f"(python review_discs.py) in {elapsed:.0f}s")
+    return added
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Catalogue ripped discs from their EAC/XLD logs and cue sheets.")
+    parser.add_argument("root", help="directory tree to scan")
+    parser.add_argument("--workers", type=int, default=PARSE_WORKERS, help="directories parsed at once")
+    parser.add_argument("--dry-run", action="store_true", help="only list the discs that would be looked up")
+    args = parser.parse_args()
+
+    ingest(args.root, parse_workers=args.workers, dry_run=args.dry_run)
@@ -0,0 +1,83 @@
+# seen_disc_manager.py
+# Persistent index of processed disc IDs and MBIDs so restarts and
+# duplicate copies do not reprocess discs or append duplicate rows.
+import csv
+import json
+import time
+from pathlib import Path
+
+# ---------------- CONFIG ----------------
+SEEN_PATH = "data/seen_discs.jsonl"
+# ---------------------------------------
+
+
+class SeenDiscIndex:
+    def __init__(self, path=SEEN_PATH, csv_path=None):
+        self.path = Path(path)
+        self.disc_ids = {}   # disc_id -> mbid
+        self.mbids = set()
+
+        if csv_path:
+            self._load_catalog(csv_path)
+        self._load()
+
+    # ---------- LOADING ----------
+
+    def _load_catalog(self, csv_path):
+        path = Path(csv_path)
+        if not path.exists():
+            return
+
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for r in csv.DictReader(f):
+                self._apply((r.get("disc_id") or "").strip(), (r.get("mbid") or "").strip())
+
+    def _load(self):
+        if not self.path.exists():
+            return
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    e = json.loads(line)
+                except ValueError:
+                    continue
+                self._apply(e.get("disc_id") or "", e.get("mbid") or "")
+
+    def _apply(self, disc_id, mbid):
+        if disc_id:
+            self.disc_ids[disc_id] = mbid
+        if mbid:
+            self.mbids.add(mbid)
+
+    # ---------- QUERIES ----------
+
+    def __len__(self):
+        return len(self.disc_ids)
+
+    def has_disc(self, disc_id):
+        return bool(disc_id) and disc_id in self.disc_ids
+
+    def has_mbid(self, mbid):
+        return bool(mbid) and mbid in self.mbids
+
+    def mbid_for_disc(self, disc_id):
+        return self.disc_ids.get(disc_id) or None
+
+    # ---------- UPDATES ----------
+
+    def add(self, disc_id, mbid):
+        if disc_id in self.disc_ids and (not mbid or mbid in self.mbids):
+            return
+        self._apply(disc_id, mbid)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "disc_id": disc_id or "",
+                "mbid": mbid or "",
+                "ts": time.time(),
+            }) + "\n")
@@ -0,0 +1,355 @@
+# standin_services.py
+# Local stand-ins for MusicBrainz, Discogs, TMDb and the Cover Art Archive,
+# served from fixtures, with configurable latency, error rate and rate limit.
+# Used by load_test.py.
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+MB_NS = "http://musicbrainz.org/ns/mmd-2.0#"
+
+
+class ServiceProfile:
+    """How a stand-in misbehaves: latency (s), jitter (s), error_rate (0-1), rate_limit (req/s, 0 = none)."""
+
+    def __init__(self, latency=0.2, jitter=0.1, error_rate=0.0, rate_limit=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+
+
+class _Window:
+    # requests seen in the last second, for rate limiting
+    def __init__(self):
+        self.times = []
+        self.lock = threading.Lock()
+
+    def admit(self, limit):
+        if not limit:
+            return True
+        now = time.monotonic()
+        with self.lock:
+            self.times = [t for t in self.times if now - t < 1.0]
+            if len(self.times) >= limit:
+                return False
+            self.times.append(now)
+            return True
+
+
+class StandInService:
+    name = "service"
+    throttle_status = 429
+
+    def __init__(self, fixtures, profile=None):
+        self.fixtures = fixtures
+        self.profile = profile or ServiceProfile()
+        self.calls = Counter()      # (endpoint, status) -> count
+        self._window = _Window()
+        self._lock = threading.Lock()
+        self.server = None
+
+    # ---------- overridden per service ----------
+
+    def route(self, path, query):
+        """Return (status, content_type, body) for a request."""
+        raise NotImplementedError
+
+    def endpoint(self, path):
+        return path.strip("/").split("/")[0] or "/"
+
+    # ---------- shared behaviour ----------
+
+    def handle(self, path, query):
+        p = self.profile
+        time.sleep(max(0.0, p.latency + random.uniform(-p.jitter, p.jitter)))
+
+        if not self._window.admit(p.rate_limit):
+            result = self.throttled()
+        elif random.random() < p.error_rate:
+            result = (500, "text/plain", b"stand-in injected failure")
+        else:
+            result = self.route(path, query)
+
+        with self._lock:
+            self.calls[(self.endpoint(path), result[0])] += 1
+        return result
+
+    def throttled(self):
+        return self.throttle_status, "application/json", b'{"message": "rate limited"}'
+
+    def start(self, host="127.0.0.1", port=0):
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                status, content_type, body = service.handle(parts.path, parse_qs(parts.query))
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name=f"{self.name}-standin", daemon=True).start()
+        return self
+
+    @property
+    def address(self):
+        host, port = self.server.server_address[:2]
+        return f"{host}:{port}"
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+# ===================== MUSICBRAINZ =====================
+
+def _mb_artist_credit(fx):
+    return (
+        f'<artist-credit><name-credit><artist id="{fx["mbid"]}-artist">'
+        f'<name>{escape(fx["artist"])}</name><sort-name>{escape(fx["artist"])}</sort-name>'
+        f'</artist></name-credit></artist-credit>'
+    )
+
+
+def _mb_release(fx, tracks=False):
+    tags = ""
+    if fx.get("tags"):
+        tags = "<tag-list>" + "".join(
+            f'<tag count="{count}"><name>{escape(name)}</name></tag>' for name, count in fx["tags"]
+        ) + "</tag-list>"
+
+    media = ""
+    if tracks:
+        items = "".join(
+            f'<track id="{fx["mbid"]}-t{n}"><position>{n}</position><number>{n}</number>'
+            f'<recording id="{fx["mbid"]}-r{n}"><title>{escape(title)}</title></recording></track>'
+            for n, title in enumerate(fx.get("tracks", []), start=1)
+        )
+        media = (
+            f'<medium-list count="1"><medium><position>1</position>'
+            f'<track-list count="{len(fx.get("tracks", []))}">{items}</track-list></medium></medium-list>'
+        )
+
+    return (
+        f'<release id="{fx["mbid"]}"><title>{escape(fx["album"])}</title>'
+        f'<date>{escape(str(fx.get("year", "")))}</date>{_mb_artist_credit(fx)}'
+        f'<release-group id="{fx["mbid"]}-group" type="Album"><title>{escape(fx["album"])}</title>{tags}</release-group>'
+        f'{media}</release>'
+    )
+
+
+def _mb_doc(inner):
+    return f'<?xml version="1.0" encoding="UTF-8"?><metadata xmlns="{MB_NS}">{inner}</metadata>'.encode("utf-8")
+
+
+class MusicBrainzStandIn(StandInService):
+    """Answers /ws/2/discid/<id>, /ws/2/release/<mbid> and /ws/2/release?query=."""
+
+    name = "MusicBrainz"
+    throttle_status = 503   # what MusicBrainz returns when rate limited
+
+    def __init__(self, fixtures, profile=None):
+        super().__init__(fixtures, profile)
+        self.by_disc = {fx["disc_id"]: fx for fx in fixtures if fx.get("in_musicbrainz", True)}
+        self.by_mbid = {fx["mbid"]: fx for fx in fixtures if fx.get("in_musicbrainz", True)}
+
+    def endpoint(self, path):
+        parts = path.strip("/").split("/")
+        return parts[2] if len(parts) > 2 else path
+
+    def throttled(self):
+        return 503, "application/xml", _mb_doc("<error><text>Rate limited</text></error>")
+
+    def route(self, path, query):
+        parts = path.strip("/").split("/")   # ws, 2, entity, [id]
+        entity = parts[2] if len(parts) > 2 else ""
+        key = parts[3] if len(parts) > 3 else ""
+
+        if entity == "discid":
+            fx = self.by_disc.get(key)
+            toc = (query.get("toc") or [""])[0]
+            if not fx and toc:
+                # unknown ID: MusicBrainz answers a TOC lookup with a bare release list
+                hits = [f for f in self.by_mbid.values() if f.get("toc") == toc.replace("+", " ")]
+                if hits:
+                    return 200, "application/xml", _mb_doc(
+                        f'<release-list count="{len(hits)}">' + "".join(_mb_release(f) for f in hits) + "</release-list>"
+                    )
+            if not fx:
+                return 404, "application/xml", _mb_doc("<error><text>Not Found</text></error>")
+            inner = f'<disc id="{escape(key)}"><release-list count="1">{_mb_release(fx)}</release-list></disc>'
+            return 200, "application/xml", _mb_doc(inner)
+
+        if entity == "release" and key:
+            fx = self.by_mbid.get(key)
+            if not fx:
+                return 404, "application/xml", _mb_doc("<error><text>Not Found</text></error>")
+            return 200, "application/xml", _mb_doc(_mb_release(fx, tracks=True))
+
+        if entity == "release":
+            q = (query.get("query") or [""])[0]
+            artist = re.search(r'artist:"([^"]*)"', q)
+            album = re.search(r'release:"([^"]*)"', q)
+            hits = [
+                fx for fx in self.by_mbid.values()
+                if artist and album
+                and fx["artist"].lower() == artist.group(1).lower()
+                and fx["album"].lower() == album.group(1).lower()
+            ]
+            inner = f'<release-list count="{len(hits)}" offset="0">' + "".join(_mb_release(fx) for fx in hits) + "</release-list>"
+            return 200, "application/xml", _mb_doc(inner)
+
+        return 404, "application/xml", _mb_doc("<error><text>Not Found</text></error>")
+
+
+# ===================== DISCOGS =====================
+
+class DiscogsStandIn(StandInService):
+    """Answers /database/search and /releases/<id>."""
+
+    name = "Discogs"
+
+    def __init__(self, fixtures, profile=None):
+        super().__init__(fixtures, profile)
+        self.by_id = {n: fx for n, fx in enumerate(fixtures, start=1)}
+
+    def _release(self, n, fx):
+        return {
+            "id": n,
+            "title": fx["album"],
+            "year": int(fx["year"]) if str(fx.get("year", "")).isdigit() else 0,
+            "genres": [fx["genre"]] if fx.get("genre") else [],
+            "artists": [{"id": n, "name": fx["artist"]}],
+        }
+
+    def route(self, path, query):
+        if path.startswith("/database/search"):
+            artist = (query.get("artist") or [""])[0].lower()
+            album = (query.get("release_title") or [""])[0].lower()
+            results = [
+                {"id": n, "type": "release", "title": f'{fx["artist"]} - {fx["album"]}', "year": str(fx.get("year", ""))}
+                for n, fx in self.by_id.items()
+                if fx["artist"].lower() == artist and fx["album"].lower() == album
+            ]
+            body = {
+                "pagination": {"page": 1, "pages": 1, "per_page": 50, "items": len(results)},
+                "results": results,
+            }
+            return 200, "application/json", json.dumps(body).encode()
+
+        m = re.match(r"^/releases/(\d+)$", path)
+        if m and int(m.group(1)) in self.by_id:
+            n = int(m.group(1))
+            return 200, "application/json", json.dumps(self._release(n, self.by_id[n])).encode()
+
+        return 404, "application/json", b'{"message": "Release not found."}'
+
+
+# ===================== TMDB =====================
+
+class TMDbStandIn(StandInService):
+    """Answers /search/movie and /movie/<id>[/credits|/release_dates]."""
+
+    name = "TMDb"
+
+    def __init__(self, fixtures, profile=None):
+        super().__init__(fixtures, profile)
+        self.by_id = {fx["tmdb_id"]: fx for fx in fixtures}
+
+    def endpoint(self, path):
+        parts = path.strip("/").split("/")
+        return "/".join(p if not p.isdigit() else "<id>" for p in parts)
+
+    def route(self, path, query):
+        if path == "/search/movie":
+            title = (query.get("query") or [""])[0].lower()
+            results = [
+                {"id": fx["tmdb_id"], "title": fx["title"], "release_date": fx["release_date"]}
+                for fx in self.fixtures if fx["title"].lower() == title
+            ]
+            return 200, "application/json", json.dumps({"results": results}).encode()
+
+        m = re.match(r"^/movie/(\d+)(/credits|/release_dates)?$", path)
+        fx = self.by_id.get(int(m.group(1))) if m else None
+        if not fx:
+            return 404, "application/json", b'{"status_message": "not found"}'
+
+        if m.group(2) == "/credits":
+            body = {"cast": [{"name": name} for name in fx.get("cast", [])]}
+        elif m.group(2) == "/release_dates":
+            body = {"results": [{"iso_3166_1": "US", "release_dates": [{"certification": fx.get("rating", "")}]}]}
+        else:
+            body = {
+                "id": fx["tmdb_id"],
+                "title": fx["title"],
+                "release_date": fx["release_date"],
+                "runtime": fx.get("runtime"),
+                "vote_average": fx.get("vote_average"),
+                "budget": fx.get("budget"),
+                "genres": [{"name": g} for g in fx.get("genres", [])],
+                "overview": fx.get("overview", ""),
+            }
+        return 200, "application/json", json.dumps(body).encode()
+
+
+# ===================== COVER ART ARCHIVE =====================
+
+class CoverArtStandIn(StandInService):
+    """Answers /release/<mbid>/front[-250|-500|-1200] with a generated JPEG.
+
+    Fixtures with "cover": False have no artwork (404), like most of the
+    long tail on the real archive.
+    """
+
+    name = "Cover Art Archive"
+
+    def __init__(self, fixtures, profile=None):
+        super().__init__(fixtures, profile)
+        self.by_mbid = {fx["mbid"]: fx for fx in fixtures}
+
+    def endpoint(self, path):
+        return "release/<mbid>/" + path.rstrip("/").rsplit("/", 1)[-1]
+
+    def route(self, path, query):
+        m = re.match(r"^/release/([0-9a-f-]+)/front(?:-(\d+))?$", path)
+        fx = self.by_mbid.get(m.group(1)) if m else None
+        if not fx or not fx.get("cover", True):
+            return 404, "text/plain", b"No cover art found"
+        return 200, "image/jpeg", self.artwork(fx["mbid"], int(m.group(2) or 1200))
+
+    @staticmethod
+    def artwork(mbid, size):
+        from io import BytesIO
+
+        from PIL import Image, ImageDraw
+
+        # a gradient and a few shapes, seeded by the release, so identical
+        # covers only come from identical mbids
+        rng = random.Random(mbid)
+        img = Image.linear_gradient("L").resize((size, size)).rotate(rng.choice((0, 90, 180, 270)))
+        img = img.convert("RGB")
+        draw = ImageDraw.Draw(img)
+        for _ in range(4):
+            x, y = rng.randrange(size), rng.randrange(size)
+            r = rng.randrange(size // 10, size // 3)
+            draw.ellipse((x - r, y - r, x + r, y + r), fill=tuple(rng.randrange(256) for _ in range(3)))
+        buf = BytesIO()
+        img.save(buf, format="JPEG", quality=85)
+        return buf.getvalue()
@@ -0,0 +1,286 @@
+# station_manager.py
+# Several scan stations, one catalog. A station (a PC running cd_to_csv.py,
+# rips_to_csv.py or review_discs.py with STATION set) appends every row it
+# catalogues to its own journal, <STATIONS_DIR>/<station>.jsonl. Point
+# STATIONS_DIR at a share or a synced folder; merge_stations.py folds the
+# journals into one catalog.
+#
+# Merging is incremental: each journal is read from the byte offset the last
+# merge stopped at, and the offsets are committed in the same transaction as
+# the rows, so a merge can run continuously and survive being killed. Rows
+# are deduplicated by disc ID, then MBID, through an in-memory hash index of
+# the catalog, and journal lines by their SHA-256, so a line is never merged
+# twice. When stations disagree about a disc, every column takes the first
+# non-empty value in (scanned_at, station, seq) order: the first scan wins,
+# blanks are filled from later ones, and the result does not depend on the
+# order the journals are merged in.
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from catalog_manager import COLUMNS
+
+# ---------------- CONFIG ----------------
+STATION = None                  # this PC's station name, e.g. "desk-2"; None: single station, no journal
+STATIONS_DIR = "data/stations"  # journals are written here and merged from here
+# ---------------------------------------
+
+ADD = "add"      # a catalogued row
+COPY = "copy"    # another copy of a catalogued disc (COUNT_COPIES)
+
+LOCAL = ""       # station of a catalog row that was there before any merge
+
+# the columns a conflict is about: drive and scan time always differ between
+# stations, and the disc ID between pressings of one release
+METADATA = ["artist", "album", "year", "genre", "mbid"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS station_entries (
+    hash     TEXT PRIMARY KEY,
+    station  TEXT NOT NULL,
+    seq      INTEGER NOT NULL,
+    op       TEXT NOT NULL,
+    row_id   INTEGER,
+    disc_id  TEXT,
+    mbid     TEXT,
+    priority TEXT NOT NULL,
+    data     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS station_entries_row ON station_entries (row_id);
+CREATE TABLE IF NOT EXISTS station_offsets (
+    file   TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL
+);
+"""
+
+
+def station_drive(drive, station=None):
+    """The drive column for a row: "<station>/<drive>" on a named station."""
+    station = station or STATION
+    if not station:
+        return drive
+    return f"{station}/{drive}" if drive else station
+
+
+# ===================== STATION JOURNAL =====================
+
+class StationJournal:
+    """Append-only record of what one station catalogued."""
+
+    def __init__(self, station=None, stations_dir=None):
+        self.station = station or STATION
+        if not self.station:
+            raise ValueError("a station journal needs a station name")
+        self.path = Path(stations_dir or STATIONS_DIR) / f"{self.station}.jsonl"
+        self._lock = threading.Lock()
+        self.seq = self._last_seq()
+
+    def _last_seq(self):
+        if not self.path.exists():
+            return 0
+
+        data = self.path.read_bytes()
+        if data and not data.endswith(b"\n"):
+            # torn last line from a crash mid-write; start the next entry on a fresh line
+            with open(self.path, "ab") as f:
+                f.write(b"\n")
+
+        seq = 0
+        for line in data.splitlines():
+            try:
+                seq = max(seq, int(json.loads(line).get("seq") or 0))
+            except ValueError:
+                continue
+        return seq
+
+    def _record(self, op, row):
+        with self._lock:
+            self.seq += 1
+            e = {"station": self.station, "seq": self.seq, "op": op, "row": row, "ts": time.time()}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(e, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def add(self, row):
+        self._record(ADD, {c: "" if row.get(c) is None else str(row[c]) for c in COLUMNS if c in row})
+
+    def copy(self, disc_id=None, mbid=None):
+        self._record(COPY, {"disc_id": disc_id or "", "mbid": mbid or ""})
+
+
+def station_journal():
+    """This PC's journal when STATION is set, else None."""
+    return StationJournal() if STATION else None
+
+
+# ===================== MERGING =====================
+
+def _priority(row, station, seq):
+    # lowest sorts first: earliest scan, then station name, then journal order
+    return f"{row.get('scanned_at') or '~'}\t{station}\t{seq:012d}"
+
+
+class StationMerger:
+    """Folds station journals into a Catalog. Run one merger per catalog."""
+
+    def __init__(self, catalog, stations_dir=None):
+        self.catalog = catalog
+        self.conn = catalog.conn
+        self.stations_dir = Path(stations_dir or STATIONS_DIR)
+        self.conn.executescript(SCHEMA)
+
+        self.load_index()
+
+    def load_index(self):
+        """(Re)build the hash index, disc ID / MBID -> catalog row id, from the catalog."""
+        self.by_disc = {}
+        self.by_mbid = {}
+        for r in self.conn.execute("SELECT id, disc_id, mbid FROM discs ORDER BY id"):
+            self._index(r["id"], r["disc_id"], r["mbid"])
+
+    def _index(self, row_id, disc_id, mbid):
+        if disc_id:
+            self.by_disc.setdefault(disc_id, row_id)
+        if mbid:
+            self.by_mbid.setdefault(mbid, row_id)
+
+    def _find(self, disc_id, mbid):
+        row_id = self.by_disc.get(disc_id) if disc_id else None
+        if row_id is None and mbid:
+            row_id = self.by_mbid.get(mbid)
+        return row_id
+
+    # ---------- JOURNAL READING ----------
+
+    def _offset(self, name):
+        r = self.conn.execute("SELECT offset FROM station_offsets WHERE file = ?", (name,)).fetchone()
+        return r[0] if r else 0
+
+    def _read_new(self, path):
+        """Complete lines added since the last merge: ([(entry, hash)], new offset)."""
+        offset = self._offset(path.name)
+        size = path.stat().st_size
+        if size < offset:
+            # journal replaced or restored; lines merged before are skipped by hash
+            offset = 0
+        if size == offset:
+            return [], offset
+
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read(size - offset)
+        end = data.rfind(b"\n") + 1   # a line still being written waits for the next pass
+
+        entries = []
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                e = json.loads(line)
+            except ValueError:
+                continue
+            entries.append((e, hashlib.sha256(line).hexdigest()))
+        return entries, offset + end
+
+    # ---------- APPLYING ----------
+
+    def _store(self, h, station, seq, op, row_id, row):
+        self.conn.execute(
+            "INSERT INTO station_entries (hash, station, seq, op, row_id, disc_id, mbid, priority, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (h, station, seq, op, row_id, row.get("disc_id") or None, row.get("mbid") or None,
+             _priority(row, station, seq), json.dumps(row, ensure_ascii=False)),
+        )
+
+    def _claim_local_row(self, row_id):
+        """The first time a pre-existing catalog row meets a station entry, keep its own values as an entry."""
+        if self.conn.execute("SELECT 1 FROM station_entries WHERE row_id = ? AND op = ?", (row_id, ADD)).fetchone():
+            return
+        r = dict(self.conn.execute("SELECT * FROM discs WHERE id = ?", (row_id,)).fetchone())
+        row = {c: "" if r[c] is None else str(r[c]) for c in COLUMNS if c != "copies"}
+        self._store(f"local:{row_id}", LOCAL, row_id, ADD, row_id, row)
+
+    def _resolve(self, row_id):
+        """Rewrite a row from its entries: each column's first non-empty value in priority order."""
+        entries = [json.loads(r[0]) for r in self.conn.execute(
+            "SELECT data FROM station_entries WHERE row_id = ? AND op = ? ORDER BY priority, hash", (row_id, ADD))]
+        values = {}
+        for c in COLUMNS:
+            if c == "copies":
+                continue
+            values[c] = next((e[c] for e in entries if e.get(c)), None)
+        self.conn.execute(
+            f"UPDATE discs SET {', '.join(f'{c} = ?' for c in values)} WHERE id = ?",
+            [*values.values(), row_id],
+        )
+        return values
+
+    def _apply(self, e, h):
+        if self.conn.execute("SELECT 1 FROM station_entries WHERE hash = ?", (h,)).fetchone():
+            return "already merged"
+
+        station, seq, op = e.get("station") or "?", int(e.get("seq") or 0), e.get("op")
+        row = e.get("row") or {}
+        disc_id, mbid = row.get("disc_id") or None, row.get("mbid") or None
+        row_id = self._find(disc_id, mbid)
+
+        if op == COPY:
+            self._store(h, station, seq, COPY, row_id, row)
+            if row_id is None:
+                return "copy waiting"   # counted once the disc itself is merged
+            self.conn.execute("UPDATE discs SET copies = copies + 1 WHERE id = ?", (row_id,))
+            return "copy"
+
+        if op != ADD:
+            return "skipped"
+
+        if row_id is None:
+            waiting = self.conn.execute(
+                "SELECT hash FROM station_entries WHERE op = ? AND row_id IS NULL AND (disc_id = ? OR mbid = ?)",
+                (COPY, disc_id, mbid),
+            ).fetchall()
+            row_id = self.catalog._insert({**row, "copies": 1 + len(waiting)})
+            self.conn.executemany("UPDATE station_entries SET row_id = ? WHERE hash = ?",
+                                  [(row_id, w[0]) for w in waiting])
+            self._store(h, station, seq, ADD, row_id, row)
+            self._index(row_id, disc_id, mbid)
+            return "added"
+
+        before = dict(self.conn.execute("SELECT * FROM discs WHERE id = ?", (row_id,)).fetchone())
+        self._claim_local_row(row_id)
+        self._store(h, station, seq, ADD, row_id, row)
+        after = self._resolve(row_id)
+        self._index(row_id, disc_id, mbid)
+
+        if any(row.get(c) and before[c] and row[c] != before[c] for c in METADATA):
+            return "conflict"
+        if any((after[c] or None) != (before[c] or None) for c in METADATA):
+            return "filled"   # blanks (a deferred genre, say) filled from another station
+        return "duplicate"
+
+    def merge_file(self, path):
+        """Merge the new lines of one journal in a single transaction; returns a Counter of outcomes."""
+        entries, offset = self._read_new(path)
+        stats = Counter()
+        with self.conn:
+            for e, h in entries:
+                stats[self._apply(e, h)] += 1
+            self.conn.execute(
+                "INSERT OR REPLACE INTO station_offsets (file, offset) VALUES (?, ?)", (path.name, offset)
+            )
+        return stats
+
+    def merge(self):
+        """One pass over every journal: {file name: Counter} for journals with new lines."""
+        results = {}
+        for path in sorted(self.stations_dir.glob("*.jsonl")):
+            stats = self.merge_file(path)
+            if stats:
+                results[path.name] = stats
+        return results
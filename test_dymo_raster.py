@@ -0,0 +1,72 @@
+# test_dymo_raster.py
+# Byte-level checks for dymo_raster.py; no printer needed.
+#   python test_dymo_raster.py      (or: python -m pytest test_dymo_raster.py)
+import random
+
+from PIL import Image, ImageChops, ImageDraw
+
+from dymo_raster import RASTER_THRESHOLD, decode_raster, encode_label
+
+# 12x3 dots, not rotated: a white row (one ETB run), four black dots
+# (raw is no longer than compressed), alternating dots with two pad bits
+EXPECTED = bytes.fromhex(
+    "1b40"        # ESC @   reset
+    "1b65"        # ESC e   normal density
+    "1b4402"      # ESC D   2 bytes per line
+    "1b4200"      # ESC B   no dot tab
+    "1b4c0003"    # ESC L   3 lines
+    "170f"        # ETB     16 white
+    "16f000"      # SYN     1111 0000 0000 0000
+    "16aaa0"      # SYN     1010 1010 1010 0000
+    "1b45"        # ESC E   feed to next label
+)
+
+
+def small_image():
+    img = Image.new("L", (12, 3), 255)
+    for x in range(4):
+        img.putpixel((x, 1), 0)
+    for x in range(0, 12, 2):
+        img.putpixel((x, 2), 0)
+    return img
+
+
+def sample_label(width=603, height=397):   # neither a whole number of bytes
+    img = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((10, 10, width - 11, height - 11), outline=0, width=3)
+    draw.text((40, 40), "Artist - Album (1999)", fill=0)
+    rng = random.Random(1)
+    for _ in range(2000):
+        img.putpixel((rng.randrange(width), rng.randrange(height)), rng.randrange(256))
+    return img
+
+
+def test_fixed_stream():
+    stream = encode_label(small_image(), rotate=0)
+    assert stream == EXPECTED, stream.hex(" ")
+
+
+def test_round_trip():
+    img = sample_label()
+    for rotate in (0, 90):
+        # what should print: thresholded, rotated, padded white to whole bytes
+        dots = img.point(lambda p: 255 if p >= RASTER_THRESHOLD else 0).rotate(rotate, expand=True)
+        for compress in (True, False):
+            labels = decode_raster(encode_label(img, rotate=rotate, compress=compress))
+            assert len(labels) == 1
+            printed = labels[0].convert("L")
+            padded = Image.new("L", printed.size, 255)
+            padded.paste(dots, (0, 0))
+            assert ImageChops.difference(printed, padded).getbbox() is None, (rotate, compress)
+
+
+def main():
+    test_fixed_stream()
+    print("Fixed stream: OK")
+    test_round_trip()
+    print("Round trip: OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# test_printer_pool.py
+# PrinterPool dispatch, failover and rejoin, on the file/null stand-ins.
+#   python -m pytest test_printer_pool.py
+import time
+
+import pytest
+from PIL import Image
+
+from printer_manager import FilePrinter, NullPrinter, PrinterError, PrinterPool, make_printer
+
+
+def label():
+    return Image.new("L", (40, 20), 255)
+
+
+def print_all(pool, n):
+    futures = [pool.submit(label(), doc_name=f"Label {i + 1}") for i in range(n)]
+    return [f.result(timeout=10) for f in futures]
+
+
+class JammedPrinter(NullPrinter):
+    """Reports fine, fails every job."""
+
+    def _send(self, img, doc_name):
+        raise PrinterError("label jam")
+
+
+def test_round_robin_takes_turns():
+    printers = [NullPrinter(seconds=0.02) for _ in range(3)]
+    pool = PrinterPool(printers, policy="round-robin")
+    try:
+        print_all(pool, 9)
+        assert [p.jobs for p in printers] == [3, 3, 3]
+    finally:
+        pool.close()
+
+
+def test_least_queue_sends_new_labels_to_the_idle_printer():
+    slow, fast = NullPrinter(seconds=1.0), NullPrinter(seconds=0.01)
+    pool = PrinterPool([slow, fast], policy="least-queue")
+    try:
+        futures = []
+        for i in range(6):
+            futures.append(pool.submit(label(), doc_name=f"Label {i + 1}"))
+            time.sleep(0.1)   # labels arrive one by one, as discs are scanned
+        for f in futures:
+            f.result(timeout=10)
+        assert (slow.jobs, fast.jobs) == (1, 5)
+    finally:
+        pool.close()
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        PrinterPool([NullPrinter()], policy="random")
+
+
+def test_failover_when_a_roll_runs_out(tmp_path):
+    pool = make_printer(f"pool:file:{tmp_path / 'a'}?labels=2,file:{tmp_path / 'b'}")
+    a, b = (m.printer for m in pool.members)
+    try:
+        print_all(pool, 6)
+        assert (a.jobs, b.jobs) == (2, 4)
+        assert len(list((tmp_path / "a").glob("*.png"))) == 2
+        assert len(list((tmp_path / "b").glob("*.png"))) == 4
+
+        status = {s["printer"]: s for s in pool.status()}
+        assert not status[a.name]["healthy"]
+        assert status[a.name]["reason"] == "out of labels"
+        assert status[b.name]["healthy"]
+    finally:
+        pool.close()
+
+
+def test_rejoins_after_a_health_check():
+    printer = NullPrinter(labels=1)
+    pool = PrinterPool([printer], health_interval=0.2)
+    try:
+        futures = [pool.submit(label(), doc_name=f"Label {i + 1}") for i in range(3)]
+        futures[0].result(timeout=5)
+        time.sleep(0.3)
+        assert not futures[2].done()            # waiting: no printer has labels
+        assert not pool.status()[0]["healthy"]
+
+        printer.refill()
+        assert pool.join(timeout=5)
+        assert all(f.result() == printer.name for f in futures)
+        assert printer.jobs == 3
+        assert pool.status()[0]["healthy"]
+    finally:
+        pool.close()
+
+
+def test_join_times_out_while_no_printer_can_print():
+    pool = PrinterPool([NullPrinter(labels=0)], health_interval=60)
+    try:
+        future = pool.submit(label())
+        assert not pool.join(timeout=0.3)
+        assert pool.pending() == 1
+        assert not future.done()
+    finally:
+        pool.members[0].printer.refill()
+        pool.close()
+
+
+def test_job_fails_after_max_attempts():
+    printers = [JammedPrinter() for _ in range(3)]
+    pool = PrinterPool(printers, health_interval=60)
+    try:
+        with pytest.raises(PrinterError, match="failed on 3 printer"):
+            pool.submit(label()).result(timeout=5)
+        assert all(not s["healthy"] for s in pool.status())
+    finally:
+        pool.close()
+
+
+def test_stand_in_options(tmp_path):
+    printer = make_printer(f"file:{tmp_path}?labels=3&seconds=0.5")
+    assert isinstance(printer, FilePrinter)
+    assert (printer.labels, printer.seconds) == (3, 0.5)
+
+    null = make_printer("null?labels=0")
+    assert null.check() == (False, "out of labels")
+    with pytest.raises(PrinterError):
+        null.print_image(label())
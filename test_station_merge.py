@@ -0,0 +1,83 @@
+# test_station_merge.py
+# StationMerger: merging journals in any order gives the same catalog.
+#   python -m pytest test_station_merge.py
+from itertools import permutations
+
+import pytest
+
+from catalog_manager import COLUMNS, Catalog
+from station_manager import StationJournal, StationMerger
+
+STATIONS = ["desk-1", "desk-2", "desk-3"]
+
+
+def disc(disc_id, mbid, artist, album, scanned_at, genre="", drive="D:"):
+    return {"drive": drive, "artist": artist, "album": album, "year": "1997", "genre": genre,
+            "mbid": mbid, "disc_id": disc_id, "scanned_at": scanned_at}
+
+
+@pytest.fixture
+def stations_dir(tmp_path):
+    d = tmp_path / "stations"
+    one, two, three = (StationJournal(s, d) for s in STATIONS)
+
+    # the same disc on two stations: the first scan wins, blanks are filled from the later one
+    one.add(disc("A", "mb-a", "Radiohead", "OK Computer", "2026-01-01 10:00:00"))
+    two.add(disc("A", "mb-a", "Radiohead", "OK Computer (Remaster)", "2026-01-01 10:05:00", genre="Rock"))
+    one.add(disc("B", "mb-b", "Portishead", "Dummy", "2026-01-01 10:01:00"))
+    one.copy(disc_id="A", mbid="mb-a")
+    # another pressing of B, found by its MBID
+    three.add(disc("B2", "mb-b", "Portishead", "Dummy", "2026-01-01 10:30:00", genre="Trip Hop"))
+    # a copy journalled before its disc
+    two.copy(disc_id="C", mbid="mb-c")
+    three.add(disc("C", "mb-c", "Massive Attack", "Mezzanine", "2026-01-01 11:00:00"))
+
+    # desk-3 crashed mid-write
+    with open(three.path, "ab") as f:
+        f.write(b'{"station": "desk-3", "seq": 3, "op": "add", "row": {"disc_')
+    return d
+
+
+def merge_in_order(db, stations_dir, order):
+    catalog = Catalog(db)
+    merger = StationMerger(catalog, stations_dir)
+    for station in order:
+        merger.merge_file(stations_dir / f"{station}.jsonl")
+    return catalog, merger
+
+
+def snapshot(catalog):
+    return sorted(tuple(r[c] for c in COLUMNS) for r in catalog.conn.execute("SELECT * FROM discs"))
+
+
+def test_merge_order_does_not_matter(stations_dir, tmp_path):
+    catalogs = []
+    for n, order in enumerate(permutations(STATIONS)):
+        catalog, _ = merge_in_order(tmp_path / f"catalog{n}.db", stations_dir, order)
+        catalogs.append(snapshot(catalog))
+        catalog.close()
+
+    assert all(c == catalogs[0] for c in catalogs)
+    rows = {r[COLUMNS.index("mbid")]: dict(zip(COLUMNS, r)) for r in catalogs[0]}
+    assert len(rows) == 3
+    assert (rows["mb-a"]["album"], rows["mb-a"]["genre"], rows["mb-a"]["copies"]) == ("OK Computer", "Rock", 2)
+    assert (rows["mb-b"]["disc_id"], rows["mb-b"]["genre"]) == ("B", "Trip Hop")
+    assert rows["mb-c"]["copies"] == 2
+
+
+def test_torn_line_waits_and_remerge_is_a_no_op(stations_dir, tmp_path):
+    catalog, merger = merge_in_order(tmp_path / "catalog.db", stations_dir, STATIONS)
+    assert len(catalog) == 3
+    assert not merger.merge()
+
+    # desk-3 restarts: the torn fragment is closed off and the next scan journalled after it
+    StationJournal("desk-3", stations_dir).add(disc("D", "mb-d", "Björk", "Homogenic", "2026-01-01 12:00:00"))
+    assert dict(merger.merge()["desk-3.jsonl"]) == {"added": 1}
+    assert not merger.merge()
+    assert [r["album"] for r in catalog.find(mbid="mb-d")] == ["Homogenic"]
+
+    # a fresh catalog merging in reverse order ends up the same
+    other, _ = merge_in_order(tmp_path / "other.db", stations_dir, reversed(STATIONS))
+    assert snapshot(other) == snapshot(catalog)
+    other.close()
+    catalog.close()
@@ -0,0 +1,80 @@
+# test_tmdb_index.py
+# TitleIndex import and search against a tiny TMDb export; no network needed.
+#   python -m pytest test_tmdb_index.py
+import gzip
+import json
+
+import pytest
+
+from tmdb_index_manager import TitleIndex
+
+EXPORT = [
+    {"id": 348, "original_title": "Alien", "popularity": 60.0, "adult": False, "video": False},
+    {"id": 679, "original_title": "Aliens", "popularity": 45.0, "adult": False, "video": False},
+    {"id": 218, "original_title": "The Terminator", "popularity": 50.0, "adult": False, "video": False},
+    {"id": 280, "original_title": "Terminator 2: Judgment Day", "popularity": 55.0, "adult": False, "video": False},
+    {"id": 194, "original_title": "Le Fabuleux Destin d'Amélie Poulain", "popularity": 30.0,
+     "adult": False, "video": False},
+    {"id": 129, "original_title": "千と千尋の神隠し", "popularity": 40.0, "adult": False, "video": False},
+    {"id": 9001, "original_title": "Alien: Behind the Scenes", "popularity": 2.0, "adult": False, "video": True},
+    {"id": 9002, "original_title": "Alien Nights", "popularity": 3.0, "adult": True, "video": False},
+]
+
+
+def write_export(path, movies):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for m in movies:
+            f.write(json.dumps(m) + "\n")
+        f.write('{"id": 1, "original_ti')   # torn last line, as a cut-off download leaves it
+    return path
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = TitleIndex(tmp_path / "tmdb_index.db")
+    assert index.import_export(write_export(tmp_path / "movie_ids.json.gz", EXPORT)) == 6
+    yield index
+    index.close()
+
+
+def ids(results):
+    return [m["id"] for m in results]
+
+
+def test_import_skips_videos_and_adult_titles(index):
+    assert len(index) == 6
+    assert not {9001, 9002} & set(ids(index.search("alien")))
+
+
+def test_exact_title_comes_first(index):
+    results = index.search("Alien")
+    assert ids(results)[:2] == [348, 679]
+    assert results[0]["title"] == "Alien"
+
+
+def test_prefix_before_fuzzy(index):
+    # "Terminator 2..." starts with the query; "The Terminator" only resembles it
+    assert ids(index.search("termin"))[:2] == [280, 218]
+    assert ids(index.search("the termin"))[0] == 218
+
+
+def test_misspelled_title(index):
+    assert ids(index.search("Termnator"))[0] == 218
+    assert ids(index.search("fabuleux destin amelie"))[0] == 194
+
+
+def test_remember_learns_localized_title_and_date(index, tmp_path):
+    assert index.search("Spirited Away") == []
+
+    index.remember({"id": 129, "title": "Spirited Away", "original_title": "千と千尋の神隠し",
+                    "release_date": "2001-07-20", "popularity": 40.0})
+    results = index.search("Spirited Away")
+    assert ids(results) == [129]
+    assert (results[0]["title"], results[0]["release_date"]) == ("Spirited Away", "2001-07-20")
+    assert ids(index.search("spirted away")) == [129]
+
+    # a newer export keeps what was learned and drops movies it no longer lists
+    newer = [m for m in EXPORT if m["id"] != 679]
+    index.import_export(write_export(tmp_path / "newer.json.gz", newer))
+    assert index.search("Spirited Away")[0]["release_date"] == "2001-07-20"
+    assert 679 not in ids(index.search("Aliens"))
@@ -0,0 +1,322 @@
+# tmdb_index_manager.py
+# Offline movie title index built from TMDb's daily ID export
+# (movie_ids_MM_DD_YYYY.json.gz: one {"id", "original_title", "popularity",
+# "adult", "video"} object per line). Title search and disambiguation run
+# against it locally; the API is only needed for the details fetch.
+#
+# The export carries no release dates or localized titles. Both are learned
+# from every details fetch (remember_movie), so the index gets better at
+# disambiguation the more it is used.
+import gzip
+import json
+import math
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import requests
+
+from release_index_manager import dice, normalize, trigrams
+
+# ---------------- CONFIG ----------------
+TMDB_INDEX_PATH = "data/tmdb_index.db"
+EXPORT_URL = "http://files.tmdb.org/p/exports/movie_ids_{stamp}.json.gz"
+EXPORT_DIR = "data/tmdb_exports"
+INCLUDE_ADULT = False
+MIN_POPULARITY = 0.0       # skip export entries below this
+MIN_SIMILARITY = 0.3       # Dice over trigrams for a fuzzy (misspelled) hit
+RARE_GRAMS = 6             # fuzzy candidates come from the query's rarest trigrams
+POPULARITY_WEIGHT = 0.1    # how much popularity lifts an equally close fuzzy match
+# ---------------------------------------
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS movies (
+    id             INTEGER PRIMARY KEY,
+    original_title TEXT,
+    title          TEXT,
+    release_date   TEXT,
+    popularity     REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS names (
+    norm     TEXT NOT NULL,
+    movie_id INTEGER NOT NULL,
+    PRIMARY KEY (norm, movie_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS grams (
+    gram     TEXT NOT NULL,
+    movie_id INTEGER NOT NULL,
+    PRIMARY KEY (gram, movie_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS gram_df (
+    gram TEXT PRIMARY KEY,
+    n    INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+_INDEX = None
+_INDEX_LOCK = threading.Lock()
+
+
+def _prefix_end(text):
+    # upper bound for a "starts with" range scan on the names index
+    return text + "\uffff"
+
+
+class TitleIndex:
+    def __init__(self, path=TMDB_INDEX_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # batch lookups search and learn from several threads
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM movies").fetchone()[0]
+
+    # ---------- BUILDING ----------
+
+    def _add_names(self, rows):
+        """Index (movie_id, name) pairs; returns the pairs that were new."""
+        names = {(normalize(name), movie_id) for movie_id, name in rows if name and normalize(name)}
+        new = [(norm, movie_id) for norm, movie_id in names
+               if not self.conn.execute("SELECT 1 FROM names WHERE norm = ? AND movie_id = ?",
+                                        (norm, movie_id)).fetchone()]
+        self.conn.executemany("INSERT OR IGNORE INTO names (norm, movie_id) VALUES (?, ?)", new)
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO grams (gram, movie_id) VALUES (?, ?)",
+            [(g, movie_id) for norm, movie_id in new for g in trigrams(norm)],
+        )
+        return new
+
+    def import_export(self, path):
+        """Load a daily ID export (optionally gzipped). Learned titles and
+        release dates are kept; movies missing from the export are dropped."""
+        path = Path(path)
+        opener = gzip.open if path.suffix == ".gz" else open
+
+        count = 0
+        with self._lock, self.conn, opener(path, "rt", encoding="utf-8") as f:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (id INTEGER PRIMARY KEY)")
+            self.conn.execute("DELETE FROM seen")
+            batch = []
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    obj = json.loads(line)
+                except ValueError:
+                    continue
+                if obj.get("video") or (obj.get("adult") and not INCLUDE_ADULT):
+                    continue
+                popularity = float(obj.get("popularity") or 0)
+                if popularity < MIN_POPULARITY or not obj.get("original_title"):
+                    continue
+                batch.append((int(obj["id"]), obj["original_title"], popularity))
+                if len(batch) >= 10_000:
+                    self._import_batch(batch)
+                    count += len(batch)
+                    batch = []
+            self._import_batch(batch)
+            count += len(batch)
+
+            self.conn.execute("DELETE FROM movies WHERE id NOT IN (SELECT id FROM seen)")
+            self._rebuild_names()
+        return count
+
+    def _import_batch(self, batch):
+        self.conn.executemany("INSERT OR IGNORE INTO seen (id) VALUES (?)", [(b[0],) for b in batch])
+        self.conn.executemany(
+            "INSERT INTO movies (id, original_title, popularity) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET original_title = excluded.original_title, "
+            "popularity = excluded.popularity",
+            batch,
+        )
+
+    def _rebuild_names(self):
+        # a full rebuild is simpler (and about as fast) as diffing renamed titles
+        for table in ("names", "grams", "gram_df"):
+            self.conn.execute(f"DELETE FROM {table}")
+
+        rows = self.conn.execute("SELECT id, original_title, title FROM movies").fetchall()
+        names, grams = set(), set()
+        for movie_id, original_title, title in rows:
+            for name in (original_title, title):
+                norm = normalize(name)
+                if norm and (norm, movie_id) not in names:
+                    names.add((norm, movie_id))
+                    grams.update((g, movie_id) for g in trigrams(norm))
+        self.conn.executemany("INSERT INTO names (norm, movie_id) VALUES (?, ?)", names)
+        self.conn.executemany("INSERT INTO grams (gram, movie_id) VALUES (?, ?)", grams)
+        self.conn.execute("INSERT INTO gram_df (gram, n) SELECT gram, COUNT(*) FROM grams GROUP BY gram")
+
+    def remember(self, details):
+        """Learn a movie's localized title and release date from a details fetch."""
+        movie_id = details.get("id")
+        if not movie_id:
+            return
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO movies (id, original_title, title, release_date, popularity) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET "
+                "title = excluded.title, release_date = excluded.release_date",
+                (
+                    movie_id,
+                    details.get("original_title") or details.get("title"),
+                    details.get("title"),
+                    details.get("release_date") or "",
+                    float(details.get("popularity") or 0),
+                ),
+            )
+            new = self._add_names([(movie_id, details.get("title")), (movie_id, details.get("original_title"))])
+            for norm, _ in new:
+                self.conn.executemany(
+                    "INSERT INTO gram_df (gram, n) VALUES (?, 1) ON CONFLICT(gram) DO UPDATE SET n = n + 1",
+                    [(g,) for g in trigrams(norm)],
+                )
+
+    # ---------- SEARCH ----------
+
+    def search(self, query, limit=20):
+        """Movies for a typed title, best first, in the search_movies result shape.
+
+        Exact title matches come first, then titles starting with the query
+        (both by popularity), then misspellings and partial matches ranked
+        by trigram similarity with a popularity lift.
+        """
+        q = normalize(query)
+        q_grams = trigrams(query)
+        if not q:
+            return []
+
+        with self._lock:
+            candidates = {
+                r[0] for r in self.conn.execute(
+                    "SELECT n.movie_id FROM names n JOIN movies m ON m.id = n.movie_id "
+                    "WHERE n.norm >= ? AND n.norm < ? ORDER BY m.popularity DESC LIMIT 500",
+                    (q, _prefix_end(q)),
+                )
+            }
+
+            grams = list(q_grams)
+            marks = ",".join("?" * len(grams))
+            rare = [r[0] for r in self.conn.execute(
+                f"SELECT gram FROM gram_df WHERE gram IN ({marks}) ORDER BY n LIMIT ?", grams + [RARE_GRAMS]
+            )]
+            if rare:
+                marks = ",".join("?" * len(rare))
+                candidates.update(r[0] for r in self.conn.execute(
+                    f"SELECT movie_id FROM grams WHERE gram IN ({marks}) "
+                    f"GROUP BY movie_id ORDER BY COUNT(*) DESC LIMIT 500",
+                    rare,
+                ))
+
+            if not candidates:
+                return []
+            rows = []
+            ids = list(candidates)
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                rows += self.conn.execute(
+                    f"SELECT id, original_title, title, release_date, popularity FROM movies "
+                    f"WHERE id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+
+        ranked = []
+        for movie_id, original_title, title, release_date, popularity in rows:
+            names = [n for n in (title, original_title) if n]
+            norms = [normalize(n) for n in names]
+            lift = 1 + POPULARITY_WEIGHT * math.log1p(popularity)
+            if q in norms:
+                key = (0, -popularity)
+            elif any(n.startswith(q) for n in norms):
+                key = (1, -popularity)
+            else:
+                similarity = max(dice(q_grams, trigrams(n)) for n in names)
+                if similarity < MIN_SIMILARITY:
+                    continue
+                key = (2, -similarity * lift)
+            ranked.append((key, {
+                "id": movie_id,
+                "title": title or original_title,
+                "original_title": original_title or title,
+                "release_date": release_date or "",
+                "popularity": popularity,
+            }))
+
+        ranked.sort(key=lambda t: t[0])
+        return [m for _, m in ranked[:limit]]
+
+
+def get_title_index(path=TMDB_INDEX_PATH):
+    """The shared index, or None if no export has been imported yet."""
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            if not Path(path).exists():
+                return None
+            _INDEX = TitleIndex(path)
+        return _INDEX
+
+
+def remember_movie(details):
+    index = get_title_index()
+    if index is not None:
+        index.remember(details)
+
+
+def download_export(day=None, out_dir=EXPORT_DIR):
+    """Fetch a daily export (yesterday's by default: today's appears around 08:00 UTC)."""
+    day = day or date.today() - timedelta(days=1)
+    url = EXPORT_URL.format(stamp=day.strftime("%m_%d_%Y"))
+    out = Path(out_dir) / url.rsplit("/", 1)[-1]
+    out.parent.mkdir(parents=True, exist_ok=True)
+
+    with requests.get(url, stream=True, timeout=60) as r:
+        r.raise_for_status()
+        tmp = out.with_suffix(out.suffix + ".part")
+        with open(tmp, "wb") as f:
+            for chunk in r.iter_content(chunk_size=1 << 20):
+                f.write(chunk)
+        tmp.replace(out)
+    return out
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline TMDb title index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    dl = sub.add_parser("download", help="download a daily export and import it")
+    dl.add_argument("--date", help="export date, YYYY-MM-DD (default yesterday)")
+    imp = sub.add_parser("import", help="import a downloaded export")
+    imp.add_argument("export")
+    find = sub.add_parser("search", help="search the index")
+    find.add_argument("title", nargs="+")
+    parser.add_argument("--db", default=TMDB_INDEX_PATH)
+    args = parser.parse_args()
+
+    index = TitleIndex(args.db)
+    if args.command == "search":
+        start = time.perf_counter()
+        results = index.search(" ".join(args.title))
+        elapsed = (time.perf_counter() - start) * 1000
+        for m in results:
+            year = m["release_date"][:4] or "????"
+            print(f"{m['id']:>8}  {m['title']} ({year})  popularity {m['popularity']:.1f}")
+        print(f"{len(results)} result(s) in {elapsed:.1f} ms")
+    else:
+        export = args.export if args.command == "import" else \
+            download_export(date.fromisoformat(args.date) if args.date else None)
+        start = time.perf_counter()
+        print(f"Imported {index.import_export(export)} movies from {export} "
+              f"in {time.perf_counter() - start:.1f}s ({len(index)} indexed)")
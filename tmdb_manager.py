@@ -5,25 +5,59 @@ import random
 import requests
 from dotenv import load_dotenv
 
+from circuit_breaker import RateLimiter, get_breaker
+from tmdb_index_manager import get_title_index, remember_movie
+
 TMDB_BASE = "https://api.themoviedb.org/3"
 
+# Shared across threads so batch lookups stay under TMDb's rate limit
+TMDB_MAX_REQUESTS_PER_SECOND = 20
+
 class TMDbError(Exception):
     pass
 
+_RATE_LIMITER = RateLimiter(TMDB_MAX_REQUESTS_PER_SECOND)
+
+def _retry_after(response, default: float = 1.0) -> float:
+    try:
+        return float(response.headers.get("Retry-After") or default)
+    except ValueError:   # an HTTP date instead of seconds
+        return default
+
 def _retry_get(url: str, params: dict, retries: int = 5, base_delay: float = 1.0):
+    breaker = get_breaker("TMDb")
     attempt = 0
     while True:
+        if not breaker.allow():
+            raise TMDbError("TMDb unavailable (circuit open); skipping call")
         try:
+            _RATE_LIMITER.wait()
             r = requests.get(url, params=params, timeout=15)
             r.raise_for_status()
+            breaker.record_success()
             return r.json()
         except Exception as e:
+            status = getattr(getattr(e, "response", None), "status_code", None)
+            if status is not None and 400 <= status < 500 and status != 429:
+                # bad key / unknown id: the service is healthy, retrying won't help
+                breaker.record_success()
+                raise TMDbError(f"TMDb request rejected: {e}") from e
+            if status != 429:
+                # throttling is no outage; only outages trip the breaker
+                breaker.record_failure()
             attempt += 1
-            if attempt > retries:
-                raise TMDbError(f"TMDb failed after {retries} retries: {e}") from e
-            delay = base_delay * (2 ** (attempt - 1)) + random.uniform(0, 0.5)
+            if attempt > retries or breaker.is_open:
+                raise TMDbError(f"TMDb failed after {attempt} attempt(s): {e}") from e
+            if status == 429:
+                # wait as long as TMDb asks, instead of the exponential backoff
+                delay = _retry_after(e.response)
+            else:
+                delay = base_delay * (2 ** (attempt - 1)) + random.uniform(0, 0.5)
             print(f"TMDb error: {e} - retrying in {delay:.1f}s (attempt {attempt}/{retries})")
             time.sleep(delay)
+        finally:
+            # a throttled trial call is no verdict on the service; let the next call try
+            breaker.release_trial()
 
 def get_tmdb_api_key() -> str:
     load_dotenv()
@@ -45,7 +79,16 @@ def get_tmdb_api_key() -> str:
     print("Saved TMDB_API_KEY to .env\n")
     return key
 
-def search_movies(title: str, api_key: str, language: str = "en-US"):
+def search_movies(title: str, api_key: str, language: str = "en-US", year: int | None = None):
+    # The offline index (tmdb_index_manager.py) answers title-only searches;
+    # its export has no release dates, so year-filtered searches and titles
+    # it doesn't know go to the API.
+    index = get_title_index()
+    if index is not None and not year:
+        results = index.search(title)
+        if results:
+            return results
+
     url = f"{TMDB_BASE}/search/movie"
     params = {
         "api_key": api_key,
@@ -53,13 +96,17 @@ def search_movies(title: str, api_key: str, language: str = "en-US"):
         "include_adult": False,
         "language": language,
     }
+    if year:
+        params["year"] = year
     data = _retry_get(url, params)
     return data.get("results", [])
 
 def get_movie_details(movie_id: int, api_key: str, language: str = "en-US"):
     url = f"{TMDB_BASE}/movie/{movie_id}"
     params = {"api_key": api_key, "language": language}
-    return _retry_get(url, params)
+    details = _retry_get(url, params)
+    remember_movie(details)
+    return details
 
 def get_movie_cast(movie_id: int, api_key: str, max_names: int = 8) -> list[str]:
     url = f"{TMDB_BASE}/movie/{movie_id}/credits"
@@ -105,7 +152,11 @@ def prompt_select_movie(results, limit: int = 10) -> int:
         title = m.get("title", "")
         date = m.get("release_date") or ""
         year = date[:4] if date else "????"
-        print(f"{i:2d}. {title} ({year})")
+        hint = ""
+        if not date and m.get("popularity"):
+            # offline results for movies never fetched have no date yet
+            hint = f"  [popularity {m['popularity']:.0f}]"
+        print(f"{i:2d}. {title} ({year}){hint}")
 
     while True:
         raw = input("Select movie number (or 'q' to cancel): ").strip().lower()